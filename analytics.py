@@ -0,0 +1,159 @@
+from array import array  # Typed, compact columns
+from datetime import date  # For converting day numbers back to dates
+from models import *  # Import all models
+from ticket_store import TicketStore  # Columnar ticket storage
+from column_cache import ColumnCache  # Stored columns of the tickets and payments
+
+try:
+    import numpy as np  # Required for the vectorized reports
+except ImportError:
+    np = None
+
+
+class SalesAnalytics:
+    # Revenue and discount reports for the admin dashboard. The tickets and payments are loaded into
+    # NumPy column arrays once (from stored column files, see load()); every report is a few vectorized calls (bincount, unique, histogram,
+    # cumsum) over those columns instead of a Python loop over per-object getters.
+    # Reports return (headings, rows) tables with plain Python values, ready for display.
+    PAYMENT_METHODS = list(PaymentMethod)  # Code -> PaymentMethod
+    METHOD_CODES = {method: code for code, method in enumerate(PAYMENT_METHODS)}
+
+    # Report name -> column headings of its rows
+    REPORTS = {
+        "revenue_by_type": ("Ticket Type", "Tickets Sold", "Revenue"),
+        "revenue_by_day": ("Date", "Tickets Sold", "Revenue"),
+        "revenue_by_week": ("Week Of", "Tickets Sold", "Revenue"),
+        "revenue_by_payment_method": ("Payment Method", "Payments", "Amount Paid"),
+        "discount_effect": ("Discount %", "Tickets Sold", "List Price", "Revenue", "Discount Given"),
+        "discount_histogram": ("Discount Range", "Tickets Sold", "Revenue"),
+        "rolling_revenue": ("Date", "Revenue", "7-Day Revenue", "7-Day Average"),
+    }
+
+    def __init__(self, tickets=(), payments=()):
+        if np is None:
+            raise ImportError("NumPy is required for the sales analytics.")
+        # Ticket columns (cancelled tickets are not sales)
+        store = tickets if isinstance(tickets, TicketStore) else TicketStore(tickets)
+        columns = store.to_numpy()
+        sold = columns["statuses"] != TicketStore.STATUS_CODES[TicketStatus.CANCELLED]
+        self.prices = columns["prices"][sold]  # List price per ticket
+        self.discounts = columns["discounts"][sold]  # Discount % per ticket
+        self.days = columns["purchase_days"][sold].astype(np.int64)  # Purchase date as an ordinal day
+        self.types = columns["types"][sold]  # TicketStore type code per ticket
+        self.revenue = self.prices * (1 - self.discounts / 100)  # Final price per ticket
+        # Payment columns (payment objects, or columns from payment_columns())
+        columns = payments if isinstance(payments, dict) else self.payment_columns(payments)
+        self.amounts = np.frombuffer(columns["amounts"], dtype=np.float64)
+        self.payment_days = np.frombuffer(columns["days"], dtype="l").astype(np.int64)
+        self.methods = np.frombuffer(columns["methods"], dtype=np.uint8).astype(np.int64)
+
+    @classmethod
+    def payment_columns(cls, payments):
+        # Column arrays of some payments: amount paid, payment date as an ordinal day and method code
+        payments = list(payments)
+        return {
+            "amounts": array("d", [p.get_amount_paid() for p in payments]),
+            "days": array("l", [p.get_payment_date().toordinal() for p in payments]),
+            "methods": array("B", [cls.METHOD_CODES[p.get_payment_method()] for p in payments]),
+        }
+
+    @classmethod
+    def load(cls, data_layer, start_date=None, end_date=None):
+        # Load the tickets purchased and payments made between two dates (inclusive, both optional).
+        # The columns come from the column files kept next to the data (see ColumnCache), so only the
+        # ticket segments and payments changed since the last dashboard are read as objects.
+        cache = ColumnCache(data_layer)
+        if "tickets" in data_layer.segments:
+            ticket_keys = data_layer.segments_between("tickets", start_date, end_date)
+        else:
+            ticket_keys = ["tickets"]
+        store = TicketStore()
+        for key in ticket_keys:
+            store.extend_columns(cache.get(key, TicketStore.columns_of))
+        analytics = cls(store, cache.get("payments", cls.payment_columns))
+        analytics.restrict(start_date, end_date)
+        return analytics
+
+    def restrict(self, start_date=None, end_date=None):
+        # Keep only the tickets purchased and payments made between two dates (inclusive, both optional)
+        first = start_date.toordinal() if start_date else None
+        last = end_date.toordinal() if end_date else None
+        for days, names in ((self.days, ("prices", "discounts", "days", "types", "revenue")),
+                            (self.payment_days, ("amounts", "payment_days", "methods"))):
+            keep = np.ones(len(days), dtype=bool)
+            if first is not None:
+                keep &= days >= first
+            if last is not None:
+                keep &= days <= last
+            for name in names:
+                setattr(self, name, getattr(self, name)[keep])
+
+    def report(self, name):
+        # (headings, rows) of a report by name, e.g. for a dashboard listing every report
+        if name not in self.REPORTS:
+            raise ValueError(f"Unknown report: {name}")
+        return self.REPORTS[name], getattr(self, name)()
+
+    def grouped(self, codes, weights, minlength=0):
+        # Count and weight sum per non-negative integer code
+        counts = np.bincount(codes, minlength=minlength)
+        totals = np.bincount(codes, weights=weights, minlength=minlength)
+        return counts, totals
+
+    def by_day_number(self, days):
+        # Tickets sold and revenue per distinct day number in `days`, as rows keyed by date
+        keys, codes = np.unique(days, return_inverse=True)
+        counts, totals = self.grouped(codes.ravel(), self.revenue, len(keys))
+        return [(date.fromordinal(int(day)), int(count), float(total))
+                for day, count, total in zip(keys, counts, totals)]
+
+    def revenue_by_type(self):
+        # Tickets sold and revenue per ticket type
+        counts, totals = self.grouped(self.types, self.revenue, len(TicketStore.TICKET_TYPES))
+        return [(TicketStore.TICKET_TYPES[code], int(counts[code]), float(totals[code]))
+                for code in np.flatnonzero(counts)]
+
+    def revenue_by_day(self):
+        # Tickets sold and revenue per purchase date
+        return self.by_day_number(self.days)
+
+    def revenue_by_week(self):
+        # Tickets sold and revenue per week, keyed by the Monday starting it (ordinal day 1 is a Monday)
+        return self.by_day_number(self.days - (self.days - 1) % 7)
+
+    def revenue_by_payment_method(self):
+        # Payments and amount paid per payment method
+        counts, totals = self.grouped(self.methods, self.amounts, len(self.PAYMENT_METHODS))
+        return [(self.PAYMENT_METHODS[code], int(counts[code]), float(totals[code]))
+                for code in np.flatnonzero(counts)]
+
+    def discount_effect(self):
+        # Per discount level: tickets sold, list price total, revenue and the discount given away
+        levels, codes = np.unique(self.discounts, return_inverse=True)
+        codes = codes.ravel()
+        counts, revenue = self.grouped(codes, self.revenue, len(levels))
+        list_prices = np.bincount(codes, weights=self.prices, minlength=len(levels))
+        return [(float(level), int(count), float(gross), float(net), float(gross - net))
+                for level, count, gross, net in zip(levels, counts, list_prices, revenue)]
+
+    def discount_histogram(self, bin_width=10):
+        # Tickets sold and revenue per discount range of bin_width percent (the last range includes 100)
+        edges = np.arange(0, 100 + bin_width, bin_width)
+        counts, _ = np.histogram(self.discounts, bins=edges)
+        totals, _ = np.histogram(self.discounts, bins=edges, weights=self.revenue)
+        return [(f"{int(low)}-{int(high)}%", int(count), float(total))
+                for low, high, count, total in zip(edges[:-1], edges[1:], counts, totals)]
+
+    def rolling_revenue(self, window=7):
+        # Daily revenue with its sum and average over the last `window` days, for every day from the
+        # first to the last sale (days without sales count as zero)
+        if not len(self.days):
+            return []
+        first = int(self.days.min())
+        daily = np.bincount(self.days - first, weights=self.revenue)
+        cumulative = np.concatenate(([0.0], np.cumsum(daily)))
+        ends = np.arange(1, len(daily) + 1)
+        rolling = cumulative[ends] - cumulative[np.maximum(ends - window, 0)]
+        return [(date.fromordinal(first + offset), float(daily[offset]), float(rolling[offset]),
+                 float(rolling[offset] / window))
+                for offset in range(len(daily))]
@@ -0,0 +1,87 @@
+import asyncio  # For the coroutine API
+from concurrent.futures import ThreadPoolExecutor  # Bounded pool running the blocking storage calls
+from contextlib import AsyncExitStack  # For holding several collection locks at once
+from functools import partial  # For passing arguments to the executor
+from business_logic import BusinessLogic  # The synchronous business logic being wrapped
+
+
+class AsyncBusinessLogic:
+    # Coroutine facade over BusinessLogic, so one process can serve many concurrent sessions from
+    # one event loop instead of a thread per client. Every call runs in a bounded thread pool.
+    # Operations that write a collection hold that collection's asyncio lock (several locks are taken
+    # in name order), so writes to one collection are serialized while reads and writes to other
+    # collections run concurrently.
+
+    # Collections written by each operation
+    WRITES = {
+        "add_guest": ("guests",),
+        "add_ticket_to_guest": ("tickets",),
+        "make_reservation": ("reservations",),
+        "process_payment": ("payments", "reservations"),
+    }
+
+    def __init__(self, business_logic=None, max_workers=4):
+        # Wrap a configured BusinessLogic (or a default one) and start the executor
+        self.business_logic = business_logic if business_logic is not None else BusinessLogic()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="business")
+        self.write_locks = {}  # collection -> asyncio.Lock
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        # Wait for the running operations and stop the executor
+        self.executor.shutdown(wait=True)
+
+    async def run(self, method, *args, **kwargs):
+        # Run a BusinessLogic method in the executor without blocking the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(getattr(self.business_logic, method), *args, **kwargs))
+
+    async def write(self, method, *args, **kwargs):
+        # Run a BusinessLogic method while holding the locks of the collections it writes
+        async with AsyncExitStack() as stack:
+            for collection in sorted(self.WRITES[method]):
+                await stack.enter_async_context(self.write_locks.setdefault(collection, asyncio.Lock()))
+            return await self.run(method, *args, **kwargs)
+
+    # Writes
+    async def add_guest(self, name, email, phone):
+        return await self.write("add_guest", name, email, phone)
+
+    async def add_ticket_to_guest(self, guest_id, ticket_type, price, validity_period=1, visit_date=None):
+        return await self.write("add_ticket_to_guest", guest_id, ticket_type, price, validity_period, visit_date)
+
+    async def make_reservation(self, guest_id, tickets):
+        return await self.write("make_reservation", guest_id, tickets)
+
+    async def process_payment(self, reservation_id, amount_paid, payment_method):
+        return await self.write("process_payment", reservation_id, amount_paid, payment_method)
+
+    # Queries (no lock, they run concurrently with each other and with writes)
+    async def get_all_guests(self):
+        return list(await self.run("get_all_guests"))  # Copy, the in-memory list keeps changing
+
+    async def get_all_tickets(self, start_date=None, end_date=None):
+        return await self.run("get_all_tickets", start_date, end_date)
+
+    async def get_all_reservations(self):
+        return await self.run("get_all_reservations")
+
+    async def get_all_admins(self):
+        return await self.run("get_all_admins")
+
+    async def get_all_attractions(self):
+        return await self.run("get_all_attractions")
+
+    async def get_all_events(self):
+        return await self.run("get_all_events")
+
+    async def get_all_payments(self):
+        return await self.run("get_all_payments")
+
+    async def get_all_services(self):
+        return await self.run("get_all_services")
@@ -0,0 +1,65 @@
+import queue  # For handing jobs and results between threads
+import threading  # For the worker thread
+
+
+class BackgroundWorker:
+    # Runs business operations on one worker thread so the Tk main loop never waits for disk I/O.
+    # Jobs run one at a time in the order they were submitted, so purchases are stored in the order
+    # they were made. Results are handed back by poll(), which the UI calls from its own thread
+    # (App schedules it with root.after), because Tk widgets may only be touched from that thread.
+
+    def __init__(self):
+        self.jobs = queue.Queue()  # (operation, on_success, on_error, description), None stops the worker
+        self.results = queue.Queue()  # (callback, result or exception, failed)
+        self.pending = []  # Descriptions of the submitted jobs whose results were not delivered yet
+        self.thread = threading.Thread(target=self.run, name="business-worker", daemon=True)
+        self.thread.start()
+
+    def submit(self, operation, on_success=None, on_error=None, description="Working"):
+        # Queue operation() to run on the worker thread; on_success(result) or on_error(exception)
+        # is called later from poll() on the UI thread
+        self.pending.append(description)
+        self.jobs.put((operation, on_success, on_error, description))
+
+    def run(self):
+        # Worker thread: run the queued jobs in order
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            operation, on_success, on_error, description = job
+            try:
+                self.results.put((on_success, operation(), False))
+            except Exception as e:
+                self.results.put((on_error, e, True))
+
+    def poll(self):
+        # Deliver the finished results to their callbacks on the calling thread; returns how many
+        delivered = 0
+        while True:
+            try:
+                callback, value, failed = self.results.get_nowait()
+            except queue.Empty:
+                return delivered
+            self.pending.pop(0)  # Results arrive in submission order
+            delivered += 1
+            if callback is not None:
+                callback(value)
+            elif failed:
+                raise value  # No error handler was given, don't swallow the error
+
+    def is_busy(self):
+        # True while submitted jobs have not been delivered
+        return bool(self.pending)
+
+    def status(self):
+        # Short description of the work in progress for a progress indicator ("" when idle)
+        if not self.pending:
+            return ""
+        queued = len(self.pending) - 1
+        return f"{self.pending[0]}..." + (f" ({queued} more queued)" if queued else "")
+
+    def stop(self):
+        # Finish the queued jobs and stop the worker thread
+        self.jobs.put(None)
+        self.thread.join()
@@ -0,0 +1,102 @@
+import argparse  # For the command line interface
+import tempfile  # For the benchmark's data directory
+import time  # For timing the reports
+from models import *  # Import all models
+from data_layer import DataLayer  # For the stored tickets and payments
+from analytics import SalesAnalytics  # Vectorized reports
+
+
+def make_data(count):
+    # Build `count` tickets over a year with a mix of types and discounts, and one payment per 3 tickets
+    ticket_types = list(TicketType)
+    methods = list(PaymentMethod)
+    tickets, payments = [], []
+    for i in range(count):
+        ticket = Ticket(ticket_types[i % len(ticket_types)], 275, 1, discount=(i % 4) * 5, guest_id=i % 1000,
+                        ticket_id=i + 1)
+        ticket.set_purchase_date(date(2026, 1, 1) + timedelta(days=i % 365))
+        tickets.append(ticket)
+    for i in range(count // 3):
+        payments.append(Payment(i + 1, 825, methods[i % len(methods)]))
+    return tickets, payments
+
+
+# The same reports written as Python loops over the object getters
+def python_reports(tickets, payments):
+    sold = [t for t in tickets if t.get_status() != TicketStatus.CANCELLED]
+    by_type, by_day, by_week, by_discount, by_method = {}, {}, {}, {}, {}
+    for ticket in sold:
+        revenue = ticket.get_price() * (1 - ticket.get_discount() / 100)
+        day = ticket.get_purchase_date()
+        week = day - timedelta(days=day.weekday())
+        for table, key in ((by_type, ticket.get_ticket_type()), (by_day, day), (by_week, week)):
+            count, total = table.get(key, (0, 0.0))
+            table[key] = (count + 1, total + revenue)
+        count, gross, net = by_discount.get(ticket.get_discount(), (0, 0.0, 0.0))
+        by_discount[ticket.get_discount()] = (count + 1, gross + ticket.get_price(), net + revenue)
+    for payment in payments:
+        count, total = by_method.get(payment.get_payment_method(), (0, 0.0))
+        by_method[payment.get_payment_method()] = (count + 1, total + payment.get_amount_paid())
+    rolling = []
+    if by_day:
+        first, last = min(by_day), max(by_day)
+        daily = [by_day.get(first + timedelta(days=d), (0, 0.0))[1] for d in range((last - first).days + 1)]
+        rolling = [sum(daily[max(0, d - 6):d + 1]) for d in range(len(daily))]
+    return by_type, by_day, by_week, by_discount, by_method, rolling
+
+
+def numpy_reports(analytics):
+    return [analytics.report(name) for name in SalesAnalytics.REPORTS]
+
+
+def timed(function, *args):
+    # Return (result, seconds taken)
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def python_dashboard(data_layer):
+    # Reports from the stored objects with Python loops
+    return python_reports(data_layer.get_all_tickets(), data_layer.get_all_payments())
+
+
+def numpy_dashboard(data_layer):
+    # Reports from the stored columns with NumPy
+    return numpy_reports(SalesAnalytics.load(data_layer))
+
+
+def main(count):
+    tickets, payments = make_data(count)
+    _, python_seconds = timed(python_reports, tickets, payments)
+    _, objects_seconds = timed(lambda: numpy_reports(SalesAnalytics(tickets, payments)))
+    print(f"{count} tickets, {len(payments)} payments, all reports, end to end")
+    print("From objects in memory")
+    print(f"{'  Python loops':<34} {python_seconds * 1000:9.1f} ms")
+    print(f"{'  NumPy (columns built from them)':<34} {objects_seconds * 1000:9.1f} ms"
+          f"  ({python_seconds / objects_seconds:.1f}x faster)")
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_layer = DataLayer(data_dir=data_dir)
+        data_layer.save_tickets(tickets)
+        data_layer.add_objects("payments", payments, Payment)
+        # Each dashboard uses a new DataLayer, as a new process would (no objects cached in memory)
+        _, python_seconds = timed(python_dashboard, DataLayer(data_dir=data_dir))
+        _, first_seconds = timed(numpy_dashboard, DataLayer(data_dir=data_dir))
+        _, numpy_seconds = timed(numpy_dashboard, DataLayer(data_dir=data_dir))
+        sale = Ticket(TicketType.SINGLE_DAY, 275, 1, guest_id=1, ticket_id=count + 1)
+        data_layer.save_ticket(sale)  # One sale changes one monthly segment
+        _, changed_seconds = timed(numpy_dashboard, DataLayer(data_dir=data_dir))
+    print("From the data directory (pickle)")
+    print(f"{'  Python loops':<34} {python_seconds * 1000:9.1f} ms")
+    print(f"{'  NumPy, first (builds columns)':<34} {first_seconds * 1000:9.1f} ms")
+    print(f"{'  NumPy, stored columns':<34} {numpy_seconds * 1000:9.1f} ms"
+          f"  ({python_seconds / numpy_seconds:.1f}x faster)")
+    print(f"{'  NumPy, after one sale':<34} {changed_seconds * 1000:9.1f} ms"
+          f"  ({python_seconds / changed_seconds:.1f}x faster)")
+
+
+# Entry point of the benchmark
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the NumPy sales reports with Python loops.")
+    parser.add_argument("--count", type=int, default=1_000_000, help="Number of tickets to build")
+    main(parser.parse_args().count)
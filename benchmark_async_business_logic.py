@@ -0,0 +1,75 @@
+import argparse  # For the command line interface
+import asyncio  # For running the concurrent sessions
+import tempfile  # For throwaway data directories
+import time  # For timing the runs
+from models import *  # Import all models
+from data_layer import DataLayer  # Import the DataLayer for data management
+from business_logic import BusinessLogic  # Synchronous business logic
+from async_business_logic import AsyncBusinessLogic  # Coroutine facade
+
+REQUESTS_PER_SESSION = 6  # Guest, two tickets, reservation, payment, payment listing
+
+
+def sync_session(business_logic, number):
+    # One customer session against the synchronous BusinessLogic
+    guest = business_logic.add_guest(f"Guest {number}", f"guest{number}@example.com", "000-000-0000")
+    tickets = [business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.SINGLE_DAY, 275)
+               for _ in range(2)]
+    reservation = business_logic.make_reservation(guest.get_guest_id(), tickets)
+    business_logic.process_payment(reservation.get_reservation_id(), 550, PaymentMethod.CREDIT_CARD)
+    business_logic.get_all_payments()
+
+
+async def async_session(business_logic, number):
+    # The same session against AsyncBusinessLogic
+    guest = await business_logic.add_guest(f"Guest {number}", f"guest{number}@example.com", "000-000-0000")
+    tickets = await asyncio.gather(*[
+        business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.SINGLE_DAY, 275) for _ in range(2)
+    ])
+    reservation = await business_logic.make_reservation(guest.get_guest_id(), list(tickets))
+    await business_logic.process_payment(reservation.get_reservation_id(), 550, PaymentMethod.CREDIT_CARD)
+    await business_logic.get_all_payments()
+
+
+def run_sync(sessions, storage_mode):
+    # Serve the sessions one after another, return requests per second
+    with tempfile.TemporaryDirectory() as data_dir:
+        business_logic = BusinessLogic(DataLayer(data_dir=data_dir, storage_mode=storage_mode))
+        start = time.perf_counter()
+        for number in range(sessions):
+            sync_session(business_logic, number)
+        elapsed = time.perf_counter() - start
+        if business_logic.data_layer.sqlite:
+            business_logic.data_layer.sqlite.close()
+    return sessions * REQUESTS_PER_SESSION / elapsed
+
+
+async def run_async(sessions, storage_mode, workers):
+    # Serve all sessions concurrently, return requests per second
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+        async with AsyncBusinessLogic(BusinessLogic(data_layer), max_workers=workers) as business_logic:
+            start = time.perf_counter()
+            await asyncio.gather(*[async_session(business_logic, number) for number in range(sessions)])
+            elapsed = time.perf_counter() - start
+        if data_layer.sqlite:
+            data_layer.sqlite.close()
+    return sessions * REQUESTS_PER_SESSION / elapsed
+
+
+def main(sessions, storage_mode, workers):
+    sync_rate = run_sync(sessions, storage_mode)
+    async_rate = asyncio.run(run_async(sessions, storage_mode, workers))
+    print(f"{sessions} sessions, {storage_mode} storage, {workers} executor workers")
+    print(f"{'BusinessLogic':<20} {sync_rate:10.1f} requests/s")
+    print(f"{'AsyncBusinessLogic':<20} {async_rate:10.1f} requests/s  ({async_rate / sync_rate:.2f}x)")
+
+
+# Entry point of the benchmark
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare requests/second of BusinessLogic and AsyncBusinessLogic.")
+    parser.add_argument("--sessions", type=int, default=200, help="Number of customer sessions")
+    parser.add_argument("--storage-mode", default="log", choices=DataLayer.STORAGE_MODES)
+    parser.add_argument("--workers", type=int, default=4, help="Size of the AsyncBusinessLogic executor")
+    args = parser.parse_args()
+    main(args.sessions, args.storage_mode, args.workers)
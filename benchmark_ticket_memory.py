@@ -0,0 +1,55 @@
+import argparse  # For the command line interface
+import tracemalloc  # For measuring allocated memory
+from types import SimpleNamespace  # Stand-in for the previous __dict__-based Ticket
+from models import *  # Import all models
+from ticket_store import TicketStore  # Columnar ticket storage
+
+
+def make_tickets(count):
+    # Build `count` tickets spread over the ticket types
+    ticket_types = list(TicketType)
+    return [
+        Ticket(ticket_types[i % len(ticket_types)], 275, 1, discount=10, guest_id=i % 1000, ticket_id=i + 1,
+               visit_date=date(2026, 1, 1) + timedelta(days=i % 365))
+        for i in range(count)
+    ]
+
+
+def restore_ticket(state):
+    # Rebuild a Ticket from its attribute dict, sharing the attribute values like the __dict__ copies do
+    ticket = Ticket.__new__(Ticket)
+    ticket.__setstate__(state)
+    return ticket
+
+
+def measure(build):
+    # Return (result, bytes still allocated by building it)
+    tracemalloc.start()
+    result = build()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, allocated
+
+
+def main(count):
+    tickets = make_tickets(count)
+    states = [ticket.__getstate__() for ticket in tickets]
+
+    # The previous representation: one __dict__ per ticket holding the same attributes
+    _, dict_bytes = measure(lambda: [SimpleNamespace(**state) for state in states])
+    _, slots_bytes = measure(lambda: [restore_ticket(state) for state in states])
+    store, store_bytes = measure(lambda: TicketStore(tickets))
+
+    print(f"{count} tickets")
+    print(f"{'__dict__ objects':<20} {dict_bytes / count:8.1f} bytes/ticket")
+    for label, allocated in (("__slots__ Ticket", slots_bytes), ("TicketStore columns", store_bytes)):
+        print(f"{label:<20} {allocated / count:8.1f} bytes/ticket  "
+              f"({dict_bytes / allocated:4.1f}x smaller than __dict__)")
+    print(f"TicketStore column data: {store.memory_bytes() / count:.1f} bytes/ticket")
+
+
+# Entry point of the benchmark
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare memory per ticket of the ticket representations.")
+    parser.add_argument("--count", type=int, default=100_000, help="Number of tickets to build")
+    main(parser.parse_args().count)
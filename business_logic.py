@@ -1,17 +1,148 @@
+import threading  # For guarding the in-memory lists when called from several threads
 from models import *  # Import all models like Guest, Ticket, Reservation, etc.
 from data_layer import DataLayer  # Import the DataLayer for data management
+from sales_aggregates import SalesAggregates  # Stored ticket sales totals
+from analytics import SalesAnalytics  # Vectorized revenue reports (needs NumPy)
+from price_list import PriceList  # Versioned ticket prices and discounts
+from pricing import PricingEngine  # Discount rules and basket quotes
+from expiry_index import sweep_expired  # Expiry sweep over the expired tickets only
+from capacity import CapacityTracker  # Places reserved per attraction time slot
+from inventory import DailyInventory  # Park attendance cap per visit date
+from schedule import Schedule  # Events and attraction time slots indexed by time
 
 
 class BusinessLogic:
-    def __init__(self):
-        # Initialize the DataLayer instance for handling data persistence
-        self.data_layer = DataLayer()
+    # Collections held in memory; other processes sharing the data directory may change them
+    SHARED_COLLECTIONS = ("guests", "tickets", "reservations", "events", "attractions")
+
+    def __init__(self, data_layer=None):
+        # Initialize the DataLayer instance for handling data persistence (a configured one can be passed in)
+        self.data_layer = data_layer if data_layer is not None else DataLayer()
+        # Ticket sales totals, updated with every ticket insert, cancel and delete
+        self.sales = SalesAggregates(self.data_layer)
+        # Prices and discounts by effective date; new tickets record the version they are sold under
+        self.price_list = PriceList(self.data_layer)
+        self.pricing = PricingEngine(self.price_list)  # Compiles the rules once per price list version
+        # Tickets per visit date, checked against the day's cap under the same lock as each sale
+        self.inventory = DailyInventory(self.data_layer, self.sales)
+        # Attraction places reserved per time slot, counted in memory and persisted in batches
+        self.capacity = CapacityTracker(self.data_layer)
+        # Guards the in-memory lists and indexes; storage calls run outside it (the DataLayer locks per collection)
+        self.lock = threading.RLock()
+        # Record the change sequence numbers the loaded copies reflect (see refresh)
+        for file_key, sequence in self.data_layer.changed_collections(self.SHARED_COLLECTIONS).items():
+            self.data_layer.acknowledge(file_key, sequence)
         # Load all guests from the data layer
         self.guests = self.data_layer.get_all_guests()
-        # Load all tickets from the data layer
-        self.tickets = self.data_layer.get_all_tickets()
-        # Load all reservations from the data layer
-        self.reservations = self.data_layer.get_all_reservations()
+        # Tickets are loaded on first use (see load_tickets), so starting up doesn't read the ticket history
+        self._tickets = None
+        # Events and attraction time slots are indexed on first use (see schedule)
+        self._schedule = None
+        # Load all reservations from the data layer (they reference tickets and guests by ID)
+        self.reservations = [r.bind(self) for r in self.data_layer.get_all_reservations()]
+        # Build the in-memory lookup indexes
+        self.build_indexes()
+
+    def build_indexes(self):
+        # Build the lookup indexes from the in-memory guest and ticket lists
+        self.guests_by_id = {}  # guest_id -> Guest
+        self.guests_by_email = {}  # email -> list of Guests (emails are not enforced unique)
+        self.indexed_emails = {}  # guest_id -> email the guest is indexed under
+        self.tickets_by_guest = {}  # guest_id -> list of Tickets
+        self.tickets_by_id = {}  # ticket_id -> Ticket
+        for guest in self.guests:
+            self.index_guest(guest)
+        for ticket in self._tickets or []:
+            self.index_ticket(ticket)
+
+    def refresh(self):
+        # Reload the in-memory collections another process (e.g. another kiosk) has written since
+        # they were loaded; our own writes keep the copies current and don't trigger a reload
+        changed = self.data_layer.changed_collections(self.SHARED_COLLECTIONS)
+        if not changed:
+            return []
+        with self.lock:
+            reindex = "guests" in changed
+            if reindex:
+                self.guests = self.data_layer.get_all_guests()
+            if "tickets" in changed and self._tickets is not None:
+                self._tickets = None  # Reloaded on next use
+                reindex = True
+            if "reservations" in changed:
+                self.reservations = [r.bind(self) for r in self.data_layer.get_all_reservations()]
+            if "events" in changed or "attractions" in changed:
+                self._schedule = None  # Rebuilt on next use
+            if "attractions" in changed:
+                self.capacity.reload_attractions()
+            for file_key, sequence in changed.items():
+                self.data_layer.acknowledge(file_key, sequence)
+            if reindex:
+                self.build_indexes()
+        return sorted(changed)
+
+    @property
+    def tickets(self):
+        # All tickets, loaded and indexed on first access
+        return self.load_tickets()
+
+    @tickets.setter
+    def tickets(self, tickets):
+        self._tickets = tickets
+
+    def load_tickets(self):
+        # Load and index every ticket once; later changes keep the list and indexes current
+        self.refresh()
+        with self.lock:
+            if self._tickets is None:
+                self._tickets = self.data_layer.get_all_tickets()
+                for ticket in self._tickets:
+                    self.index_ticket(ticket)
+            return self._tickets
+
+    def index_ticket(self, ticket):
+        # Add a ticket to the id and guest indexes
+        self.tickets_by_id[ticket.get_ticket_id()] = ticket
+        self.tickets_by_guest.setdefault(ticket.get_guest_id(), []).append(ticket)
+
+    def index_guest(self, guest):
+        # Add a guest to the id and email indexes
+        self.guests_by_id[guest.get_guest_id()] = guest
+        self.guests_by_email.setdefault(guest.get_email(), []).append(guest)
+        self.indexed_emails[guest.get_guest_id()] = guest.get_email()
+
+    def unindex_guest(self, guest_id):
+        # Remove a guest from the id and email indexes, returning the indexed guest (or None)
+        guest = self.guests_by_id.pop(guest_id, None)
+        email = self.indexed_emails.pop(guest_id, None)
+        same_email = self.guests_by_email.get(email, [])
+        same_email[:] = [g for g in same_email if g.get_guest_id() != guest_id]
+        if not same_email:
+            self.guests_by_email.pop(email, None)
+        return guest
+
+    def get_guest(self, guest_id):
+        # Find a guest by ID in O(1), or None if it doesn't exist
+        self.refresh()
+        return self.guests_by_id.get(guest_id)
+
+    def find_guest_by_email(self, email):
+        # Find the first guest registered with an email in O(1), or None if there is none
+        self.refresh()
+        guests = self.guests_by_email.get(email)
+        return guests[0] if guests else None
+
+    def get_tickets_by_ids(self, ticket_ids):
+        # Resolve ticket IDs through the index (IDs of deleted tickets are skipped)
+        self.load_tickets()
+        return [self.tickets_by_id[t] for t in ticket_ids if t in self.tickets_by_id]
+
+    def get_payment(self, payment_id):
+        # Find a payment by ID, or None if it doesn't exist
+        return self.data_layer.get_object("payments", payment_id)
+
+    def get_admin(self, admin_id):
+        # Find an admin by ID, or None if it doesn't exist
+        return self.data_layer.get_object("admins", admin_id)
 
     def generate_unique_guest_id(self):
         # Generate a unique ID for a guest using the data layer
@@ -29,20 +160,27 @@ class BusinessLogic:
     def add_guest(self, name, email, phone):
         guest_id = self.generate_unique_guest_id()  # Generate a unique guest ID
         new_guest = Guest(guest_id, name, email, phone)  # Create a new guest
-        self.guests.append(new_guest)  # Add the guest to the list
+        with self.lock:
+            self.guests.append(new_guest)  # Add the guest to the list
+            self.index_guest(new_guest)  # Add the guest to the lookup indexes
         self.data_layer.save_guest(new_guest)  # Save the guest
         return new_guest
 
-    def add_ticket_to_guest(self, guest_id, ticket_type, price, validity_period=1):
+    def add_ticket_to_guest(self, guest_id, ticket_type, price, validity_period=1, visit_date=None):
         # Validate that the price is numeric
         if not isinstance(price, (int, float)):
             raise ValueError("Price must be a numeric value.")
         # Validate that the ticket type is an instance of TicketType enum
         if not isinstance(ticket_type, TicketType):
             raise ValueError("Invalid ticket type.")
+        # Validate the validity period (a visit date goes in visit_date)
+        if isinstance(validity_period, bool) or not isinstance(validity_period, int):
+            raise ValueError("Validity period must be a whole number of days.")
+        if isinstance(visit_date, str):
+            visit_date = date.fromisoformat(visit_date)  # Raises ValueError for a malformed date
 
         # Find the guest by ID
-        guest = next((g for g in self.guests if g.get_guest_id() == guest_id), None)
+        guest = self.get_guest(guest_id)
         if not guest:
             raise ValueError(f"Guest with ID {guest_id} not found.")
 
@@ -52,75 +190,210 @@ class BusinessLogic:
             price=price,
             validity_period=validity_period,
             guest_id=guest_id,  # Associate ticket with the guest ID
+            ticket_id=self.generate_unique_ticket_id(),  # Stable primary key for storage
+            visit_date=visit_date,
+            price_list_version=self.price_list.current()["version"],  # Prices in effect at the sale
         )
-        # Add the ticket to the in-memory list
-        self.tickets.append(new_ticket)
-
-        # Save the ticket in the data layer
-        self.data_layer.save_ticket(new_ticket)
+        # Save the ticket in the data layer and count the sale, if the day isn't sold out
+        with self.sales.recording() as sales:
+            self.inventory.check(visit_date, 1)
+            self.data_layer.save_ticket(new_ticket)
+            sales.add([new_ticket])
+
+        # Add the ticket to the in-memory list and the ticket indexes (if the tickets are loaded yet)
+        with self.lock:
+            if self._tickets is not None:
+                self._tickets.append(new_ticket)
+                self.index_ticket(new_ticket)
 
         # Return the ticket for further use if needed
         return new_ticket
 
+    def add_tickets_bulk(self, guest_id, ticket_type, unit_price, quantity, visit_date=None, discount=0):
+        # Issue `quantity` identical tickets for a guest, validated once and persisted in a single write
+        if not isinstance(unit_price, (int, float)):
+            raise ValueError("Price must be a numeric value.")
+        if not (0 <= discount <= 100):
+            raise ValueError("Discount must be between 0 and 100.")
+        if not isinstance(ticket_type, TicketType):
+            raise ValueError("Invalid ticket type.")
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise ValueError("The number of tickets must be greater than zero.")
+        if isinstance(visit_date, str):
+            visit_date = date.fromisoformat(visit_date)  # Raises ValueError for a malformed date
+
+        # Find the guest by ID
+        if not self.get_guest(guest_id):
+            raise ValueError(f"Guest with ID {guest_id} not found.")
+
+        # Build all tickets with IDs from one reserved block, under the prices in effect today
+        version, details = self.price_list.details(ticket_type)
+        validity_period = details["validity_period"]
+        new_tickets = [
+            Ticket(
+                ticket_type=ticket_type,
+                price=unit_price,
+                validity_period=validity_period,
+                discount=discount,
+                guest_id=guest_id,
+                ticket_id=ticket_id,
+                visit_date=visit_date,
+                price_list_version=version,
+            )
+            for ticket_id in self.data_layer.reserve_ids("ticket_id", quantity)
+        ]
+
+        # Save all tickets with one write if the day has room for them, then add them to the
+        # in-memory list and index if loaded
+        with self.sales.recording() as sales:
+            self.inventory.check(visit_date, quantity)
+            self.data_layer.save_tickets(new_tickets)
+            sales.add(new_tickets)
+        with self.lock:
+            if self._tickets is not None:
+                self._tickets.extend(new_tickets)
+                for ticket in new_tickets:
+                    self.index_ticket(ticket)
+        return new_tickets
+
+    def sweep_expired_tickets(self, today=None):
+        # Mark every active ticket whose validity ended by `today` (default today) as expired, reading and
+        # updating only those tickets by key (see sweep_expired). Loaded copies are updated too.
+        # Returns the expired tickets.
+        expired = sweep_expired(self.data_layer, self.sales, today)
+        with self.lock:
+            for ticket in expired:
+                loaded = self.tickets_by_id.get(ticket.get_ticket_id())
+                if loaded is not None:
+                    loaded.expire_ticket()  # Keep the in-memory copy current
+        return expired
+
     def get_tickets_by_guest(self, guest_id):
-        # Retrieve all tickets associated with the given guest ID
-        return [t for t in self.tickets if t.get_guest_id() == guest_id]
+        # Retrieve all tickets associated with the given guest ID from the index
+        self.load_tickets()
+        return list(self.tickets_by_guest.get(guest_id, []))
 
 
     def get_all_guests(self):
         # Retrieve all guests from the in-memory list
+        self.refresh()
         return self.guests
 
     def update_guest(self, guest):
         # Update guest information in the in-memory list and save it in the data layer
-        for idx, g in enumerate(self.guests): # Loop through the list of guests with both the index (idx) and the guest object (g)
-            if g.get_guest_id() == guest.get_guest_id():
-                # Update the guest in the list at the found index
-                self.guests[idx] = guest
-                # Save the updated guest to the data layer for persistence
-                self.data_layer.save_guest(guest)
-                # Exit the function once the update is complete
-                return
+        current = self.get_guest(guest.get_guest_id())
+        if current is None:
             # If no matching guest is found, raise an error indicating the guest was not found
-        raise ValueError("Guest not found.")
+            raise ValueError("Guest not found.")
+        with self.lock:
+            if current is not guest:
+                # A different object was passed in, so replace the one held in the list
+                self.guests[self.guests.index(current)] = guest
+            # Re-index the guest, its email may have changed
+            self.unindex_guest(guest.get_guest_id())
+            self.index_guest(guest)
+        # Replace the stored guest by ID (instead of appending a second copy)
+        self.data_layer.upsert("guests", guest.get_guest_id(), guest)
 
     def delete_guest(self, guest_id):
         # Delete a guest and their associated tickets
-        self.guests = [g for g in self.guests if g.get_guest_id() != guest_id]
-        self.data_layer.save_data("guests", self.guests)  # Save updated guests list
-        self.tickets = [t for t in self.tickets if t.get_guest_id() != guest_id]
-        self.data_layer.save_data("tickets", self.tickets)  # Save updated tickets list
+        self.load_tickets()
+        with self.lock:
+            self.unindex_guest(guest_id)
+            tickets = self.tickets_by_guest.pop(guest_id, [])
+            for ticket in tickets:
+                self.tickets_by_id.pop(ticket.get_ticket_id(), None)
+            self.guests = [g for g in self.guests if g.get_guest_id() != guest_id]
+            self._tickets = [t for t in self._tickets if t.get_guest_id() != guest_id]
+        self.data_layer.delete_object("guests", guest_id)  # Delete by key, other processes' guests are kept
+        with self.sales.recording() as sales:
+            # One write per affected segment
+            self.data_layer.delete_objects("tickets", {t.get_ticket_id() for t in tickets})
+            sales.remove(tickets)
 
 
-    def get_tickets_by_guest(self, guest_id):
-        # Use a list comprehension to filter tickets based on the guest ID
-        return [t for t in self.tickets if t.get_guest_id() == guest_id]
-
     # Business Logic for Tickets
     def create_ticket(self, ticket_type, price, validity_period, discount=0):
         # Create a new ticket and save it in the data layer
         ticket_id = self.data_layer.get_next_id("ticket_id")  # Generate unique ticket ID
-        ticket = Ticket(ticket_type, price, validity_period, discount)
-        self.data_layer.save_ticket(ticket)
+        ticket = Ticket(ticket_type, price, validity_period, discount, ticket_id=ticket_id,
+                        price_list_version=self.price_list.current()["version"])
+        with self.sales.recording() as sales:
+            self.data_layer.save_ticket(ticket)
+            sales.add([ticket])
         return ticket
 
+    def cancel_ticket(self, ticket_id):
+        # Cancel a ticket; it stays stored with the CANCELLED status but no longer counts as a sale
+        with self.sales.recording() as sales:
+            # Looked up under the tickets lock so two kiosks can't both cancel (and uncount) it
+            ticket = self.data_layer.get_object("tickets", ticket_id)
+            if ticket is None:
+                raise ValueError(f"Ticket with ID {ticket_id} not found.")
+            if ticket.get_status() == TicketStatus.CANCELLED:
+                raise ValueError(f"Ticket with ID {ticket_id} is already cancelled.")
+            sales.remove([ticket])
+            ticket.cancel_ticket()
+            self.data_layer.upsert("tickets", ticket_id, ticket)
+        with self.lock:
+            loaded = self.tickets_by_id.get(ticket_id)
+            if loaded is not None:
+                loaded.cancel_ticket()  # Keep the in-memory copy current
+        return ticket
+
+
+    def get_all_tickets(self, start_date=None, end_date=None):
+        # Retrieve the tickets from the data layer, optionally only those purchased between two dates
+        return self.data_layer.get_all_tickets(start_date, end_date)
+
+    def get_sales_by_date(self):
+        # (purchase date, tickets sold, revenue) rows from the stored totals, without reading the tickets
+        return self.sales.table("date")
 
-    def get_all_tickets(self):
-        # Retrieve all tickets from the data layer
-        return self.data_layer.get_all_tickets()
+    def get_sales_by_type(self):
+        # (TicketType, tickets sold, revenue) rows from the stored totals
+        return self.sales.table("type")
+
+    def get_sales_by_discount(self):
+        # (discount %, tickets sold, revenue) rows from the stored totals
+        return self.sales.table("discount")
+
+    def set_daily_capacity(self, capacity, visit_date=None):
+        # Cap the tickets sold per visit date, or for one date (a date or YYYY-MM-DD) only
+        if isinstance(visit_date, str):
+            visit_date = date.fromisoformat(visit_date)
+        self.inventory.set_capacity(capacity, visit_date)
+
+    def get_remaining_tickets(self, visit_date):
+        # Tickets left for a visit date (None if not limited), without reading the tickets
+        if isinstance(visit_date, str):
+            visit_date = date.fromisoformat(visit_date)
+        return self.inventory.remaining(visit_date)
+
+    def get_visit_calendar(self, start_date, end_date):
+        # (date, tickets sold, capacity, tickets left) for every day of a date range
+        return self.inventory.calendar(start_date, end_date)
+
+    def rebuild_sales_aggregates(self):
+        # Recompute the sales totals from every ticket; returns whether the stored ones were correct
+        return self.sales.rebuild()
+
+    def get_sales_analytics(self, start_date=None, end_date=None):
+        # Revenue and discount reports over the tickets and payments between two dates (needs NumPy)
+        return SalesAnalytics.load(self.data_layer, start_date, end_date)
 
     # Business Logic for Reservations
     def make_reservation(self, guest_id, tickets):
         # Create a new reservation for a guest
         reservation_id = self.data_layer.get_next_id("reservation_id")  # Generate unique reservation ID
-        guest = next(
-            (g for g in self.data_layer.get_all_guests() if g.get_guest_id() == guest_id), None
-        )
+        guest = self.get_guest(guest_id)
         if not guest:
             raise ValueError(f"Guest with ID {guest_id} does not exist.")
 
-        # Create a new reservation object
-        reservation = Reservation(reservation_id, tickets, guest)
+        # Create a new reservation object that refers to its guest and tickets by ID
+        reservation = Reservation(reservation_id, tickets)
+        reservation.set_guest(guest)
+        reservation.bind(self)
         # Save the reservation in the data layer
         self.data_layer.save_reservation(reservation)
         # Return the reservation object
@@ -128,8 +401,8 @@ class BusinessLogic:
 
 
     def get_all_reservations(self):
-        # Retrieve all reservations from the data layer
-        return self.data_layer.get_all_reservations()
+        # Retrieve all reservations from the data layer, resolving their references lazily
+        return [r.bind(self) for r in self.data_layer.get_all_reservations()]
 
     # Business Logic for Admins
     def add_admin(self, name, email):
@@ -144,28 +417,42 @@ class BusinessLogic:
         admins = self.data_layer.get_all_admins()
         return admins
 
-    def modify_ticket_discount(self, ticket_type, discount):
-        # Modify the discount for a specific ticket type
+    def modify_ticket_discount(self, ticket_type, discount, effective_date=None):
+        # Change the discount of a ticket type from effective_date (a date or YYYY-MM-DD, default today)
+        # by adding a price list version; tickets already sold keep their price. Returns the new version number.
         if not isinstance(ticket_type, TicketType):
             raise ValueError("Invalid ticket type.")
         if not (0 <= discount <= 100):
             raise ValueError("Discount must be between 0 and 100.")
+        effective_date = PriceList.parse_date(effective_date)  # Raises ValueError for a malformed date
+
+        version = self.price_list.set_discount(ticket_type, discount, effective_date)
 
-        # Update discount in the ticket details dictionary
-        if ticket_type in Ticket.TICKET_DETAILS:
+        # Update discount in the ticket details dictionary (the defaults used by this process)
+        if ticket_type in Ticket.TICKET_DETAILS and (effective_date is None or effective_date <= date.today()):
             Ticket.TICKET_DETAILS[ticket_type]["discount"] = discount
+        return version
 
-        # Update existing tickets with the new discount
-        tickets = self.data_layer.get_all_tickets()
-        for ticket in tickets:
-            if ticket.get_ticket_type() == ticket_type:
-                ticket.set_discount(discount)
-        self.data_layer.save_data("tickets", tickets)
+    def quote_basket(self, items, on=None):
+        # Price a basket of ticket items in one call (see PricingEngine.quote); raises ValueError
+        # if a visit date doesn't have enough tickets left
+        quote = self.pricing.quote(items, on)
+        quantities = {}  # visit date -> tickets in the basket
+        for line in quote["lines"]:
+            if line["visit_date"] is not None:
+                quantities[line["visit_date"]] = quantities.get(line["visit_date"], 0) + line["quantity"]
+        for visit_date, quantity in quantities.items():
+            self.inventory.check(visit_date, quantity)
+        return quote
+
+    def get_ticket_details(self, ticket_type, on=None):
+        # Price, validity period and discount of a ticket type in effect on a date (default today)
+        return self.price_list.details(ticket_type, on)[1]
 
 
     # Business Logic for Attractions
-    def add_attraction(self, attraction_name, location, service_description):
-        # Add a new attraction and save it in the data layer
+    def add_attraction(self, attraction_name, location, service_description, capacity=None):
+        # Add a new attraction (capacity: places per time slot, None for no limit) and save it in the data layer
         attraction_id = self.data_layer.get_next_id("attraction_id")  # Generate unique attraction ID
         attraction = Attraction(
             attraction_id=attraction_id,
@@ -174,17 +461,86 @@ class BusinessLogic:
             service_id=attraction_id,  # Assuming service_id is the same as attraction_id
             service_name=attraction_name,
             service_description=service_description,
+            capacity=capacity,
         )
         self.data_layer.save_attraction(attraction)
+        self.capacity.set_attraction(attraction)
         return attraction
 
     def get_all_attractions(self):
         # Retrieve all attractions from the data layer
         return self.data_layer.get_all_attractions()
 
+    def add_attraction_time_slots(self, attraction_id, first_start, count, slot_minutes, gap_minutes=0):
+        # Add `count` consecutive time slots of slot_minutes (gap_minutes apart) starting at first_start
+        # (a datetime or ISO string); returns their (start, end) datetimes. Raises ValueError if one
+        # would overlap an existing slot of the attraction.
+        if not isinstance(count, int) or count <= 0:
+            raise ValueError("The number of time slots must be greater than zero.")
+        if not isinstance(slot_minutes, int) or slot_minutes <= 0:
+            raise ValueError("Slot length must be greater than zero.")
+        if not isinstance(gap_minutes, int) or gap_minutes < 0:
+            raise ValueError("The gap between slots can't be negative.")
+        first_start = Event.parse_datetime(first_start)
+        step, length = timedelta(minutes=slot_minutes + gap_minutes), timedelta(minutes=slot_minutes)
+        new_slots = [(first_start + i * step, first_start + i * step + length) for i in range(count)]
+        schedule = self.schedule()
+        with self.lock:
+            attraction = self.data_layer.get_object("attractions", attraction_id)
+            if attraction is None:
+                raise ValueError(f"Attraction not found: {attraction_id}")
+            # The new slots don't overlap each other, so checking their whole span finds every conflict
+            conflicts = schedule.slots_overlapping(new_slots[0][0], new_slots[-1][1], attraction_id)
+            conflicts = [slot for slot in conflicts
+                         if any(start < slot[2] and slot[1] < end for start, end in new_slots)]
+            if conflicts:
+                raise ValueError(f"Time slot starting {conflicts[0][1]} overlaps the new slots.")
+            attraction.set_time_slots(attraction.get_time_slots() + new_slots)
+            self.data_layer.upsert("attractions", attraction_id, attraction)
+            schedule.set_slots(attraction)
+        self.capacity.set_attraction(attraction)
+        return new_slots
+
+    def get_attraction_slots(self, start, end, attraction_id=None):
+        # (attraction_id, start, end) of the time slots overlapping a period, by start time
+        return self.schedule().slots_overlapping(Event.parse_datetime(start), Event.parse_datetime(end),
+                                                 attraction_id)
+
+    def update_attraction_capacity(self, attraction_id, new_capacity, slot=None):
+        # Set the places per time slot of an attraction, or of one slot (a datetime) only.
+        # Places already reserved are kept if the new capacity is lower; no more are given out.
+        self.refresh()  # Start from the attraction as another process may have changed it
+        attraction = self.data_layer.get_object("attractions", attraction_id)
+        if attraction is None:
+            raise ValueError(f"Attraction not found: {attraction_id}")
+        if slot is None:
+            attraction.set_capacity(new_capacity)
+        else:
+            attraction.set_slot_capacity(Event.parse_datetime(slot), new_capacity)
+        self.data_layer.upsert("attractions", attraction_id, attraction)
+        self.capacity.set_attraction(attraction)
+        return attraction
+
+    def reserve_attraction_slot(self, attraction_id, slot, places=1):
+        # Reserve places on an attraction time slot (its start: a datetime or ISO string); returns the
+        # places left (None if not limited). Raises ValueError if the slot is full, or isn't one of the
+        # attraction's time slots once it has them.
+        self.refresh()  # Use the capacities another process may have changed
+        return self.capacity.reserve(attraction_id, Event.parse_datetime(slot), places)
+
+    def release_attraction_slot(self, attraction_id, slot, places=1):
+        # Give back reserved places on an attraction time slot; returns the places left
+        self.refresh()
+        return self.capacity.release(attraction_id, Event.parse_datetime(slot), places)
+
+    def get_remaining_capacity(self, attraction_id, slot):
+        # Places left on an attraction time slot (None if not limited)
+        self.refresh()
+        return self.capacity.remaining(attraction_id, Event.parse_datetime(slot))
+
     # Business Logic for Events
-    def add_event(self, event_name, event_date, service_description):
-        # Add a new event and save it in the data layer
+    def add_event(self, event_name, event_date, service_description, duration_minutes=60):
+        # Add a new event (event_date: a datetime, date or ISO string) and save it in the data layer
         event_id = self.data_layer.get_next_id("event_id")  # Generate unique event ID
         event = Event(
             service_id=event_id,  # Assuming service_id is the same as event_id
@@ -193,13 +549,45 @@ class BusinessLogic:
             event_id=event_id,
             event_name=event_name,
             event_date=event_date,
+            duration_minutes=duration_minutes,
         )
         self.data_layer.save_event(event)
+        with self.lock:
+            if self._schedule is not None:
+                self._schedule.add_event(event)
         return event
 
     def get_all_events(self):
-        # Retrieve all events from the data layer
-        return self.data_layer.get_all_events()
+        # Retrieve all events from the data layer, by date (events without a date last)
+        return sorted(self.data_layer.get_all_events(),
+                      key=lambda event: (event.get_event_date() is None, event.get_event_date() or datetime.min))
+
+    def schedule(self):
+        # Events and attraction time slots indexed by time, built on first use
+        self.refresh()
+        with self.lock:
+            if self._schedule is None:
+                self._schedule = Schedule(self.data_layer.get_all_events(), self.data_layer.get_all_attractions())
+            return self._schedule
+
+    def get_events_between(self, start, end):
+        # Events running at some point in [start, end) (datetimes, dates or ISO strings), by start time
+        return self.schedule().events.overlapping(Event.parse_datetime(start), Event.parse_datetime(end))
+
+    def get_events_on(self, day):
+        # Events running on a day (a date or YYYY-MM-DD)
+        start = Event.parse_datetime(day)
+        return self.get_events_between(start, start + timedelta(days=1))
+
+    def find_event_conflicts(self, event_date, duration_minutes=60):
+        # Events that would overlap an event starting at event_date and lasting duration_minutes
+        start = Event.parse_datetime(event_date)
+        return self.get_events_between(start, start + timedelta(minutes=duration_minutes))
+
+    def get_next_events(self, count, after=None):
+        # The next `count` events starting at or after `after` (default now)
+        after = Event.parse_datetime(after) if after is not None else datetime.now()
+        return self.schedule().events.next(after, count)
 
     # Business Logic for Payments
     def process_payment(self, reservation_id, amount_paid, payment_method: PaymentMethod):
@@ -208,10 +596,9 @@ class BusinessLogic:
             raise ValueError("Invalid payment method. Must be a PaymentMethod enum.")
 
         # Find the reservation by ID
-        reservations = self.data_layer.get_all_reservations()
-        reservation = next(
-            (r for r in reservations if r.get_reservation_id() == reservation_id), None
-        )
+        reservation = self.data_layer.get_object("reservations", reservation_id)
+        if reservation:
+            reservation.bind(self)
         if not reservation:
             raise ValueError(f"Reservation with ID {reservation_id} does not exist.")
 
@@ -221,9 +608,9 @@ class BusinessLogic:
 
         # Associate the payment with the reservation
         reservation.set_payment(payment)
-        # Save the updated reservation and payment in the data layer
-        self.data_layer.save_reservation(reservation)
+        # Save the payment and replace the stored reservation by ID
         self.data_layer.save_payment(payment)
+        self.data_layer.upsert("reservations", reservation_id, reservation)
         # Return the payment object
         return payment
 
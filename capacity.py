@@ -0,0 +1,258 @@
+import atexit  # For persisting the last reservations at exit
+import os  # For file operations
+import pickle  # For reading the stored counters
+import threading  # For the counter lock and the flush timer
+import weakref  # For flushing the trackers at exit without keeping them alive
+from models import *  # Import all models
+
+
+class CapacityTracker:
+    # Places reserved per (attraction ID, time slot start). Processes sharing the data directory
+    # (kiosks) share the counts stored in data/attraction_slots.pkl: "claimed" counts the places of
+    # a slot reserved or leased by any process and never exceeds the slot's capacity. A process
+    # leases places in blocks of lease_size (like IdAllocator's ID blocks) under the attraction_slots
+    # file lock, then serves reservations from its lease in memory: one dict lookup, comparison and
+    # subtraction under a lock, in constant time, and no two threads or processes can take the same place.
+    # Reservation counts are persisted in batches, at most flush_window seconds after the first
+    # unsaved change (and at exit); a flush also gives the unused leases back to the other processes.
+    # Places leased by a process that dies without flushing stay claimed, like the IDs of a lost block.
+
+    def __init__(self, data_layer, flush_window=1.0, lease_size=10):
+        if lease_size < 1:
+            raise ValueError("Lease size must be at least 1.")
+        self.data_layer = data_layer  # DataLayer whose data directory, locks and attractions are used
+        self.file_path = os.path.join(data_layer.data_dir, "attraction_slots.pkl")  # Stored counts
+        self.flush_window = flush_window  # Seconds changes may stay unsaved (0 or None: only on flush())
+        self.lease_size = lease_size  # Places leased from the stored counts at a time
+        self.lock = threading.Lock()  # Guards the counters below
+        self.attractions = None  # attraction_id -> Attraction, loaded on first use
+        self.slot_starts = {}  # attraction_id -> set of its time slot starts (empty: any slot)
+        self.claimed = {}  # (attraction_id, slot) -> places claimed by all processes, as last read
+        self.reserved = {}  # (attraction_id, slot) -> places reserved, as last read plus our changes
+        self.leased = {}  # (attraction_id, slot) -> places leased by this process and not reserved
+        self.pending = {}  # (attraction_id, slot) -> change in reserved places not persisted yet
+        self.flush_timer = None  # Timer of the next batched flush
+        trackers.add(self)
+
+    def read(self):
+        # Stored (claimed, reserved) counts (call with the attraction_slots lock held)
+        if not os.path.exists(self.file_path):
+            return {}, {}
+        with open(self.file_path, "rb") as file:
+            stored = pickle.load(file)
+        return stored["claimed"], stored["reserved"]
+
+    def write(self, claimed, reserved):
+        # Store the counts (call with the attraction_slots lock held)
+        self.data_layer.atomic_write(self.file_path, {"claimed": claimed, "reserved": reserved})
+
+    def sync(self):
+        # Read the stored counts, keeping our unsaved changes (call with self.lock held)
+        with self.data_layer.collection_lock("attraction_slots"):
+            self.claimed, reserved = self.read()
+        self.reserved = self.with_pending(reserved)
+
+    def with_pending(self, reserved):
+        # Stored reserved counts plus our unsaved changes (call with self.lock held)
+        reserved = dict(reserved)
+        for key, count in self.pending.items():
+            reserved[key] = reserved.get(key, 0) + count
+        return reserved
+
+    def load(self):
+        # Load the attractions and stored counts on first use (call with self.lock held)
+        if self.attractions is not None:
+            return
+        self.index_attractions(self.data_layer.get_all_attractions())
+        self.sync()
+
+    def index_attractions(self, attractions):
+        # Keep the attractions and the starts of their time slots (call with self.lock held)
+        self.attractions = {}
+        for attraction in attractions:
+            self.index_attraction(attraction)
+
+    def index_attraction(self, attraction):
+        # Keep one attraction and the starts of its time slots (call with self.lock held)
+        attraction_id = attraction.get_attraction_id()
+        self.attractions[attraction_id] = attraction
+        self.slot_starts[attraction_id] = {start for start, _ in attraction.get_time_slots()}
+
+    def set_attraction(self, attraction):
+        # Use an added or changed attraction's capacities and time slots from now on
+        with self.lock:
+            self.load()
+            self.index_attraction(attraction)
+            self.trim_leases({attraction.get_attraction_id()})
+
+    def reload_attractions(self):
+        # Pick up attractions changed by another process (the counters are kept)
+        with self.lock:
+            if self.attractions is not None:
+                self.index_attractions(self.data_layer.get_all_attractions())
+                self.trim_leases(set(self.attractions))
+
+    def trim_leases(self, attraction_ids):
+        # Give back the leased places of these attractions' slots beyond their (possibly lowered)
+        # capacities, so claimed places never exceed a capacity (call with self.lock held). Places
+        # claimed beyond the capacity are given back by each process holding a lease as it sees the change.
+        keys = [key for key, count in self.leased.items() if count and key[0] in attraction_ids]
+        if not keys:
+            return
+        with self.data_layer.collection_lock("attraction_slots"):
+            claimed, reserved = self.read()
+            for key in keys:
+                attraction_id, slot = key
+                starts = self.slot_starts.get(attraction_id)
+                if attraction_id not in self.attractions or (starts and slot not in starts):
+                    capacity = 0  # The slot is gone, no more places are given out
+                else:
+                    capacity = self.attractions[attraction_id].get_slot_capacity(slot)
+                if capacity is None:
+                    excess = self.leased[key]  # Not limited any more, nothing needs leasing
+                else:
+                    excess = min(self.leased[key], max(claimed.get(key, 0) - capacity, 0))
+                self.leased[key] -= excess
+                claimed[key] = claimed.get(key, 0) - excess
+                if claimed[key] <= 0:
+                    del claimed[key]
+            self.write(claimed, reserved)
+        self.claimed, self.reserved = claimed, self.with_pending(reserved)
+
+    def capacity(self, attraction_id, slot):
+        # Places of a slot, or None if not limited (call with self.lock held). Raises ValueError for
+        # an unknown attraction, or a slot that isn't one of its time slots once it has them.
+        attraction = self.attractions.get(attraction_id)
+        if attraction is None:
+            raise ValueError(f"Attraction not found: {attraction_id}")
+        starts = self.slot_starts[attraction_id]
+        if starts and slot not in starts:
+            raise ValueError(f"Attraction {attraction_id} has no time slot starting at {slot}.")
+        return attraction.get_slot_capacity(slot)
+
+    def left(self, key, capacity):
+        # Places this process can still reserve in a slot, as of the last read (call with self.lock held)
+        return self.leased.get(key, 0) + max(capacity - self.claimed.get(key, 0), 0)
+
+    def lease(self, key, capacity, needed):
+        # Lease at least `needed` more places of a slot, lease_size if they are free (call with
+        # self.lock held); raises ValueError if fewer than `needed` are left
+        with self.data_layer.collection_lock("attraction_slots"):
+            claimed, reserved = self.read()
+            free = capacity - claimed.get(key, 0)
+            if needed > free:
+                self.claimed, self.reserved = claimed, self.with_pending(reserved)
+                raise ValueError(f"Only {self.left(key, capacity)} places left for this time slot.")
+            leased = min(free, max(needed, self.lease_size))
+            claimed[key] = claimed.get(key, 0) + leased
+            self.write(claimed, reserved)
+        self.claimed, self.reserved = claimed, self.with_pending(reserved)
+        self.leased[key] = self.leased.get(key, 0) + leased
+
+    def change(self, key, count):
+        # Apply a change to a slot's counter and schedule its flush (call with self.lock held)
+        self.reserved[key] = self.reserved.get(key, 0) + count
+        self.pending[key] = self.pending.get(key, 0) + count
+        if self.flush_window and self.flush_timer is None:
+            self.flush_timer = threading.Timer(self.flush_window, self.flush)
+            self.flush_timer.daemon = True
+            self.flush_timer.start()
+
+    def reserve(self, attraction_id, slot, count=1):
+        # Take `count` places of a slot; returns the places left (None if not limited).
+        # Raises ValueError if the slot doesn't have that many places left.
+        if not isinstance(count, int) or count <= 0:
+            raise ValueError("The number of places must be greater than zero.")
+        with self.lock:
+            self.load()
+            capacity = self.capacity(attraction_id, slot)
+            key = (attraction_id, slot)
+            if capacity is None:
+                self.change(key, count)
+                return None
+            if self.reserved.get(key, 0) + count > capacity:
+                # The capacity was lowered below the places reserved and leased
+                left = max(capacity - self.reserved.get(key, 0), 0)
+                raise ValueError(f"Only {left} places left for this time slot.")
+            if self.leased.get(key, 0) < count:
+                self.lease(key, capacity, count - self.leased.get(key, 0))
+            self.leased[key] -= count
+            self.change(key, count)
+            return self.left(key, capacity)
+
+    def release(self, attraction_id, slot, count=1):
+        # Give back `count` places of a slot (they join this process's lease); returns the places left
+        if not isinstance(count, int) or count <= 0:
+            raise ValueError("The number of places must be greater than zero.")
+        with self.lock:
+            self.load()
+            capacity = self.capacity(attraction_id, slot)
+            key = (attraction_id, slot)
+            if self.reserved.get(key, 0) < count:
+                self.sync()  # Another process may have reserved them
+                if self.reserved.get(key, 0) < count:
+                    raise ValueError("Cannot release more places than are reserved.")
+            self.change(key, -count)
+            if capacity is None:
+                return None
+            self.leased[key] = self.leased.get(key, 0) + count
+            return self.left(key, capacity)
+
+    def remaining(self, attraction_id, slot):
+        # Places left in a slot for this process, or None if not limited (a lowered capacity can leave none)
+        with self.lock:
+            self.load()
+            capacity = self.capacity(attraction_id, slot)
+            if capacity is None:
+                return None
+            self.sync()
+            return self.left((attraction_id, slot), capacity)
+
+    def reserved_places(self, attraction_id, slot):
+        # Places reserved in a slot by all processes (as of their last flush) plus ours
+        with self.lock:
+            self.load()
+            self.sync()
+            return self.reserved.get((attraction_id, slot), 0)
+
+    def flush(self):
+        # Persist the reservation changes since the last flush and give back the unused leases in
+        # one write; returns the number of slots whose reservations changed
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()  # This flush covers the scheduled one
+                self.flush_timer = None
+            pending, self.pending = self.pending, {}
+            leased, self.leased = self.leased, {}
+        if not pending and not any(leased.values()):
+            return 0
+        try:
+            with self.data_layer.collection_lock("attraction_slots"):
+                claimed, reserved = self.read()
+                for counts, changes, sign in ((reserved, pending, 1), (claimed, leased, -1)):
+                    for key, count in changes.items():
+                        counts[key] = counts.get(key, 0) + sign * count
+                        if counts[key] <= 0:
+                            del counts[key]
+                self.write(claimed, reserved)
+        except BaseException:
+            with self.lock:
+                # Keep the changes and leases for the next flush
+                for counts, changes in ((self.pending, pending), (self.leased, leased)):
+                    for key, count in changes.items():
+                        counts[key] = counts.get(key, 0) + count
+            raise
+        with self.lock:
+            # The stored counts include other processes' changes; keep ours made during the write
+            self.claimed, self.reserved = claimed, self.with_pending(reserved)
+        return len(pending)
+
+
+trackers = weakref.WeakSet()  # Trackers whose last changes are persisted at exit
+
+
+@atexit.register
+def flush_trackers():
+    # Persist the pending changes and unused leases of every tracker still in use
+    for tracker in list(trackers):
+        tracker.flush()
@@ -0,0 +1,45 @@
+import os  # For file operations
+import pickle  # For reading the stored columns
+
+
+class ColumnCache:
+    # Typed column arrays built from a stored collection (or one segment of it), kept in
+    # data/columns/<key>.pkl with the stamp of the version they were built from. As long as the
+    # collection is unchanged its columns are read back as a few arrays (no object is unpickled and
+    # no getter is called); a changed collection or segment is rebuilt from its objects once, so with
+    # monthly ticket segments a new sale only rebuilds the columns of its month.
+
+    def __init__(self, data_layer):
+        self.data_layer = data_layer  # DataLayer whose collections, locks and data directory are used
+        self.directory = os.path.join(data_layer.data_dir, "columns")  # Stored column files
+        self.hits = 0  # Columns read from a stored file
+        self.builds = 0  # Columns built from the objects
+        os.makedirs(self.directory, exist_ok=True)
+
+    def stamp(self, file_key):
+        # Stored version of a collection. SQLite's data_version doesn't change for this connection's
+        # own commits, so that mode uses the change sequence number every write increments.
+        if self.data_layer.sqlite:
+            return self.data_layer.sequence(file_key)
+        return self.data_layer.stamp(file_key)
+
+    def get(self, file_key, build):
+        # Columns of a collection or segment; build(objects) returns {name: array} and is only
+        # called when the stored columns are missing or older than the collection
+        file_path = os.path.join(self.directory, file_key.replace("/", "-") + ".pkl")
+        with self.data_layer.collection_lock(file_key):
+            if file_key in self.data_layer.dirty:
+                # Unflushed changes are newer than the disk, so the stamp can't tell if they're included
+                self.builds += 1
+                return build(self.data_layer.load_data(file_key))
+            stamp = self.stamp(file_key)
+            if os.path.exists(file_path):
+                with open(file_path, "rb") as file:
+                    stored = pickle.load(file)
+                if stored["stamp"] == stamp:
+                    self.hits += 1
+                    return stored["columns"]
+            columns = build(self.data_layer.load_data(file_key))
+            self.data_layer.atomic_write(file_path, {"stamp": stamp, "columns": columns})
+            self.builds += 1
+            return columns
@@ -1,102 +1,930 @@
 import pickle  # For data serialization and deserialization
 import os  # For file operations
+import atexit  # For flushing group-committed changes at exit
+import tempfile  # For the temporary files of atomic writes
+import threading  # For the group-commit timer and the lock guarding the cache
+from functools import wraps  # For the locked decorator
+from bisect import insort  # For keeping the partition segments sorted
+from contextlib import contextmanager  # For the deferred_writes block
 from models import *  # Import all models
+from id_allocator import IdAllocator  # Block-reserving ID allocator
+from sqlite_backend import SQLiteBackend  # SQLite storage backend
+from file_lock import FileLock  # Cross-process lock per collection
+import migrations  # One-time schema upgrades of the stored data
+
+
+def locked(method):
+    # Run a DataLayer method on one collection while holding the collection's lock, so reading,
+    # changing and writing it can't interleave with another thread or process. Different
+    # collections are locked separately and can be used by several threads at once.
+    @wraps(method)
+    def wrapper(self, file_key, *args, **kwargs):
+        with self.collection_lock(file_key):
+            return method(self, file_key, *args, **kwargs)
+    return wrapper
 
 
 class DataLayer:
-    def __init__(self):
+    # Supported storage modes:
+    # "pickle" rewrites the whole collection file on every change
+    # "log" appends each new record to a per-collection log file and replays it on load
+    # "sqlite" stores every collection in an indexed table of one SQLite database
+    STORAGE_MODES = ("pickle", "log", "sqlite")
+
+    # Getter returning the primary key of the objects in each collection
+    RECORD_KEYS = {
+        "guests": "get_guest_id",
+        "tickets": "get_ticket_id",
+        "reservations": "get_reservation_id",
+        "admins": "get_admin_id",
+        "payments": "get_payment_id",
+        "attractions": "get_attraction_id",
+        "events": "get_event_id",
+        "services": "get_service_id",
+    }
+
+    # Collections split into one segment file per month of the date returned by the getter
+    # (data/tickets/2026-10.pkl). Only the "pickle" and "log" modes partition; "sqlite" mode
+    # answers date ranges from its indexed purchase_date column instead.
+    PARTITIONS = {"tickets": "get_purchase_date"}
+    SNAPSHOT_CHUNK = 1000  # Objects per pickled chunk of a collection file
+    UNPARTITIONED = "unpartitioned"  # Segment name of a collection file written before partitioning
+
+    def __init__(self, data_dir="data", storage_mode="pickle", id_block_size=100, auto_migrate=True,
+                 group_commit_window=0.0):
+        # Validate the requested storage mode
+        if storage_mode not in self.STORAGE_MODES:
+            raise ValueError(f"Invalid storage mode: {storage_mode}")
+        if group_commit_window and storage_mode == "sqlite":
+            raise ValueError("Group commit is not available in sqlite mode, SQLite commits its own transactions.")
+        self.data_dir = data_dir  # Directory holding all data files
+        self.storage_mode = storage_mode  # Storage mode used by add_object/load_data/save_data
+
         # Define file paths for all models
         self.files = {
-            "guests": "data/guests.pkl",  # File path for guest data
-            "tickets": "data/tickets.pkl",  # File path for ticket data
-            "reservations": "data/reservations.pkl",  # File path for reservation data
-            "admins": "data/admins.pkl",  # File path for admin data
-            "payments": "data/payments.pkl",  # File path for payment data
-            "attractions": "data/attractions.pkl",  # File path for attraction data
-            "events": "data/events.pkl",  # File path for event data
-            "services": "data/services.pkl",  # File path for services data
+            "guests": os.path.join(data_dir, "guests.pkl"),  # File path for guest data
+            "tickets": os.path.join(data_dir, "tickets.pkl"),  # File path for ticket data
+            "reservations": os.path.join(data_dir, "reservations.pkl"),  # File path for reservation data
+            "admins": os.path.join(data_dir, "admins.pkl"),  # File path for admin data
+            "payments": os.path.join(data_dir, "payments.pkl"),  # File path for payment data
+            "attractions": os.path.join(data_dir, "attractions.pkl"),  # File path for attraction data
+            "events": os.path.join(data_dir, "events.pkl"),  # File path for event data
+            "services": os.path.join(data_dir, "services.pkl"),  # File path for services data
         }
-
-        # Auto-incrementing ID counters
-        self.id_counters = {
-            "guest_id": 1,  # Counter for guest IDs
-            "ticket_id": 1,  # Counter for ticket IDs
-            "reservation_id": 1,  # Counter for reservation IDs
-            "payment_id": 1,  # Counter for payment IDs
-            "admin_id": 1,  # Counter for admin IDs
+        # Append-only log file paths used by the "log" storage mode (guests.pkl -> guests.log)
+        self.log_files = {
+            file_key: os.path.splitext(file_path)[0] + ".log" for file_key, file_path in self.files.items()
         }
+        self.id_counters_file = os.path.join(data_dir, "id_counters.pkl")  # File path for ID counters
+        self.database_file = os.path.join(data_dir, "themepark.db")  # Database used by the "sqlite" mode
 
         # Create data directory if it doesn't exist
-        if not os.path.exists("data"):
-            os.makedirs("data")# Create the "data" director
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)# Create the data directory
+
+        # Segments of the partitioned collections, registered in self.files like collections of their own
+        self.segments = {}  # file_key -> sorted segment keys, e.g. ["tickets/2026-09", "tickets/2026-10"]
+        if storage_mode != "sqlite":
+            for file_key in self.PARTITIONS:
+                self.segments[file_key] = []
+                self.discover_segments(file_key)
+
+        # Block-reserving ID allocator, loads the ID counters from the persistent storage
+        self.id_allocator = IdAllocator(self.id_counters_file, block_size=id_block_size)
+        self.id_counters = self.id_allocator.counters  # Reserved high-water mark per ID type
+
+        # Open the SQLite database when that storage mode is selected
+        self.sqlite = SQLiteBackend(self.database_file) if storage_mode == "sqlite" else None
+
+        # In-process object cache
+        self.cache = {}  # file_key -> (stamp of the stored version, list of objects)
+        self.dirty = set()  # Collections changed in the cache but not written yet
+        # Log records ("add", "upsert", "delete" or "replace") of the unwritten changes per dirty collection,
+        # replayed onto the stored collection at flush so changes by other processes meanwhile are kept
+        self.pending_records = {}
+        self.flush_hooks = {}  # Collection -> callables to run once its buffered changes are written
+        self.key_positions = {}  # file_key -> {primary key: position in the cached list}
+        self.segment_keys = {}  # segment key -> (stamp, primary keys stored in the segment at that stamp)
+        self.write_through = True  # Write every change immediately (see deferred_writes)
+        self.lock = threading.RLock()  # Guards the group-commit timer (collections have their own locks)
 
-        # Load ID counters from the persistent storage
-        self.load_id_counters()
+        # Group commit: changes made within group_commit_window seconds of the first unflushed one are
+        # written together by one durable flush, so the number of fsyncs doesn't grow with the write rate.
+        # A crash loses at most the changes of the current window; flush() forces them out earlier.
+        self.group_commit_window = group_commit_window
+        self.flush_timer = None  # Pending group-commit flush
+        if group_commit_window:
+            atexit.register(self.flush)  # Don't lose the last window on a normal exit
+        self.cache_hits = 0  # Loads served from the cache
+        self.cache_misses = 0  # Loads that had to read storage
+        self.tail_reads = 0  # Loads that only read records appended to a log by another process
+
+        # Several processes (e.g. kiosks) may share the data directory. Every change to a collection
+        # happens under its lock file (data/<collection>.seq), which also holds a change sequence
+        # number that is incremented by each write.
+        self.collection_locks = {}  # collection -> FileLock
+        self.known_sequences = {}  # collection -> sequence number the caller has caught up with (see refresh)
+
+        # Upgrade data written by older versions once, so loading needs no per-object repair
+        if auto_migrate and migrations.needs_upgrade(self):
+            migrations.upgrade(self)
+        if auto_migrate:
+            # Split a collection still stored in one file into its segments once
+            for file_key in self.segments:
+                with self.collection_lock(file_key):
+                    if os.path.exists(self.files[file_key]) or os.path.exists(self.log_files[file_key]):
+                        self.save_data(file_key, self.read_data(file_key), detached=True)
 
     def save_id_counters(self):
         # Save the current state of ID counters to a file for persistence
-        with open("data/id_counters.pkl", "wb") as file:
-            pickle.dump(self.id_counters, file)
+        self.id_allocator.save()
 
     def load_id_counters(self):
-        # Load ID counters from a file, ensuring the admin ID exists
-        if os.path.exists("data/id_counters.pkl"):
-            with open("data/id_counters.pkl", "rb") as file:
-                self.id_counters = pickle.load(file)
-
-        # Ensure admin_id counter is always initialized
-        if "admin_id" not in self.id_counters:
-            self.id_counters["admin_id"] = 1
+        # Reload ID counters from the file (unused IDs of reserved blocks are skipped)
+        self.id_allocator.load()
+        self.id_counters = self.id_allocator.counters
 
     def get_next_id(self, id_type):
-        #Generate the next unique ID for a given type
-        if id_type not in self.id_counters:
-            print(self.id_counters)  # Debug: Print current id_counters state
-            raise ValueError(f"Invalid ID type: {id_type}")
-        current_id = self.id_counters[id_type]  # Get the current ID
-        self.id_counters[id_type] += 1  # Increment the counter
-        self.save_id_counters()  # Save updated counters
-        return int(current_id)  # Return the generated ID
-
-    def load_data(self, file_key):
-        # Load data from the specified file
+        # Generate the next unique ID for a given type (unknown types get a new counter)
+        return int(self.id_allocator.next_id(id_type))
+
+    def reserve_ids(self, id_type, count):
+        # Reserve `count` consecutive IDs with a single write and return them as a range
+        start = self.id_allocator.reserve(id_type, count)
+        return range(start, start + count)
+
+    @locked
+    def load_data(self, file_key, start_date=None, end_date=None):
+        # Load data from the specified collection, served from the cache when nothing changed on disk.
+        # For a partitioned collection an optional date range (inclusive) limits which segments are read.
+        if file_key in self.segments:
+            return self.load_range(file_key, start_date, end_date)
+        return self.detach(self.cached_data(file_key))  # Copies, so callers can't change the cached objects
+
+    @locked
+    def cached_data(self, file_key):
+        # Return the cached list of a collection, reading storage only if the stored version changed
+        if file_key in self.dirty:
+            self.cache_hits += 1
+            return self.cache[file_key][1]  # Unflushed changes are newer than the disk
+        stamp = self.stamp(file_key)  # Taken before reading so a concurrent change is seen next time
+        cached = self.cache.get(file_key)
+        if cached is not None and cached[0] == stamp:
+            self.cache_hits += 1
+            return cached[1]
+        tail_offset = self.log_tail_offset(cached[0], stamp) if cached is not None else None
+        if tail_offset is not None:
+            # Only records were appended since the cached version, apply just those
+            self.tail_reads += 1
+            data = self.apply_log(file_key, cached[1], self.replay_log(file_key, tail_offset))
+            self.set_cache(file_key, stamp, data)
+            return data
+        self.cache_misses += 1
+        data = self.read_data(file_key)
+        self.set_cache(file_key, stamp, data)
+        return data
+
+    def log_tail_offset(self, old_stamp, new_stamp):
+        # Offset of the records appended to a log between two stamps ("log" mode), or None if
+        # the snapshot was rewritten or the log replaced and the collection must be read again
+        if self.storage_mode != "log" or old_stamp is None or old_stamp[0] != new_stamp[0]:
+            return None
+        old_log, new_log = old_stamp[1], new_stamp[1]
+        if new_log is None:
+            return None
+        if old_log is None:
+            return 0  # The log was started after the cached version
+        if old_log[0] != new_log[0] or new_log[2] < old_log[2]:
+            return None
+        return old_log[2]
+
+    def set_cache(self, file_key, stamp, data):
+        # Store a collection in the cache; its key positions are rebuilt on demand
+        self.cache[file_key] = (stamp, data)
+        self.key_positions.pop(file_key, None)
+
+    def read_data(self, file_key):
+        # Read the specified collection from storage, bypassing the cache
+        if file_key in self.segments:
+            return [obj for segment_key in self.segments_between(file_key) for obj in self.read_data(segment_key)]
+        if self.sqlite:
+            return self.sqlite.load(file_key)
+        data = self.load_snapshot(file_key)
+        if self.storage_mode == "log":
+            # Apply the records appended since the last snapshot. A crash between writing a snapshot
+            # and removing the log leaves records the snapshot already holds, so adds replace by key.
+            data = self.apply_log(file_key, data, self.replay_log(file_key), idempotent=True)
+        return data
+
+    def load_snapshot(self, file_key):
+        # Load the full collection file (the snapshot in "log" mode)
         file_path = self.files[file_key]
-        try:
-            if os.path.exists(file_path):
-                with open(file_path, "rb") as file:
-                    return pickle.load(file) # Return deserialized data
-            else:
-                return []  # Return an empty list if the file doesn't exist
-        except (EOFError, pickle.PickleError) as e:
-            print(f"Error reading file {file_path}: {e}") # Handle errors gracefully
-            return []  # Return an empty list if there’s an error
+        if not os.path.exists(file_path):
+            return []  # Return an empty list if the file doesn't exist
+        with open(file_path, "rb") as file:
+            return [obj for chunk in self.read_chunks(file) for obj in chunk]
+
+    def read_chunks(self, file):
+        # Yield the lists pickled one after another in an open collection file. Files are written in
+        # chunks of SNAPSHOT_CHUNK objects; older files hold a single list, or a single object.
+        while True:
+            try:
+                data = pickle.load(file) # Deserialize the data
+            except EOFError:
+                return  # Reached the end of the file
+            except (pickle.PickleError, ValueError, TypeError) as e:
+                print(f"Error reading file {file.name}: {e}") # Handle errors gracefully
+                return
+            yield data if isinstance(data, list) else [data]
+
+    def stream_data(self, file_key):
+        # Iterate over the stored objects of a collection or segment in storage order, holding one
+        # file chunk at a time (plus the log records in "log" mode). The file is opened and the log
+        # read right away, so the objects are those stored now even if the files are replaced later.
+        file_path = self.files[file_key]
+        snapshot = open(file_path, "rb") if os.path.exists(file_path) else None
+        records = self.replay_log(file_key) if self.storage_mode == "log" else []
+        return self.replay_stream(file_key, snapshot, records)
+
+    def replay_stream(self, file_key, snapshot, records):
+        # The objects of an open snapshot file with log records applied as apply_log() does: replaced
+        # objects in place, deleted ones left out, then the added ones (and re-added ones) in log order
+        latest = {}  # key -> last stored object (None: deleted), in the order apply_log would append them
+        moved = set()  # Keys deleted and added again, which apply_log moves to the end
+        for operation, payload in records:
+            if operation == "delete":
+                latest[payload] = None
+                continue
+            key = self.record_key(file_key, payload)
+            if key in latest and latest[key] is None:
+                del latest[key]  # Re-added after a delete: goes after the other objects
+                moved.add(key)
+            latest[key] = payload
+        if snapshot is not None:
+            with snapshot:
+                for chunk in self.read_chunks(snapshot):
+                    for obj in chunk:
+                        key = self.record_key(file_key, obj)
+                        if key in latest and key not in moved:
+                            obj = latest.pop(key)
+                        elif key in moved:
+                            continue
+                        if obj is not None:
+                            yield obj
+        yield from (obj for obj in latest.values() if obj is not None)
+
+    def detach(self, objs):
+        # Copies of objects (one pickle round trip), so the cache never shares an object with a caller:
+        # an object changed after it was given to or got from the DataLayer isn't written by a later save
+        return pickle.loads(pickle.dumps(list(objs), pickle.HIGHEST_PROTOCOL))
 
-    def save_data(self, file_key, data):
-        # Save data to the specified file
+    @locked
+    def save_data(self, file_key, data, detached=False):
+        # Save data to the specified collection; with write-through off it is only marked dirty.
+        # The cache keeps copies of the objects unless they are detached (held by no caller).
+        data = list(data) if detached else self.detach(data)
+        if file_key in self.segments:
+            self.save_segments(file_key, data)
+            return
+        if self.buffering():
+            self.set_cache(file_key, None, data)
+            self.mark_dirty(file_key, [("replace", list(data))])  # A copy, later changes are recorded separately
+            return
+        self.write_data(file_key, data)
+        self.set_cache(file_key, self.stamp(file_key), data)
+
+    def write_data(self, file_key, data):
+        # Write the whole collection to storage
+        self.bump_sequence(file_key)
+        if self.sqlite:
+            self.sqlite.save(file_key, data)
+            return
         file_path = self.files[file_key]  # Get file path
         try:
-            with open(file_path, "wb") as file:
-                pickle.dump(data, file) # Serialize and save data
+            self.atomic_write(file_path, data, chunked=True)
         except pickle.PickleError as e:
             print(f"Error writing to file {file_path}: {e}") # Handle save errors
+            return
+        if self.storage_mode == "log" and os.path.exists(self.log_files[file_key]):
+            # The snapshot now holds every record, so the log can be discarded
+            os.remove(self.log_files[file_key])
+        if "/" in file_key:
+            self.store_keys(file_key, self.stamp(file_key), (self.record_key(file_key, obj) for obj in data))
+
+    def atomic_write(self, file_path, data, chunked=False, durable=True):
+        # Pickle data to a temporary file, fsync it and rename it over the target, so a crash
+        # leaves either the old or the new file and never a truncated one. A chunked list is
+        # pickled as lists of SNAPSHOT_CHUNK objects that read_chunks() reads back one at a time.
+        # Files derived from others (durable=False) skip the fsync; readers must check them.
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path),
+                                                 prefix=os.path.basename(file_path), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                if chunked:
+                    for start in range(0, max(len(data), 1), self.SNAPSHOT_CHUNK):
+                        pickle.dump(data[start:start + self.SNAPSHOT_CHUNK], file) # Serialize the data
+                else:
+                    pickle.dump(data, file) # Serialize the data
+                file.flush()
+                if durable:
+                    os.fsync(file.fileno())
+            os.replace(temp_path, file_path)  # Atomic on POSIX and Windows
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def append_log(self, file_key, records):
+        # Append (operation, payload) records to the collection log without reading it (O(1) per record).
+        # Operations: ("add", obj), ("upsert", obj) replacing the record with the same key, ("delete", key)
+        self.bump_sequence(file_key)
+        keys = self.stored_keys(file_key, self.stamp(file_key)) if "/" in file_key else None
+        with open(self.log_files[file_key], "ab") as file:
+            for record in records:
+                pickle.dump(record, file)
+        if keys is not None:
+            # Keep the segment's keys file current (left stale, and read again later, if it wasn't)
+            added = {self.record_key(file_key, payload) for operation, payload in records if operation != "delete"}
+            deleted = {payload for operation, payload in records if operation == "delete"}
+            self.store_keys(file_key, self.stamp(file_key), (keys | added) - deleted)
+
+    def replay_log(self, file_key, offset=0):
+        # Read back every (operation, payload) record appended to the collection log, in order,
+        # starting at a byte offset (a record boundary)
+        log_path = self.log_files[file_key]
+        records = []
+        if not os.path.exists(log_path):
+            return records
+        with open(log_path, "rb") as file:
+            file.seek(offset)
+            while True:
+                try:
+                    records.append(pickle.load(file))
+                except EOFError:
+                    break  # Reached the end of the log
+                except (pickle.UnpicklingError, ValueError, TypeError) as e:
+                    # A torn record at the tail (e.g. crash mid-append) ends the replay
+                    print(f"Ignoring damaged record in {log_path}: {e}")
+                    break
+        return records
+
+    def apply_log(self, file_key, data, records, idempotent=False):
+        # Apply log records to a loaded collection and return the resulting list. With idempotent
+        # set, an "add" whose key is already there replaces that object like an "upsert".
+        positions = None  # Key -> position, only built if an upsert or delete needs it
+        deleted = False
+        for operation, payload in records:
+            if operation == "add" and not idempotent:
+                data.append(payload)
+                if positions is not None:
+                    positions[self.record_key(file_key, payload)] = len(data) - 1
+                continue
+            if positions is None:
+                positions = self.build_positions(file_key, data)
+            if operation in ("add", "upsert"):
+                key = self.record_key(file_key, payload)
+                if key in positions:
+                    data[positions[key]] = payload
+                else:
+                    data.append(payload)
+                    positions[key] = len(data) - 1
+            elif operation == "delete" and payload in positions:
+                data[positions.pop(payload)] = None  # Removed after the replay so positions stay valid
+                deleted = True
+        return [obj for obj in data if obj is not None] if deleted else data
+
+    @locked
+    def compact(self, file_key):
+        # Fold the collection log back into the snapshot file (one full rewrite)
+        if file_key in self.segments:
+            for segment_key in self.segments_between(file_key):
+                self.compact(segment_key)
+            return
+        self.save_data(file_key, list(self.cached_data(file_key)), detached=True)
+
+    # Object cache
+    def file_stamp(self, file_path):
+        # Identify the current version of a file by inode, modification time and size
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def stamp(self, file_key):
+        # Identify the current stored version of a collection; a different stamp means the cache is stale
+        if self.sqlite:
+            return self.sqlite.data_version()  # Changes when another connection commits
+        if file_key in self.segments:
+            return tuple(self.stamp(segment_key) for segment_key in self.segments_between(file_key))
+        stamp = self.file_stamp(self.files[file_key])
+        if self.storage_mode == "log":
+            return (stamp, self.file_stamp(self.log_files[file_key]))
+        return stamp
+
+    def invalidate(self, file_key):
+        # Drop the cached copy of a collection that was changed behind the cache
+        if file_key in self.segments:
+            for segment_key in self.segments_between(file_key):
+                self.invalidate(segment_key)
+            return
+        if file_key not in self.dirty:
+            self.cache.pop(file_key, None)
+            self.key_positions.pop(file_key, None)
+
+    def flush(self):
+        # Write every dirty collection in one pass and return their keys
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()  # This flush covers the pending group commit
+                self.flush_timer = None
+            flushed = sorted(self.dirty)
+        for collection in sorted({file_key.partition("/")[0] for file_key in flushed}):
+            # A collection's segments are written under its lock, then the flush hooks run in it
+            with self.collection_lock(collection):
+                before = self.sequence(collection)
+                for file_key in flushed:
+                    if file_key.partition("/")[0] != collection or file_key not in self.dirty:
+                        continue  # Another collection, or flushed by another thread meanwhile
+                    # Replay our changes onto the stored collection as it is now, not over it
+                    records = self.pending_records.get(file_key, [])
+                    data = self.replay_pending(file_key, self.read_data(file_key), records)
+                    self.write_data(file_key, data)
+                    self.set_cache(file_key, self.stamp(file_key), data)
+                    self.pending_records.pop(file_key, None)
+                    self.dirty.discard(file_key)
+                for hook in self.flush_hooks.pop(collection, []):
+                    hook(before, self.sequence(collection))
+        return flushed
+
+    def on_flush(self, file_key, hook):
+        # Call hook(sequence before, sequence after) once, when the next flush has written the
+        # collection's buffered changes, with its lock still held (e.g. to store totals derived from them)
+        with self.collection_lock(file_key):
+            self.flush_hooks.setdefault(file_key, []).append(hook)
+
+    def is_dirty(self, file_key):
+        # True if a collection (or one of its segments) has changes not written yet
+        return any(key.partition("/")[0] == file_key for key in self.dirty)
+
+    def replay_pending(self, file_key, data, records):
+        # Apply the unwritten change records of a collection to its stored objects; a "replace"
+        # record (a whole collection saved) supersedes the stored objects and the records before it
+        for position in range(len(records) - 1, -1, -1):
+            if records[position][0] == "replace":
+                data, records = list(records[position][1]), records[position + 1:]
+                break
+        return self.apply_log(file_key, data, records)
+
+    # Cross-process coordination
+    def collection_lock(self, file_key):
+        # Lock file of a collection (segments share their collection's lock), held during every change
+        collection = file_key.partition("/")[0]
+        lock = self.collection_locks.get(collection)
+        if lock is None:
+            # setdefault keeps one lock per collection if two threads get here at once
+            lock = self.collection_locks.setdefault(
+                collection, FileLock(os.path.join(self.data_dir, f"{collection}.seq")))
+        return lock
+
+    def sequence(self, file_key):
+        # Change sequence number of a collection, incremented by every write of any process
+        return self.collection_lock(file_key).read_counter()
+
+    def bump_sequence(self, file_key):
+        # Count a write to a collection. If this process had caught up with the previous number,
+        # it stays caught up, so only writes by other processes show up in changed_collections().
+        lock = self.collection_lock(file_key)
+        collection = file_key.partition("/")[0]
+        with lock:
+            current = lock.read_counter()
+            lock.write_counter(current + 1)
+            if self.known_sequences.get(collection) == current:
+                self.known_sequences[collection] = current + 1
+
+    def changed_collections(self, file_keys):
+        # Return {file_key: sequence number} of the collections written by another process since
+        # the caller last acknowledged them (collections never acknowledged count as changed)
+        changed = {}
+        for file_key in file_keys:
+            current = self.sequence(file_key)
+            if self.known_sequences.get(file_key) != current:
+                changed[file_key] = current
+        return changed
+
+    def acknowledge(self, file_key, sequence):
+        # Record that the caller's copy of a collection reflects the given sequence number
+        self.known_sequences[file_key] = sequence
+
+    def buffering(self):
+        # True if changes go to the cache and are written by a later flush
+        return not self.write_through or bool(self.group_commit_window)
+
+    def mark_dirty(self, file_key, records):
+        # Record an unflushed change and its log records (call with the collection lock held);
+        # in group-commit mode the first one starts the window's flush timer
+        self.pending_records.setdefault(file_key, []).extend(records)
+        self.dirty.add(file_key)
+        with self.lock:
+            if self.write_through and self.group_commit_window and self.flush_timer is None:
+                self.flush_timer = threading.Timer(self.group_commit_window, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+
+    @contextmanager
+    def deferred_writes(self):
+        # Keep changes in the cache inside the block and flush the dirty collections once at the end
+        previous = self.write_through
+        self.write_through = False
+        try:
+            yield self
+        finally:
+            self.write_through = previous
+            if previous:
+                self.flush()
+
+    def get_cache_stats(self):
+        # Report cache hits, misses, log tail reads and the collections waiting to be flushed
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "tail_reads": self.tail_reads,
+                "dirty": sorted(self.dirty)}
 
     def validate_instance(self, obj, cls):
         # Validate that the given object is an instance of a specified class
         if not isinstance(obj, cls):
             raise TypeError(f"Expected an instance of {cls.__name__}, got {type(obj).__name__}.")
 
+    # Primary keys
+    def record_key(self, file_key, obj):
+        # Return the primary key of an object stored in the given collection (or one of its segments)
+        return getattr(obj, self.RECORD_KEYS[file_key.partition("/")[0]])()
+
+    def build_positions(self, file_key, data):
+        # Map each primary key to its position in a collection list (the last copy wins)
+        return {self.record_key(file_key, obj): position for position, obj in enumerate(data)}
+
+    def positions_for(self, file_key):
+        # Key -> position map of the cached collection, built once per cached version
+        data = self.cached_data(file_key)
+        positions = self.key_positions.get(file_key)
+        if positions is None:
+            positions = self.key_positions[file_key] = self.build_positions(file_key, data)
+        return data, positions
+
+    # Date partitions
+    def unpartitioned_key(self, file_key):
+        # Segment key of the collection file written before partitioning
+        return f"{file_key}/{self.UNPARTITIONED}"
+
+    def segment_for(self, file_key, obj):
+        # Segment key holding an object of a partitioned collection (registered if new)
+        segment_key = f"{file_key}/{getattr(obj, self.PARTITIONS[file_key])():%Y-%m}"
+        self.register_segment(segment_key)
+        return segment_key
+
+    def register_segment(self, segment_key, file_path=None):
+        # Add the snapshot and log paths of a segment (data/tickets/2026-10.pkl unless given)
+        if segment_key in self.files:
+            return
+        file_key, _, name = segment_key.partition("/")
+        if file_path is None:
+            directory = os.path.join(self.data_dir, file_key)
+            os.makedirs(directory, exist_ok=True)
+            file_path = os.path.join(directory, f"{name}.pkl")
+            insort(self.segments[file_key], segment_key)
+        self.files[segment_key] = file_path
+        self.log_files[segment_key] = os.path.splitext(file_path)[0] + ".log"
+
+    def discover_segments(self, file_key):
+        # Register the segment files found on disk, including ones created by another process
+        directory = os.path.join(self.data_dir, file_key)
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                month, extension = os.path.splitext(name)
+                if extension in (".pkl", ".log"):
+                    self.register_segment(f"{file_key}/{month}")
+        if os.path.exists(self.files[file_key]) or os.path.exists(self.log_files[file_key]):
+            # Collection file from before partitioning, read as one extra segment until it is split
+            self.register_segment(self.unpartitioned_key(file_key), self.files[file_key])
+
+    def segments_between(self, file_key, start_date=None, end_date=None):
+        # Keys of the segments that can hold objects dated between start_date and end_date (inclusive)
+        self.discover_segments(file_key)
+        first = f"{file_key}/{start_date:%Y-%m}" if start_date else None
+        last = f"{file_key}/{end_date:%Y-%m}" if end_date else None
+        keys = [self.unpartitioned_key(file_key)] if self.unpartitioned_key(file_key) in self.files else []
+        return keys + [
+            segment_key for segment_key in self.segments[file_key]
+            if (first is None or segment_key >= first) and (last is None or segment_key <= last)
+        ]
+
+    def load_range(self, file_key, start_date=None, end_date=None):
+        # Load the objects of a partitioned collection dated between start_date and end_date (inclusive),
+        # reading only the segments of the months in that range
+        data = []
+        for segment_key in self.segments_between(file_key, start_date, end_date):
+            data.extend(self.cached_data(segment_key))
+        if start_date or end_date:
+            getter = self.PARTITIONS[file_key]
+            data = [obj for obj in data
+                    if (start_date is None or getattr(obj, getter)() >= start_date)
+                    and (end_date is None or getattr(obj, getter)() <= end_date)]
+        return self.detach(data)
+
+    def keys_file(self, segment_key):
+        # File holding the primary keys of a segment (data/tickets/2026-10.keys)
+        return os.path.splitext(self.files[segment_key])[0] + ".keys"
+
+    def stored_keys(self, segment_key, stamp):
+        # Primary keys of a segment at a stamp, from memory or its keys file, or None if not known
+        known = self.segment_keys.get(segment_key)
+        if known is not None and known[0] == stamp:
+            return known[1]
+        if stamp in (None, (None, None)):
+            return frozenset()  # Nothing stored in this segment yet
+        try:
+            with open(self.keys_file(segment_key), "rb") as file:
+                stored = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None  # Missing, or cut short by a crash (it is written without fsync)
+        if stored["stamp"] != stamp:
+            return None
+        self.segment_keys[segment_key] = (stamp, stored["keys"])
+        return stored["keys"]
+
+    def store_keys(self, segment_key, stamp, keys):
+        # Remember the primary keys of a segment at a stamp and store them in its keys file. The file
+        # is only trusted while the segment has that stamp, so it doesn't need an fsync.
+        keys = frozenset(keys)
+        self.segment_keys[segment_key] = (stamp, keys)
+        self.atomic_write(self.keys_file(segment_key), {"stamp": stamp, "keys": keys}, durable=False)
+        return keys
+
+    def keys_in(self, segment_key):
+        # Primary keys stored in a segment (call with the collection lock held). Every write of a segment
+        # stores them in its keys file with the segment's new stamp; a segment changed without them (e.g.
+        # by an older version) has its keys read again once.
+        stamp = self.stamp(segment_key)
+        keys = self.stored_keys(segment_key, stamp)
+        if keys is None:
+            keys = self.store_keys(segment_key, stamp,
+                                   (self.record_key(segment_key, obj) for obj in self.cached_data(segment_key)))
+        return keys
+
+    def locate(self, file_key, key):
+        # Segment of a partitioned collection holding a primary key, or None. Only the key sets are
+        # checked (one stat per segment while they're current), so a lookup then reads a single segment.
+        with self.collection_lock(file_key):
+            for segment_key in reversed(self.segments_between(file_key)):
+                if segment_key in self.dirty:
+                    keys = self.positions_for(segment_key)[1]  # Unflushed changes are only in the cache
+                else:
+                    keys = self.keys_in(segment_key)
+                if key in keys:
+                    return segment_key
+        return None
+
+    def group_by_segment(self, file_key, objs):
+        # Split objects of a partitioned collection into {segment key: objects}, keeping their order
+        groups = {}
+        for obj in objs:
+            groups.setdefault(self.segment_for(file_key, obj), []).append(obj)
+        return groups
+
+    def save_segments(self, file_key, data):
+        # Replace a whole partitioned collection: every segment is rewritten from `data`
+        groups = self.group_by_segment(file_key, data)
+        for segment_key in self.segments_between(file_key):
+            if segment_key not in groups and segment_key != self.unpartitioned_key(file_key):
+                self.save_data(segment_key, [], detached=True)  # Objects of this month were all removed
+        for segment_key, objs in groups.items():
+            self.save_data(segment_key, objs, detached=True)
+        unpartitioned = self.unpartitioned_key(file_key)
+        if unpartitioned in self.files:
+            # Every object now lives in its segment, the old single file is no longer needed
+            for path in (self.files[file_key], self.log_files[file_key], self.keys_file(unpartitioned)):
+                if os.path.exists(path):
+                    os.remove(path)
+            del self.files[unpartitioned], self.log_files[unpartitioned]
+            self.cache.pop(unpartitioned, None)
+            self.segment_keys.pop(unpartitioned, None)
+            self.dirty.discard(unpartitioned)
+            self.pending_records.pop(unpartitioned, None)
+
     # CRUD Methods
     def add_object(self, file_key, obj, cls):
         # Add an object to the specified file
-        self.validate_instance(obj, cls)  # Ensure object is valid
-        data = self.load_data(file_key)  # Load existing data
-        data.append(obj)  # Add the new object
-        self.save_data(file_key, data)  # Save updated data
+        self.add_objects(file_key, [obj], cls)
+
+    @locked
+    def add_objects(self, file_key, objs, cls):
+        # Add several objects to the specified file with a single write
+        for obj in objs:
+            self.validate_instance(obj, cls)  # Ensure every object is valid before writing any
+        if file_key in self.segments:
+            # Only the segments of the new objects' months are touched (one write each)
+            for segment_key, group in self.group_by_segment(file_key, objs).items():
+                self.add_objects(segment_key, group, cls)
+            return
+        objs = self.detach(objs)  # The cache keeps copies
+        if not self.buffering() and (self.sqlite or self.storage_mode == "log"):
+            if file_key in self.cache:
+                self.cached_data(file_key)  # Catch up with other processes first (a log tail read)
+            stamp = self.stamp(file_key)
+            if self.sqlite:
+                self.bump_sequence(file_key)
+                self.sqlite.add_many(file_key, objs)  # One transaction
+            else:
+                self.append_log(file_key, [("add", obj) for obj in objs])  # One append
+            cached = self.cache.get(file_key)
+            if cached is not None and cached[0] == stamp:
+                # The cache was current, keep it current
+                positions = self.key_positions.get(file_key)
+                for obj in objs:
+                    cached[1].append(obj)
+                    if positions is not None:
+                        positions[self.record_key(file_key, obj)] = len(cached[1]) - 1
+                self.cache[file_key] = (self.stamp(file_key), cached[1])
+            else:
+                self.invalidate(file_key)
+            return
+        if self.buffering():
+            # Append to the cached list; the flush replays the adds onto the stored collection
+            data, positions = self.positions_for(file_key)
+            for obj in objs:
+                data.append(obj)
+                positions[self.record_key(file_key, obj)] = len(data) - 1
+            self.mark_dirty(file_key, [("add", obj) for obj in objs])
+            return
+        data = list(self.cached_data(file_key))  # Load existing data once (from the cache when possible)
+        data.extend(objs)  # Add the new objects
+        self.save_data(file_key, data, detached=True)  # Save updated data once
+
+    @locked
+    def get_object(self, file_key, key):
+        # Find one object by primary key, or None if it doesn't exist
+        if file_key in self.segments:
+            # The key doesn't tell the month, the stored key sets of the segments do
+            segment_key = self.locate(file_key, key)
+            return self.get_object(segment_key, key) if segment_key is not None else None
+        if self.sqlite and file_key not in self.cache:
+            return self.sqlite.get(file_key, key)  # Primary key lookup without loading the table
+        data, positions = self.positions_for(file_key)
+        position = positions.get(key)
+        return self.detach([data[position]])[0] if position is not None else None
+
+    @locked
+    def upsert(self, file_key, key, obj):
+        # Insert an object or replace the one stored under the same primary key.
+        # "log" mode appends one record and "sqlite" mode replaces one row; "pickle" mode has to
+        # rewrite its single file, but does so from the cache without reloading it.
+        if self.record_key(file_key, obj) != key:
+            raise ValueError(f"Object key does not match {key}.")
+        if file_key in self.segments:
+            # An object stays in the segment of its date, which doesn't change after it is stored
+            return self.upsert(self.segment_for(file_key, obj), key, obj)
+        if self.sqlite and self.write_through and file_key not in self.cache:
+            self.bump_sequence(file_key)
+            self.sqlite.add(file_key, obj)  # Nothing cached to keep in sync, replace the row only
+            return obj
+        stored = self.detach([obj])[0]  # The cache keeps a copy
+        data, positions = self.positions_for(file_key)
+        if key in positions:
+            data[positions[key]] = stored
+        else:
+            data.append(stored)
+            positions[key] = len(data) - 1
+        if self.buffering():
+            self.mark_dirty(file_key, [("upsert", stored)])
+        elif self.sqlite:
+            self.bump_sequence(file_key)
+            self.sqlite.add(file_key, stored)  # INSERT OR REPLACE by primary key
+        elif self.storage_mode == "log":
+            self.append_log(file_key, [("upsert", stored)])
+        else:
+            self.write_data(file_key, data)
+        if file_key not in self.dirty:
+            self.cache[file_key] = (self.stamp(file_key), data)
+        return obj
+
+    @locked
+    def upsert_many(self, file_key, objs):
+        # Insert or replace several objects by primary key with a single write (one per segment)
+        objs = list(objs)
+        if file_key in self.segments:
+            for segment_key, group in self.group_by_segment(file_key, objs).items():
+                self.upsert_many(segment_key, group)
+            return objs
+        if not objs:
+            return objs
+        if self.sqlite and self.write_through and file_key not in self.cache:
+            self.bump_sequence(file_key)
+            self.sqlite.add_many(file_key, objs)  # Nothing cached to keep in sync, replace the rows only
+            return objs
+        stored = self.detach(objs)  # The cache keeps copies
+        data, positions = self.positions_for(file_key)
+        for obj in stored:
+            key = self.record_key(file_key, obj)
+            if key in positions:
+                data[positions[key]] = obj
+            else:
+                data.append(obj)
+                positions[key] = len(data) - 1
+        if self.buffering():
+            self.mark_dirty(file_key, [("upsert", obj) for obj in stored])
+        elif self.sqlite:
+            self.bump_sequence(file_key)
+            self.sqlite.add_many(file_key, stored)  # INSERT OR REPLACE by primary key
+        elif self.storage_mode == "log":
+            self.append_log(file_key, [("upsert", obj) for obj in stored])
+        else:
+            self.write_data(file_key, data)
+        if file_key not in self.dirty:
+            self.cache[file_key] = (self.stamp(file_key), data)
+        return objs
+
+    @locked
+    def update_fields(self, file_key, key, **changes):
+        # Change fields of a stored object through its setters (set_<field>) and persist it by key
+        obj = self.get_object(file_key, key)
+        if obj is None:
+            raise KeyError(key)
+        for field, value in changes.items():
+            setter = getattr(obj, f"set_{field}", None)
+            if setter is None:
+                raise AttributeError(f"{type(obj).__name__} has no field {field}.")
+            setter(value)  # The setter validates the new value
+        return self.upsert(file_key, key, obj)
+
+    def delete_object(self, file_key, key):
+        # Delete one object by primary key; returns True if it existed
+        return self.delete_objects(file_key, [key]) > 0
+
+    @locked
+    def delete_objects(self, file_key, keys):
+        # Delete several objects by primary key with a single write; returns how many existed
+        keys = set(keys)
+        if file_key in self.segments:
+            return sum(self.delete_objects(segment_key, keys) for segment_key in self.segments_between(file_key))
+        if self.sqlite and self.write_through and file_key not in self.cache:
+            self.bump_sequence(file_key)
+            return self.sqlite.delete_many(file_key, keys)  # Nothing cached to keep in sync, delete the rows only
+        data, positions = self.positions_for(file_key)
+        found = [key for key in keys if key in positions]
+        if not found:
+            return 0
+        removed = {positions[key] for key in found}
+        data[:] = [obj for position, obj in enumerate(data) if position not in removed]
+        self.key_positions.pop(file_key, None)  # Positions after the removed ones have shifted
+        if self.buffering():
+            self.mark_dirty(file_key, [("delete", key) for key in found])
+        elif self.sqlite:
+            self.bump_sequence(file_key)
+            self.sqlite.delete_many(file_key, found)
+        elif self.storage_mode == "log":
+            self.append_log(file_key, [("delete", key) for key in found])
+        else:
+            self.write_data(file_key, data)
+        if file_key not in self.dirty:
+            self.cache[file_key] = (self.stamp(file_key), data)
+        return len(found)
 
     def get_all_objects(self, file_key):
         # Retrieve all objects from the specified file
         return self.load_data(file_key)
 
+    def iter_chunks(self, file_key, chunk_size=1000, start_date=None, end_date=None):
+        # Yield the objects of a collection in lists of at most chunk_size, in storage order, without
+        # building the whole collection or filling the cache. Memory holds one chunk plus one chunk of the
+        # collection file (and in "log" mode the latest version of each object in the log), except for
+        # collections with unflushed changes, which are copied from the cache.
+        # A date range only skips the segments (or "sqlite" rows) outside it; callers filter the rest.
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be greater than zero.")
+        if self.sqlite and file_key not in self.dirty:
+            column = None
+            if file_key in self.PARTITIONS and (start_date or end_date):
+                getter = self.PARTITIONS[file_key]
+                column = next(name for name, column_getter in SQLiteBackend.COLLECTIONS[file_key]["columns"].items()
+                              if column_getter == getter)
+            yield from self.sqlite.iter_chunks(file_key, chunk_size, column, start_date or date.min,
+                                               end_date or date.max)
+            return
+        if file_key in self.segments:
+            keys = self.segments_between(file_key, start_date, end_date)
+        else:
+            keys = [file_key]
+        for key in keys:
+            with self.collection_lock(key):
+                # Unflushed changes are newer than the disk
+                objects = self.detach(self.cache[key][1]) if key in self.dirty else self.stream_data(key)
+            chunk = []
+            for obj in objects:
+                chunk.append(obj)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
     # Specialized CRUD Methods
     def save_guest(self, guest):
         # Save a guest object to the persistent storage
@@ -105,24 +933,8 @@ class DataLayer:
         self.add_object("guests", guest, Guest)
 
     def get_all_guests(self):
-        # Retrieve all guest objects and ensure attributes are initialized
-        guests = self.get_all_objects("guests")
-        for guest in guests:
-            # Manually initialize missing attributes to avoid AttributeError
-            if "_guest_id" not in vars(guest):  # Ensure _guest_id is set
-                guest._guest_id = self.get_next_id("guest_id")
-            if "_name" not in vars(guest):  # Ensure name is set
-                guest._name = "Unknown"
-            if "_email" not in vars(guest):  # Ensure email is set
-                guest._email = "unknown@example.com"
-            if "_phone_number" not in vars(guest):  # Ensure phone_number is set
-                guest._phone_number = "000-000-0000"
-            if "_age" not in vars(guest):  # Ensure age is set
-                guest._age = None
-            if "_purchase_history" not in vars(guest):  # Ensure purchase_history is initialized
-                guest._purchase_history = []
-
-        return guests
+        # Retrieve all guest objects (older records are upgraded once by migrations.py)
+        return self.get_all_objects("guests")
 
     def save_ticket(self, ticket):
         # Save a ticket object to persistent storage
@@ -130,14 +942,37 @@ class DataLayer:
             raise ValueError("Ticket must have a valid guest ID as an integer.")
         self.add_object("tickets", ticket, Ticket)
 
-    def get_all_tickets(self):
-        # Retrieve all ticket objects and ensure attributes are initialized
-        tickets = self.get_all_objects("tickets")  # Load tickets from storage
+    def save_tickets(self, tickets):
+        # Save several ticket objects to persistent storage with a single write
         for ticket in tickets:
-            if "_guest_id" not in vars(ticket):  # # Ensure guest ID is set
-                ticket._guest_id = None  # Default value for missing guest ID
-        return tickets
+            if not isinstance(ticket.get_guest_id(), int):  # Validate guest ID
+                raise ValueError("Ticket must have a valid guest ID as an integer.")
+        self.add_objects("tickets", tickets, Ticket)
+
+    def get_all_tickets(self, start_date=None, end_date=None):
+        # Retrieve the ticket objects, optionally only those purchased between two dates (inclusive).
+        # A date range reads only the matching monthly segments (an indexed query in "sqlite" mode).
+        if self.sqlite and (start_date or end_date):
+            return self.sqlite.find_range("tickets", "purchase_date", start_date or date.min, end_date or date.max)
+        return self.load_data("tickets", start_date, end_date)
+
+    def get_guest_by_email(self, email):
+        # Find a guest by email (indexed query in "sqlite" mode)
+        if self.sqlite:
+            guests = self.sqlite.find("guests", "email", email)
+        else:
+            guests = [g for g in self.get_all_guests() if g.get_email() == email]
+        return guests[0] if guests else None
 
+    def get_tickets_for_guest(self, guest_id):
+        # Retrieve the tickets of one guest (indexed query in "sqlite" mode)
+        if self.sqlite:
+            return self.sqlite.find("tickets", "guest_id", guest_id)
+        return [t for t in self.get_all_tickets() if t.get_guest_id() == guest_id]
+
+    def get_tickets_purchased_between(self, start_date, end_date):
+        # Retrieve the tickets purchased between two dates, inclusive (indexed query in "sqlite" mode)
+        return self.get_all_tickets(start_date, end_date)
 
     def save_reservation(self, reservation):
         # Save a reservation object
@@ -152,18 +987,8 @@ class DataLayer:
         self.add_object("admins", admin, Admin)
 
     def get_all_admins(self):
-        # Retrieve all admin objects and ensure attributes are initialized
-        admins = self.get_all_objects("admins")  # Load all admin objects from persistent storage
-        for admin in admins:
-            # `hasattr` checks if the admin object has a specific attribute.
-            # If the attribute doesn't exist, it adds and initializes it to avoid errors.
-            if not hasattr(admin, "_admin_id"):  # Check if `_admin_id` attribute exists
-                admin._admin_id = self.get_next_id("admin_id")  # Initialize `_admin_id` if missing
-            if not hasattr(admin, "_email"):  # Check if `_email` attribute exists
-                admin._email = "unknown@example.com"  # Initialize `_email` if missing
-            if not hasattr(admin, "_name"):  # Check if `_name` attribute exists
-                admin._name = "Unknown Admin"  # Initialize `_name` if missing
-        return admins  # Return the list of admin objects
+        # Retrieve all admin objects (older records are upgraded once by migrations.py)
+        return self.get_all_objects("admins")
 
 
     def save_attraction(self, attraction):
@@ -191,22 +1016,16 @@ class DataLayer:
         return self.get_all_objects("payments")
 
     def update_payment_method(self, payment_id, new_payment_method: PaymentMethod):
-        # Update the payment method for a specific payment
-        payments = self.get_all_payments()
-        for payment in payments:
-            if payment.get_payment_id() == payment_id:  # Find matching payment
-                payment.set_payment_method(new_payment_method)  # Update method
-                self.save_data("payments", payments)  # Save updated payments
-                return payment
-        raise ValueError(f"Payment with ID {payment_id} not found.")  # Raise error if not found
+        # Update the payment method for a specific payment (replaced by primary key)
+        try:
+            return self.update_fields("payments", payment_id, payment_method=new_payment_method)
+        except KeyError:
+            raise ValueError(f"Payment with ID {payment_id} not found.")  # Raise error if not found
 
     def delete_payment(self, payment_id):
         # Delete a payment object by its ID
-        payments = self.get_all_payments()
-        updated_payments = [p for p in payments if p.get_payment_id() != payment_id]  # Exclude matching ID
-        if len(payments) == len(updated_payments):  # No deletion occurred
+        if not self.delete_object("payments", payment_id):  # No deletion occurred
             raise ValueError(f"Payment with ID {payment_id} not found.")
-        self.save_data("payments", updated_payments)  # Save updated payments
 
 
     def save_service(self, service):
@@ -0,0 +1,95 @@
+import heapq  # Min-heap ordered by expiry date
+from contextlib import nullcontext  # For sweeping without buffering the writes
+from models import *  # Import all models
+
+
+class ExpiryIndex:
+    # Active tickets ordered by expiry date (Ticket.get_expiry_date) in a min-heap of
+    # (expiry date, ticket ID), so the tickets that expired by a date are popped in
+    # O(k log n) for k expired tickets instead of checking every ticket.
+    # Cancelled, used or deleted tickets are discarded lazily: their heap entries stay until they
+    # reach the top and are skipped there (the heap is rebuilt if they pile up).
+
+    def __init__(self, tickets=()):
+        self.expiries = {}  # ticket_id -> expiry date of every indexed ticket
+        for ticket in tickets:
+            if ticket.get_status() == TicketStatus.ACTIVE:
+                self.expiries[ticket.get_ticket_id()] = ticket.get_expiry_date()
+        self.heap = [(expiry, ticket_id) for ticket_id, expiry in self.expiries.items()]
+        heapq.heapify(self.heap)  # O(n) instead of n pushes
+
+    def __len__(self):
+        return len(self.expiries)
+
+    def add(self, ticket):
+        # Index a ticket if it is active
+        if ticket.get_status() != TicketStatus.ACTIVE:
+            return
+        expiry = ticket.get_expiry_date()
+        self.expiries[ticket.get_ticket_id()] = expiry
+        heapq.heappush(self.heap, (expiry, ticket.get_ticket_id()))
+
+    def discard(self, ticket_id):
+        # Stop tracking a ticket (its heap entry is skipped later)
+        self.expiries.pop(ticket_id, None)
+        if len(self.heap) > 2 * len(self.expiries) + 64:
+            # Mostly stale entries, rebuild the heap from the tracked tickets
+            self.heap = [(expiry, ticket_id) for ticket_id, expiry in self.expiries.items()]
+            heapq.heapify(self.heap)
+
+    def is_current(self, entry):
+        # True if a heap entry still describes a tracked ticket
+        expiry, ticket_id = entry
+        return self.expiries.get(ticket_id) == expiry
+
+    def next_expiry(self):
+        # Earliest expiry date of the tracked tickets, or None
+        while self.heap and not self.is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_expired(self, today=None):
+        # Remove and return the IDs of the tickets no longer valid on `today` (default today)
+        today = today or date.today()
+        expired = []
+        while self.heap and self.heap[0][0] <= today:
+            entry = heapq.heappop(self.heap)
+            if self.is_current(entry):
+                del self.expiries[entry[1]]
+                expired.append(entry[1])
+        return expired
+
+
+def sweep_expired(data_layer, sales, today=None):
+    # Mark every active ticket whose validity ended by `today` (default today) as expired; returns the
+    # expired tickets. The stored sales aggregates keep an ExpiryIndex of the active tickets, so the expired
+    # ones are popped from its heap and only they are read and changed, by key through update_fields
+    # (one log record or one row each). "pickle" mode rewrites a segment per change, so there the changes
+    # are buffered and each segment holding an expired ticket is written once.
+    today = today or date.today()
+    expired = []
+    with sales.recording():
+        ticket_ids = sales.pop_expired(today)
+        with data_layer.deferred_writes() if data_layer.storage_mode == "pickle" else nullcontext():
+            for ticket_id in ticket_ids:
+                ticket = data_layer.get_object("tickets", ticket_id)
+                if ticket is None or ticket.get_status() != TicketStatus.ACTIVE:
+                    continue  # Changed without updating the index, e.g. by a tool writing tickets directly
+                # Expired tickets still count as sales
+                expired.append(data_layer.update_fields("tickets", ticket_id, status=TicketStatus.EXPIRED))
+    return expired
+
+
+# Entry point of the expiry sweep (e.g. run nightly)
+if __name__ == "__main__":
+    import argparse  # For the command line interface
+    from data_layer import DataLayer
+    from sales_aggregates import SalesAggregates
+
+    parser = argparse.ArgumentParser(description="Mark the tickets past their validity period as expired.")
+    parser.add_argument("--data-dir", default="data", help="Directory holding the data files")
+    parser.add_argument("--storage-mode", default="pickle", choices=DataLayer.STORAGE_MODES)
+    args = parser.parse_args()
+    data_layer = DataLayer(data_dir=args.data_dir, storage_mode=args.storage_mode)
+    expired = sweep_expired(data_layer, SalesAggregates(data_layer))
+    print(f"{len(expired)} tickets expired.")
@@ -0,0 +1,141 @@
+import argparse  # For the command line interface
+import csv  # For CSV output
+import json  # For JSONL output
+import os  # For file operations
+import sys  # For progress messages
+from enum import Enum  # For writing enum values
+from models import *  # Import all models
+from data_layer import DataLayer  # Import the DataLayer for data management
+
+FORMATS = ("csv", "jsonl")  # Supported output formats
+
+# Exported columns of each collection: (column name, getter)
+COLUMNS = {
+    "tickets": [
+        ("ticket_id", "get_ticket_id"),
+        ("guest_id", "get_guest_id"),
+        ("ticket_type", "get_ticket_type"),
+        ("price", "get_price"),
+        ("discount", "get_discount"),
+        ("final_price", "calculate_final_price"),
+        ("validity_period", "get_validity_period"),
+        ("purchase_date", "get_purchase_date"),
+        ("visit_date", "get_visit_date"),
+        ("status", "get_status"),
+    ],
+    "payments": [
+        ("payment_id", "get_payment_id"),
+        ("amount_paid", "get_amount_paid"),
+        ("payment_date", "get_payment_date"),
+        ("payment_method", "get_payment_method"),
+    ],
+    "reservations": [
+        ("reservation_id", "get_reservation_id"),
+        ("reservation_date", "get_reservation_date"),
+        ("guest_id", "get_guest_id"),
+        ("ticket_ids", "get_ticket_ids"),
+        ("total_amount", "calculate_total_amount"),
+        ("payment_id", "get_payment_id"),
+    ],
+}
+
+# Getter of the date the --from/--to filter applies to
+DATE_GETTERS = {
+    "tickets": "get_purchase_date",
+    "payments": "get_payment_date",
+    "reservations": "get_reservation_date",
+}
+
+
+def plain(value):
+    # Convert a field to a value CSV and JSON can hold
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def export(data_layer, collection, output, file_format="csv", start_date=None, end_date=None, offset=0,
+           chunk_size=1000, on_chunk=None):
+    # Stream a collection to an open text file, one chunk of records at a time; returns the number of
+    # rows written. Records are counted in storage order after the date filter and the first `offset`
+    # are skipped, so an interrupted export is resumed by appending with offset = rows already written.
+    # on_chunk(rows written so far) is called after every chunk; if the export fails or is interrupted
+    # the file is cut back to the end of the last complete chunk, so it holds exactly that many rows.
+    if collection not in COLUMNS:
+        raise ValueError(f"Unknown collection: {collection}")
+    if file_format not in FORMATS:
+        raise ValueError(f"Invalid format: {file_format}")
+    if offset < 0:
+        raise ValueError("Offset must not be negative.")
+    columns = COLUMNS[collection]
+    date_getter = DATE_GETTERS[collection]
+    if file_format == "csv":
+        writer = csv.writer(output)
+        if offset == 0:
+            writer.writerow([name for name, _ in columns])
+    skipped = written = 0
+    output.flush()
+    complete = output.tell()  # End of the last complete chunk in the file
+    try:
+        for chunk in data_layer.iter_chunks(collection, chunk_size, start_date, end_date):
+            rows = []
+            for obj in chunk:
+                day = getattr(obj, date_getter)()
+                if (start_date and day < start_date) or (end_date and day > end_date):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                rows.append([plain(getattr(obj, getter)()) for _, getter in columns])
+            if file_format == "csv":
+                writer.writerows([[" ".join(map(str, value)) if isinstance(value, list) else value
+                                   for value in row] for row in rows])
+            else:
+                output.writelines(json.dumps(dict(zip((name for name, _ in columns), row))) + "\n" for row in rows)
+            output.flush()
+            complete, written = output.tell(), written + len(rows)
+            if on_chunk:
+                on_chunk(written)
+    except BaseException:
+        # Rows of an unfinished chunk may have reached the file; cut them off so the file holds
+        # exactly the `written` rows reported and a resume from that offset doesn't repeat them
+        output.seek(complete)
+        output.truncate()
+        raise
+    return written
+
+
+def main(collection, output_path, file_format, start_date, end_date, offset, chunk_size, data_dir, storage_mode):
+    # Export a collection to a file, appending when resuming from an offset
+    data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+    progress = [0]  # Rows written so far, reported if the export is interrupted
+    with open(output_path, "a" if offset else "w", newline="" if file_format == "csv" else None,
+              encoding="utf-8") as output:
+        try:
+            written = export(data_layer, collection, output, file_format, start_date, end_date, offset, chunk_size,
+                             on_chunk=lambda rows: progress.__setitem__(0, rows))
+        except KeyboardInterrupt:
+            print(f"Interrupted after {progress[0]} rows, resume with --offset {offset + progress[0]}", file=sys.stderr)
+            return 130
+    print(f"Exported {written} {collection} to {output_path} (next resume offset: {offset + written})")
+    return 0
+
+
+# Entry point of the exporter
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream tickets, payments or reservations to CSV or JSONL.")
+    parser.add_argument("collection", choices=sorted(COLUMNS))
+    parser.add_argument("output", help="Output file (.csv or .jsonl)")
+    parser.add_argument("--format", choices=FORMATS, help="Output format (default: from the output file extension)")
+    parser.add_argument("--from", dest="start_date", type=date.fromisoformat, help="First date to export (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end_date", type=date.fromisoformat, help="Last date to export (YYYY-MM-DD)")
+    parser.add_argument("--offset", type=int, default=0, help="Skip this many rows and append (resume an export)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records read and written at a time")
+    parser.add_argument("--data-dir", default="data", help="Directory holding the data files")
+    parser.add_argument("--storage-mode", default="pickle", choices=DataLayer.STORAGE_MODES)
+    args = parser.parse_args()
+    file_format = args.format or ("jsonl" if os.path.splitext(args.output)[1].lower() in (".jsonl", ".json") else "csv")
+    raise SystemExit(main(args.collection, args.output, file_format, args.start_date, args.end_date, args.offset,
+                          args.chunk_size, args.data_dir, args.storage_mode))
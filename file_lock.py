@@ -0,0 +1,75 @@
+import os  # For file operations
+import threading  # For serializing the threads of this process
+
+try:
+    import fcntl  # POSIX advisory file locks
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt  # Windows byte-range locks
+
+
+class FileLock:
+    # Exclusive lock shared between processes through a lock file, and between the threads of this
+    # process through an RLock. The first 8 bytes of the file can hold a counter (see read_counter /
+    # write_counter), e.g. a change sequence number. Re-entrant for the thread holding it.
+    LOCK_OFFSET = 16  # Byte locked on Windows, past the counter so it stays readable
+
+    def __init__(self, path):
+        self.path = path  # Path of the lock file (created on first use)
+        self.fd = None  # Open descriptor while the lock is held
+        self.depth = 0  # Nesting depth of acquire() calls by the holding thread
+        self.thread_lock = threading.RLock()  # Held by the thread that holds the file lock
+        self.owner = None  # Ident of the thread holding the lock
+
+    def acquire(self):
+        # Block until this thread holds the lock
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    os.lseek(fd, self.LOCK_OFFSET, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            except BaseException:
+                os.close(fd)
+                self.thread_lock.release()
+                raise
+            self.fd = fd
+            self.owner = threading.get_ident()
+        self.depth += 1
+
+    def release(self):
+        # Release one level of the lock; the file is unlocked when the outermost level ends
+        self.depth -= 1
+        if self.depth == 0:
+            fd, self.fd, self.owner = self.fd, None, None
+            if not fcntl:
+                os.lseek(fd, self.LOCK_OFFSET, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            os.close(fd)  # Closing the descriptor also drops the flock
+        self.thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def read_counter(self):
+        # Read the counter stored in the lock file (0 if it was never written)
+        if self.owner == threading.get_ident():  # Holding the lock, read through its descriptor
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            return int.from_bytes(os.read(self.fd, 8).ljust(8, b"\0"), "little")
+        try:
+            with open(self.path, "rb") as file:
+                return int.from_bytes(file.read(8).ljust(8, b"\0"), "little")
+        except FileNotFoundError:
+            return 0
+
+    def write_counter(self, value):
+        # Store a new counter value (the lock must be held)
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        os.write(self.fd, value.to_bytes(8, "little"))
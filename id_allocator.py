@@ -0,0 +1,87 @@
+import pickle  # For data serialization and deserialization
+import os  # For file operations
+import threading  # For serializing allocations between threads
+from file_lock import FileLock  # For serializing reservations between processes
+
+
+class IdAllocator:
+    # Hands out unique IDs per type ("guest_id", "ticket_id", ...) from blocks reserved on disk.
+    # The counters file stores, per type, the first ID that has not been reserved yet. Reserving a
+    # block moves that mark forward with one durable write, and the IDs inside the block are then
+    # served from memory. IDs left in a block when the process stops are skipped, never reused.
+    DEFAULT_COUNTERS = ("guest_id", "ticket_id", "reservation_id", "payment_id", "admin_id",
+                        "attraction_id", "event_id", "service_id")
+
+    def __init__(self, counters_file, block_size=100):
+        if block_size < 1:
+            raise ValueError("Block size must be at least 1.")
+        self.counters_file = counters_file  # File holding the reserved high-water marks
+        self.block_size = block_size  # Number of IDs reserved per durable write
+        self.counters = {}  # id_type -> first ID not yet reserved on disk
+        self.blocks = {}  # id_type -> [next ID to hand out, end of the reserved block]
+        self.lock = threading.Lock()  # Protects counters and blocks
+        self.file_lock = FileLock(counters_file + ".lock")  # Serializes reservations of all processes
+        self.load()
+
+    def load(self):
+        # Load the reserved high-water marks and drop any in-memory blocks
+        counters = self.read_counters()
+        for id_type in self.DEFAULT_COUNTERS:
+            counters.setdefault(id_type, 1)  # Seed the known ID types
+        self.counters = counters
+        self.blocks = {}
+
+    def read_counters(self):
+        # Read the high-water marks currently stored on disk
+        if not os.path.exists(self.counters_file):
+            return {}
+        with open(self.counters_file, "rb") as file:
+            return pickle.load(file)
+
+    def save(self):
+        # Durably replace the counters file (temp file + fsync + rename)
+        with self.file_lock:
+            temp_path = self.counters_file + ".tmp"
+            with open(temp_path, "wb") as file:
+                pickle.dump(self.counters, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.counters_file)
+
+    def validate_id_type(self, id_type):
+        # ID types are names such as "guest_id"; unseen types get a new counter
+        if not isinstance(id_type, str) or not id_type.endswith("_id"):
+            raise ValueError(f"Invalid ID type: {id_type}")
+
+    def reserve(self, id_type, count):
+        # Reserve `count` consecutive IDs with one durable write and return the first one
+        self.validate_id_type(id_type)
+        if count < 1:
+            raise ValueError("Count must be at least 1.")
+        with self.lock:
+            return self._reserve(id_type, count)
+
+    def _reserve(self, id_type, count):
+        # Move the on-disk mark forward; the caller must hold the lock.
+        # Another allocator (possibly in another process) may have reserved since we loaded, so start
+        # from the higher mark; the file lock keeps the read and the write together.
+        with self.file_lock:
+            stored = self.read_counters()
+            for other_type, mark in stored.items():
+                self.counters[other_type] = max(self.counters.get(other_type, 1), mark)  # Don't write back older marks
+            start = int(self.counters.get(id_type, 1))
+            self.counters[id_type] = start + count
+            self.save()
+        return start
+
+    def next_id(self, id_type):
+        # Return the next ID for a type, reserving a new block only when the current one is used up
+        self.validate_id_type(id_type)
+        with self.lock:
+            block = self.blocks.get(id_type)
+            if block is None or block[0] >= block[1]:
+                start = self._reserve(id_type, self.block_size)
+                block = self.blocks[id_type] = [start, start + self.block_size]
+            current_id = block[0]
+            block[0] += 1
+            return current_id
@@ -0,0 +1,210 @@
+import argparse  # For the command line interface
+import csv  # For CSV input
+import json  # For JSONL input
+import os  # For file operations
+import sys  # For reporting rejected rows
+import time  # For the rows/second report
+from contextlib import nullcontext  # Stand-in for deferred_indexes outside "sqlite" mode
+from models import *  # Import all models
+from data_layer import DataLayer  # Import the DataLayer for data management
+from sales_aggregates import SalesAggregates  # Stored ticket sales totals
+
+
+def read_rows(path):
+    # Yield the rows of a CSV (header row first) or JSONL file as dicts, one at a time
+    with open(path, newline="", encoding="utf-8") as file:
+        if os.path.splitext(path)[1].lower() in (".jsonl", ".json"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(file)
+
+
+def parse_enum(enum, value, name):
+    # Enum member from its value ("Single-Day") or name ("SINGLE_DAY")
+    try:
+        return enum(value)
+    except ValueError:
+        if isinstance(value, str) and value.upper() in enum.__members__:
+            return enum[value.upper()]
+        raise ValueError(f"Invalid {name}: {value!r}")
+
+
+def parse_date(value, name):
+    # Date from an ISO string, or None for an empty value
+    if value in (None, ""):
+        return None
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value!r}")
+
+
+class BulkImporter:
+    # Loads historical guests and tickets (e.g. from the old ticketing system) without going through
+    # BusinessLogic, which writes once per record. Rows are validated a batch at a time and every
+    # valid row of a batch gets its ID from one reserved block. The objects are held until commit(),
+    # which writes each collection once (one write per monthly ticket segment), builds the SQLite
+    # indexes once at the end and updates the sales totals. Rejected rows are recorded with their
+    # row number and don't stop the import.
+    # Tickets refer to guests by the guest_id column of the imported guest rows (the old system's IDs).
+
+    def __init__(self, data_layer, batch_size=10000):
+        if batch_size <= 0:
+            raise ValueError("Batch size must be greater than zero.")
+        self.data_layer = data_layer  # DataLayer receiving the imported objects
+        self.batch_size = batch_size  # Rows validated and given IDs together
+        self.guests = []  # Validated guests waiting for commit()
+        self.tickets = []  # Validated tickets waiting for commit()
+        self.guest_ids = {}  # guest_id in the source data -> new guest ID
+        self.errors = []  # (source, row number, message) of every rejected row
+        self.rows_read = 0  # Rows read from all sources
+        self.started = time.perf_counter()  # For the rows/second report
+
+    def batches(self, rows):
+        # Group rows into lists of (row number, row) of at most batch_size
+        batch = []
+        for number, row in enumerate(rows, start=1):
+            self.rows_read += 1
+            batch.append((number, row))
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def validate(self, batch, parse, source):
+        # Parse every row of a batch, recording the rejected ones; returns the parsed valid rows
+        valid = []
+        for number, row in batch:
+            try:
+                valid.append(parse(row))
+            except (ValueError, TypeError, KeyError) as e:
+                self.errors.append((source, number, str(e)))
+        return valid
+
+    def parse_guest(self, row):
+        # (source guest ID, Guest fields) of a guest row
+        name = str(row.get("name") or "").strip()
+        email = str(row.get("email") or "").strip()
+        if not name:
+            raise ValueError("Name is required.")
+        if "@" not in email:
+            raise ValueError(f"Invalid email: {email!r}")
+        age = row.get("age")
+        fields = {"name": name, "email": email, "phone_number": str(row.get("phone") or "").strip(),
+                  "age": int(age) if age not in (None, "") else None}
+        return str(row.get("guest_id") or ""), fields
+
+    def parse_ticket(self, row):
+        # Ticket fields of a ticket row
+        source_guest_id = str(row.get("guest_id") or "")
+        if source_guest_id not in self.guest_ids:
+            raise ValueError(f"Unknown guest: {source_guest_id!r}")
+        ticket_type = parse_enum(TicketType, row.get("ticket_type"), "ticket type")
+        price = float(row["price"])
+        if price < 0:
+            raise ValueError("Price must be non-negative.")
+        discount = float(row.get("discount") or 0)
+        if not 0 <= discount <= 100:
+            raise ValueError("Discount must be between 0 and 100.")
+        validity_period = row.get("validity_period")
+        return {
+            "ticket_type": ticket_type,
+            "price": price,
+            "discount": discount,
+            "validity_period": (int(validity_period) if validity_period not in (None, "")
+                                else Ticket.TICKET_DETAILS[ticket_type]["validity_period"]),
+            "guest_id": self.guest_ids[source_guest_id],
+            "purchase_date": parse_date(row.get("purchase_date"), "purchase date") or date.today(),
+            "visit_date": parse_date(row.get("visit_date"), "visit date"),
+            "status": parse_enum(TicketStatus, row.get("status") or "Active", "status"),
+        }
+
+    def import_guests(self, rows, source="guests"):
+        # Validate guest rows and give them new IDs; returns how many were accepted
+        accepted = 0
+        for batch in self.batches(rows):
+            valid = self.validate(batch, self.parse_guest, source)
+            if not valid:
+                continue
+            for (source_id, fields), guest_id in zip(valid, self.data_layer.reserve_ids("guest_id", len(valid))):
+                self.guests.append(Guest(guest_id, **fields))
+                if source_id:
+                    self.guest_ids[source_id] = guest_id
+            accepted += len(valid)
+        return accepted
+
+    def import_tickets(self, rows, source="tickets"):
+        # Validate ticket rows and give them new IDs; returns how many were accepted
+        accepted = 0
+        for batch in self.batches(rows):
+            valid = self.validate(batch, self.parse_ticket, source)
+            if not valid:
+                continue
+            for fields, ticket_id in zip(valid, self.data_layer.reserve_ids("ticket_id", len(valid))):
+                ticket = Ticket(fields["ticket_type"], fields["price"], fields["validity_period"],
+                                discount=fields["discount"], guest_id=fields["guest_id"], ticket_id=ticket_id,
+                                visit_date=fields["visit_date"])
+                ticket.set_purchase_date(fields["purchase_date"])
+                ticket.set_status(fields["status"])
+                self.tickets.append(ticket)
+            accepted += len(valid)
+        return accepted
+
+    def deferred_indexes(self, file_key):
+        # Build the SQLite indexes once after the load ("sqlite" mode only)
+        return self.data_layer.sqlite.deferred_indexes(file_key) if self.data_layer.sqlite else nullcontext()
+
+    def commit(self):
+        # Write the accepted guests and tickets, each collection once; returns the report
+        if self.guests:
+            with self.deferred_indexes("guests"):
+                self.data_layer.add_objects("guests", self.guests, Guest)
+        if self.tickets:
+            with self.deferred_indexes("tickets"), SalesAggregates(self.data_layer).recording() as sales:
+                self.data_layer.add_objects("tickets", self.tickets, Ticket)
+                sales.add(self.tickets)
+        report = self.report()
+        self.guests, self.tickets = [], []
+        return report
+
+    def report(self):
+        # Counts and throughput of the import so far
+        seconds = time.perf_counter() - self.started
+        return {
+            "guests": len(self.guests),
+            "tickets": len(self.tickets),
+            "rejected": len(self.errors),
+            "seconds": seconds,
+            "rows_per_second": self.rows_read / seconds if seconds else 0.0,
+        }
+
+
+def main(guests_path, tickets_path, data_dir, storage_mode, batch_size):
+    # Import the guest and ticket files and print the report
+    importer = BulkImporter(DataLayer(data_dir=data_dir, storage_mode=storage_mode), batch_size)
+    if guests_path:
+        importer.import_guests(read_rows(guests_path), os.path.basename(guests_path))
+    if tickets_path:
+        importer.import_tickets(read_rows(tickets_path), os.path.basename(tickets_path))
+    report = importer.commit()
+    for source, number, message in importer.errors[:20]:
+        print(f"{source} row {number}: {message}", file=sys.stderr)
+    print(f"Imported {report['guests']} guests and {report['tickets']} tickets in {report['seconds']:.1f} s "
+          f"({report['rows_per_second']:.0f} rows/s), {report['rejected']} rows rejected")
+    return 0
+
+
+# Entry point of the importer
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import guests and tickets from CSV or JSONL files.")
+    parser.add_argument("--guests", help="Guest file (columns: guest_id, name, email, phone, age)")
+    parser.add_argument("--tickets", help="Ticket file (columns: guest_id, ticket_type, price, discount, "
+                                          "validity_period, purchase_date, visit_date, status)")
+    parser.add_argument("--data-dir", default="data", help="Directory holding the data files")
+    parser.add_argument("--storage-mode", default="pickle", choices=DataLayer.STORAGE_MODES)
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows validated and given IDs together")
+    args = parser.parse_args()
+    raise SystemExit(main(args.guests, args.tickets, args.data_dir, args.storage_mode, args.batch_size))
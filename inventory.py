@@ -0,0 +1,84 @@
+import os  # For file operations
+import pickle  # For reading the stored capacities
+from datetime import timedelta  # For stepping through a date range
+from models import *  # Import all models
+
+
+class DailyInventory:
+    # Park attendance per visit date: a default number of tickets per day, with overrides for
+    # single dates (e.g. holidays), stored in data/park_capacity.pkl. The tickets sold per visit
+    # date come from the "visit" table of the stored sales totals, which is updated with every
+    # ticket insert, cancel and delete, so the tickets left for a date are two dict lookups
+    # instead of a pass over the tickets.
+
+    def __init__(self, data_layer, sales):
+        self.data_layer = data_layer  # DataLayer whose data directory and locks are used
+        self.sales = sales  # SalesAggregates counting the tickets per visit date
+        self.file_path = os.path.join(data_layer.data_dir, "park_capacity.pkl")  # Stored capacities
+        self.stamp = None  # Stamp of the stored file the capacities were read from or written to
+        self.capacities = {"default": None, "dates": {}}  # Tickets per day (None: not limited), overrides by date
+
+    def read(self):
+        # Pick up the capacities stored by this or another process
+        with self.data_layer.collection_lock("park_capacity"):
+            stamp = self.data_layer.file_stamp(self.file_path)
+            if stamp is not None and stamp != self.stamp:
+                with open(self.file_path, "rb") as file:
+                    self.capacities = pickle.load(file)
+                self.stamp = stamp
+
+    def capacity(self, visit_date):
+        # Tickets that can be sold for a date, or None if not limited
+        self.read()
+        return self.capacities["dates"].get(visit_date, self.capacities["default"])
+
+    def set_capacity(self, capacity, visit_date=None):
+        # Set the tickets per day, or for one date only (capacity None: back to the default / no limit)
+        if capacity is not None:
+            Attraction.check_capacity(capacity)
+        with self.data_layer.collection_lock("park_capacity"):
+            self.read()
+            if visit_date is None:
+                self.capacities["default"] = capacity
+            elif capacity is None:
+                self.capacities["dates"].pop(visit_date, None)
+            else:
+                self.capacities["dates"][visit_date] = capacity
+            self.data_layer.atomic_write(self.file_path, self.capacities)
+            self.stamp = self.data_layer.file_stamp(self.file_path)
+
+    def sold(self, visit_date):
+        # Tickets sold (and not cancelled) for a date
+        with self.data_layer.collection_lock("tickets"):
+            self.sales.load()
+            return self.sales.totals["visit"].get(visit_date, (0, 0.0))[0]
+
+    def remaining(self, visit_date):
+        # Tickets left for a date, or None if not limited (a lowered capacity can leave none)
+        capacity = self.capacity(visit_date)
+        return None if capacity is None else max(capacity - self.sold(visit_date), 0)
+
+    def check(self, visit_date, quantity):
+        # Raise ValueError unless `quantity` more tickets can be sold for a date. Call it inside
+        # SalesAggregates.recording() so no other sale for the date can come in between.
+        if visit_date is None:
+            return
+        remaining = self.remaining(visit_date)
+        if remaining is not None and quantity > remaining:
+            raise ValueError(f"Only {remaining} tickets left for {visit_date.isoformat()}.")
+
+    def calendar(self, start_date, end_date):
+        # (date, tickets sold, capacity, tickets left) for every day from start_date to end_date
+        self.read()
+        default, dates = self.capacities["default"], self.capacities["dates"]
+        rows = []
+        with self.data_layer.collection_lock("tickets"):
+            self.sales.load()
+            visits = self.sales.totals["visit"]
+            day = start_date
+            while day <= end_date:
+                sold = visits.get(day, (0, 0.0))[0]
+                capacity = dates.get(day, default)
+                rows.append((day, sold, capacity, None if capacity is None else max(capacity - sold, 0)))
+                day += timedelta(days=1)
+        return rows
@@ -0,0 +1,41 @@
+import argparse  # For the command line interface
+from data_layer import DataLayer  # Import the DataLayer for data management
+import migrations  # Schema upgrades applied to the imported objects
+
+
+def migrate(source_dir="data", target_dir=None):
+    # Import every .pkl collection (plus any append-only log) from source_dir into the SQLite database
+    target_dir = target_dir or source_dir
+    # Reads the .pkl snapshot and any .log records; the source files are left untouched
+    source = DataLayer(data_dir=source_dir, storage_mode="log", auto_migrate=False)
+    target = DataLayer(data_dir=target_dir, storage_mode="sqlite")
+    source_versions = migrations.load_versions(source)
+
+    counts = {}
+    for file_key in source.RECORD_KEYS:  # Collections only, the ticket segments are read through "tickets"
+        # Upgrade older objects in memory to the current schema before importing them (this also gives
+        # repeated legacy ticket IDs new ones, see migrations.upgrade_tickets_v3)
+        records = source.read_data(file_key)
+        for migration in migrations.MIGRATIONS.get(file_key, [])[source_versions.get(file_key, 0):]:
+            records = migration(source, records)
+        target.save_data(file_key, records)  # One transaction per table
+        counts[file_key] = len(records)
+
+    if target_dir != source_dir:
+        # Carry the ID counters over so new IDs don't clash with imported ones
+        for id_type, next_id in source.id_counters.items():
+            target.id_counters[id_type] = max(target.id_counters.get(id_type, 1), next_id)
+        target.save_id_counters()
+    target.sqlite.close()
+    return counts
+
+
+# Entry point of the migration tool
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the pickle data files into the SQLite database.")
+    parser.add_argument("--source", default="data", help="Directory holding the .pkl files")
+    parser.add_argument("--target", default=None, help="Directory for themepark.db (defaults to --source)")
+    args = parser.parse_args()
+
+    for file_key, count in migrate(args.source, args.target).items():
+        print(f"{file_key}: {count} records imported")
@@ -0,0 +1,210 @@
+import argparse  # For the command line interface
+import os  # For file operations
+import pickle  # For data serialization and deserialization
+from file_lock import FileLock  # For letting one process at a time run the migrations
+from models import *  # Import all models
+
+
+# Each migration upgrades the stored objects of one collection from version N-1 to version N.
+# Migrations run once per data directory; the reached versions are recorded in schema_version.pkl,
+# so loading data afterwards needs no per-object repair. To change a model's stored attributes,
+# bump its SCHEMA_VERSION in models.py and append the matching migration below.
+
+def fill_missing(obj, defaults):
+    # Set every attribute in `defaults` that the object doesn't have yet
+    for attribute, default in defaults.items():
+        if not hasattr(obj, attribute):
+            setattr(obj, attribute, default() if callable(default) else default)
+
+
+def deduplicate(data_layer, file_key, objects):
+    # Keep one copy per primary key (the last one written, at the position of the first)
+    latest = {}
+    for obj in objects:
+        latest[data_layer.record_key(file_key, obj)] = obj
+    return list(latest.values())
+
+
+def upgrade_guests_v1(data_layer, guests):
+    # Fill attributes missing from old guests, then drop the copies appended by old updates
+    for guest in guests:
+        fill_missing(guest, {
+            "_guest_id": lambda: data_layer.get_next_id("guest_id"),
+            "_name": "Unknown",
+            "_email": "unknown@example.com",
+            "_phone_number": "000-000-0000",
+            "_age": None,
+            "_purchase_history": list,
+        })
+    return deduplicate(data_layer, "guests", guests)
+
+
+def upgrade_tickets_v1(data_layer, tickets):
+    # Fill attributes missing from old tickets
+    for ticket in tickets:
+        fill_missing(ticket, {"_guest_id": None, "_visit_date": None})
+    return tickets
+
+
+def upgrade_tickets_v2(data_layer, tickets):
+    # Tickets sold before the versioned price list don't know their version
+    for ticket in tickets:
+        fill_missing(ticket, {"_price_list_version": None})
+    return tickets
+
+
+def upgrade_tickets_v3(data_layer, tickets):
+    # Older tickets used id(self) as their ID, which can repeat between runs. Keyed upserts and deletes
+    # and the log replay need unique IDs, so every repeat after the first ticket gets a new ID.
+    seen_ids = set()
+    for ticket in tickets:
+        if ticket.get_ticket_id() in seen_ids:
+            ticket.set_ticket_id(data_layer.get_next_id("ticket_id"))
+        seen_ids.add(ticket.get_ticket_id())
+    return tickets
+
+
+def upgrade_reservations_v1(data_layer, reservations):
+    # Drop the reservation copies appended by old payment processing
+    return deduplicate(data_layer, "reservations", reservations)
+
+
+def upgrade_reservations_v2(data_layer, reservations):
+    # Store ticket, guest, payment and admin IDs instead of the embedded objects
+    for reservation in reservations:
+        state = vars(reservation)
+        tickets = state.get("_tickets") or []
+        guest, admin, payment = state.get("_guest"), state.get("_admin"), state.get("_payment")
+        if isinstance(admin, Guest):  # Old make_reservation passed the guest in as the admin
+            guest, admin = guest or admin, None
+        reservation._guest, reservation._admin = guest, admin
+        reservation._ticket_ids = [ticket.get_ticket_id() for ticket in tickets]
+        reservation._guest_id = guest.get_guest_id() if guest else None
+        reservation._admin_id = admin.get_admin_id() if admin else None
+        reservation._payment_id = payment.get_payment_id() if payment else None
+        reservation._total_amount = state.get("_total_amount", Reservation.sum_ticket_prices(tickets))
+        state.setdefault("_resolver", None)
+    return reservations
+
+
+def upgrade_admins_v1(data_layer, admins):
+    # Fill attributes missing from old admins
+    for admin in admins:
+        fill_missing(admin, {
+            "_admin_id": lambda: data_layer.get_next_id("admin_id"),
+            "_email": "unknown@example.com",
+            "_name": "Unknown Admin",
+        })
+    return admins
+
+
+def upgrade_attractions_v1(data_layer, attractions):
+    # Attractions stored before capacity tracking have no capacity limit
+    for attraction in attractions:
+        fill_missing(attraction, {"_capacity": None, "_slot_capacities": dict})
+    return attractions
+
+
+def upgrade_attractions_v2(data_layer, attractions):
+    # Attractions stored before the scheduler have no time slots
+    for attraction in attractions:
+        fill_missing(attraction, {"_time_slots": list})
+    return attractions
+
+
+def upgrade_events_v1(data_layer, events):
+    # Turn the free-text event dates into datetimes; text that isn't a date leaves the event unscheduled
+    for event in events:
+        fill_missing(event, {"_duration_minutes": 60})
+        try:
+            event._event_date = Event.parse_datetime(getattr(event, "_event_date", None))
+        except ValueError:
+            event._event_date = None
+    return events
+
+
+# Migrations per collection, in version order (index 0 upgrades to version 1)
+MIGRATIONS = {
+    "guests": [upgrade_guests_v1],
+    "tickets": [upgrade_tickets_v1, upgrade_tickets_v2, upgrade_tickets_v3],
+    "reservations": [upgrade_reservations_v1, upgrade_reservations_v2],
+    "admins": [upgrade_admins_v1],
+    "attractions": [upgrade_attractions_v1, upgrade_attractions_v2],
+    "events": [upgrade_events_v1],
+}
+
+# Model class whose SCHEMA_VERSION each migrated collection must reach
+SCHEMA_CLASSES = {"guests": Guest, "tickets": Ticket, "reservations": Reservation, "admins": Admin,
+                  "attractions": Attraction, "events": Event}
+
+
+def version_file(data_layer):
+    # Path of the file recording the schema version reached by each collection
+    # (the SQLite database keeps its own record, the file modes share theirs)
+    file_name = "schema_version_sqlite.pkl" if data_layer.sqlite else "schema_version.pkl"
+    return os.path.join(data_layer.data_dir, file_name)
+
+
+def load_versions(data_layer):
+    # Load the recorded schema versions (0 for collections never migrated)
+    path = version_file(data_layer)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def save_versions(data_layer, versions):
+    # Durably record the schema versions (temp file + fsync + rename)
+    temp_path = version_file(data_layer) + ".tmp"
+    with open(temp_path, "wb") as file:
+        pickle.dump(versions, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, version_file(data_layer))
+
+
+def needs_upgrade(data_layer):
+    # True if any collection is below the schema version of its model class
+    versions = load_versions(data_layer)
+    return any(versions.get(file_key, 0) < cls.SCHEMA_VERSION for file_key, cls in SCHEMA_CLASSES.items())
+
+
+def upgrade(data_layer):
+    # Run the pending migrations of every collection and return {file_key: (old version, new version)}.
+    # Processes sharing the data directory take turns; later ones find the versions already recorded.
+    with FileLock(version_file(data_layer) + ".lock"):
+        versions = load_versions(data_layer)
+        upgraded = {}
+        for file_key, cls in SCHEMA_CLASSES.items():
+            current = versions.get(file_key, 0)
+            target = cls.SCHEMA_VERSION
+            if current >= target:
+                continue
+            with data_layer.collection_lock(file_key):
+                data = data_layer.read_data(file_key)  # Raw stored objects, bypassing the cache
+                if data:
+                    for migration in MIGRATIONS[file_key][current:target]:
+                        data = migration(data_layer, data)
+                    data_layer.save_data(file_key, data)  # One rewrite per upgraded collection
+            versions[file_key] = target
+            save_versions(data_layer, versions)  # Recorded per collection so a crash resumes where it stopped
+            upgraded[file_key] = (current, target)
+    return upgraded
+
+
+# Entry point of the migration command
+if __name__ == "__main__":
+    from data_layer import DataLayer  # Imported here because DataLayer runs pending migrations itself
+
+    parser = argparse.ArgumentParser(description="Upgrade stored data to the current schema versions.")
+    parser.add_argument("--data-dir", default="data", help="Directory holding the data files")
+    parser.add_argument("--storage-mode", default="pickle", choices=DataLayer.STORAGE_MODES)
+    args = parser.parse_args()
+
+    data_layer = DataLayer(data_dir=args.data_dir, storage_mode=args.storage_mode, auto_migrate=False)
+    results = upgrade(data_layer)
+    if not results:
+        print("All collections are up to date.")
+    for file_key, (old_version, new_version) in results.items():
+        print(f"{file_key}: upgraded from version {old_version} to {new_version}")
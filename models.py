@@ -25,8 +25,28 @@ class PaymentMethod(Enum):
     DIGITAL_WALLET = "Digital Wallet"
 
 
+# Base for the compact model classes that keep their attributes in __slots__ instead of a __dict__
+class SlottedModel:
+    __slots__ = ()
+
+    # Pickle the set attributes as a plain dict
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)}
+
+    # Restore from a dict, including objects pickled before the class used __slots__
+    def __setstate__(self, state):
+        if isinstance(state, tuple):  # (dict state, slots state) as pickled by the default protocol
+            state = {**(state[0] or {}), **(state[1] or {})}
+        for name, value in state.items():
+            if name in self.__slots__:  # Attributes the class no longer has are dropped
+                setattr(self, name, value)
+
+
 #Represents a ticket in the theme park system
-class Ticket:
+class Ticket(SlottedModel):
+    SCHEMA_VERSION = 3  # Version of the stored attributes, upgraded by migrations.py
+    __slots__ = ("_ticket_id", "_ticket_type", "_price", "_validity_period", "_purchase_date", "_discount",
+                 "_status", "_guest_id", "_visit_date", "_price_list_version")
 # Static dictionary holding ticket details for all ticket types
     TICKET_DETAILS = {
         TicketType.SINGLE_DAY: {"price": 275, "validity_period": 1, "discount": 0},
@@ -37,8 +57,9 @@ class Ticket:
         TicketType.VIP: {"price": 550, "validity_period": 1, "discount": 0},
     }
 # Initialize a Ticket attribute
-    def __init__(self, ticket_type: TicketType, price, validity_period, discount=0.0, guest_id=None ):
-        self._ticket_id = id(self)  # protected attribute to store ticket Unique ID
+    def __init__(self, ticket_type: TicketType, price, validity_period, discount=0.0, guest_id=None, ticket_id=None,
+                 visit_date=None, price_list_version=None):
+        self._ticket_id = ticket_id if ticket_id is not None else id(self)  # protected attribute to store ticket Unique ID
         self._ticket_type = ticket_type  #protected Enum to store ticket type
         self._price = price  # protected Ticket price
         self._validity_period = validity_period  #protected Validity of the ticket
@@ -46,6 +67,8 @@ class Ticket:
         self._discount = discount  # protected Discount applied to the ticket
         self._status = TicketStatus.ACTIVE  #protected Default status is "Active"
         self._guest_id = guest_id  #protected Associate the ticket with a guest ID
+        self._visit_date = visit_date  #protected Date the guest plans to visit (None if not chosen)
+        self._price_list_version = price_list_version  #protected Price list version it was sold under (see price_list.py)
 
         # Ensure guest ID is either None or an integer
         if self._guest_id is not None and not isinstance(self._guest_id, int):
@@ -59,6 +82,8 @@ class Ticket:
     # Getters and Setters for ticket attributes
     def get_ticket_id(self):
         return self._ticket_id
+    def set_ticket_id(self, ticket_id):
+        self._ticket_id = ticket_id
 
     def get_ticket_type(self):
         return self._ticket_type
@@ -94,18 +119,29 @@ class Ticket:
     def set_guest_id(self, guest_id):
         self._guest_id = guest_id
 
+    def get_visit_date(self):
+        return self._visit_date
+    def set_visit_date(self, visit_date):
+        self._visit_date = visit_date
+
+    def get_price_list_version(self):
+        return self._price_list_version
+
 
 # Validate that discount is a percentage between 0 and 100
-    def apply_discount(self, discount_type, group_size=0):
-#Apply a discount based on type or group size.
-        if discount_type == "Online Purchase" and self._ticket_type == TicketType.TWO_DAY:
-            self._discount = 10  # 10% discount for online purchase
-        elif discount_type == "Renewal" and self._ticket_type == TicketType.ANNUAL:
-            self._discount = 15  # 15% discount for renewal
-        elif discount_type == "Group Discount" and self._ticket_type == TicketType.GROUP and group_size >= 20:
-            self._discount = 20  # 20% discount for groups of 20 or more
-        else:
+    def apply_discount(self, discount_type, group_size=0, pricing=None, on=None):
+#Apply a discount ("Online Purchase", "Renewal", "Group Discount") if it is the rule of this ticket type.
+#The discount is the one the pricing engine quotes from the price list in effect on `on` (default today),
+#so it matches quote_basket; without an engine it starts from the ticket type's current default discount.
+        from pricing import PricingEngine  # Imported here because pricing.py imports this module
+        if PricingEngine.DISCOUNT_RULES.get(discount_type) != self._ticket_type:
             self._discount = 0  # No discount by default
+        elif pricing is not None:
+            item = {"ticket_type": self._ticket_type, "group_size": group_size}
+            self._discount = pricing.quote([item], on)["lines"][0]["discount"]
+        else:
+            base = self.TICKET_DETAILS.get(self._ticket_type, {}).get("discount", 0)
+            self._discount = PricingEngine.discount_for(self._ticket_type, base, group_size)
 
 # Calculate the final price of the ticket after applying the discount.
     def calculate_final_price(self):
@@ -126,10 +162,13 @@ class Ticket:
     def cancel_ticket(self):
         self.set_status(TicketStatus.CANCELLED)
 
-# Check if the ticket is still valid
-    def is_valid(self):
-        valid_until = self._purchase_date + timedelta(days=self._validity_period)
-        return datetime.now() <= valid_until
+# First day the ticket is no longer valid: its visit date (or purchase date) plus the validity period
+    def get_expiry_date(self):
+        return (self._visit_date or self._purchase_date) + timedelta(days=self._validity_period)
+
+# Check if the ticket is still valid on a date (default today)
+    def is_valid(self, on=None):
+        return (on or date.today()) < self.get_expiry_date()
 
 # Validate if the ticket is still valid based on the purchase date and validity period.
     def validate_ticket(self):
@@ -137,7 +176,7 @@ class Ticket:
             self.expire_ticket()
             return "Expired"
         else:
-            valid_until = self._purchase_date + timedelta(days=self._validity_period)
+            valid_until = datetime.combine(self.get_expiry_date(), datetime.min.time())
             remaining_time = valid_until - datetime.now()
             return f"Valid: {remaining_time.days} days, {remaining_time.seconds // 3600} hours remaining"
 
@@ -148,7 +187,10 @@ class Ticket:
 
 
 # Represents a customer in the theme park system
-class Guest:
+class Guest(SlottedModel):
+    SCHEMA_VERSION = 1  # Version of the stored attributes, upgraded by migrations.py
+    __slots__ = ("_guest_id", "_name", "_email", "_phone_number", "_age", "_purchase_history")
+
     def __init__(self, guest_id, name, email, phone_number, age=None):
         # Initialize a Customer attributes
         self._guest_id = guest_id  # protected attribute to store customer Unique ID
@@ -212,13 +254,13 @@ class Guest:
 
 # Book a ticket
     def book_ticket(self, ticket_type, price, validity_period, discount=0.0, group_size=0):
+        from pricing import PricingEngine  # Imported here because pricing.py imports this module
         # Validate age for child ticket
-        if ticket_type == TicketType.CHILD and (self._age is None or not (3 <= self._age <= 12)):
-            raise ValueError("Child tickets can only be purchased for guests aged 3 to 12.")
+        PricingEngine.check_age(ticket_type, self._age)
 
-        # Create a new ticket for the Guest and add it to their purchase history.
-        ticket = Ticket(ticket_type, price, validity_period, discount=0.0)  # Create a new Ticket
-        ticket.apply_discount("Group Discount", group_size)  # Apply group discount if applicable
+        # Create a new ticket for the Guest with the discount the pricing rules give it
+        discount = PricingEngine.discount_for(ticket_type, discount, group_size)
+        ticket = Ticket(ticket_type, price, validity_period, discount=discount)
         self._purchase_history.append(ticket)  # Add the ticket to the Guest's purchase history
         return ticket  # Return the booked Ticket
 
@@ -229,14 +271,41 @@ class Guest:
 
 
 class Reservation:
-    def __init__(self, reservation_id,  tickets, admin): #Initialize Reservation with composition of Guest
+    SCHEMA_VERSION = 2  # Version of the stored attributes, upgraded by migrations.py
+    # Object references rebuilt from the stored IDs on demand; they are never pickled
+    RESOLVED_ATTRIBUTES = ("_tickets", "_guest", "_payment", "_admin", "_resolver")
+
+    def __init__(self, reservation_id,  tickets, admin=None): #Initialize Reservation with composition of Guest
         self._reservation_id = reservation_id #protected Reservation unique ID
         self._reservation_date = date.today()  #protected Automatically set reservation date
         self._guest = None # protected Composition: Create a Guest
+        self._guest_id = None  #protected ID of the guest, stored instead of the Guest object
         self._tickets = tickets  #protected Aggregation: Tickets are associated with Reservation
-        self._total_amount = self.calculate_total_amount()  # Automatically calculate total amount
+        self._ticket_ids = [ticket.get_ticket_id() for ticket in tickets]  #protected Stored instead of the Tickets
+        self._total_amount = self.sum_ticket_prices(tickets)  # Automatically calculate total amount
         self._payment = None  #protected Aggregation: Payment will be associated later
+        self._payment_id = None  #protected ID of the payment, stored instead of the Payment object
         self._admin = admin  #protected Association: Admin object is associated for reservation management
+        self._admin_id = admin.get_admin_id() if admin is not None else None  #protected Stored instead of the Admin
+        self._resolver = None  #protected Looks up tickets, guest, payment and admin by ID (see bind)
+
+    # Only IDs and the stored total are pickled, the referenced objects live in their own collections
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self.RESOLVED_ATTRIBUTES:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name in self.RESOLVED_ATTRIBUTES:
+            self.__dict__.setdefault(name, None)
+
+    # Attach the object that resolves the stored IDs (it provides get_tickets_by_ids, get_guest,
+    # get_payment and get_admin); references are then loaded lazily on first access
+    def bind(self, resolver):
+        self._resolver = resolver
+        return self
 
     # Getters and setter for reservation attributes
     def get_reservation_id(self):
@@ -247,37 +316,69 @@ class Reservation:
     def set_reservation_date(self, reservation_date):
         self._reservation_date = reservation_date
 
+    def get_ticket_ids(self):
+        return list(self._ticket_ids)
+
     def get_tickets(self):
+        if self._tickets is None:
+            self._tickets = self._resolver.get_tickets_by_ids(self._ticket_ids) if self._resolver else []
         return self._tickets
     def set_tickets(self, tickets):
         self._tickets = tickets
-        self._total_amount = self.calculate_total_amount()  # Recalculate total amount when tickets are updated
+        self._ticket_ids = [ticket.get_ticket_id() for ticket in tickets]
+        self._total_amount = self.sum_ticket_prices(tickets)  # Recalculate total amount when tickets are updated
+
+    def get_guest_id(self):
+        return self._guest_id
 
     def get_guest(self):
+        if self._guest is None and self._guest_id is not None and self._resolver:
+            self._guest = self._resolver.get_guest(self._guest_id)
         return self._guest
     def set_guest(self, guest):
         if isinstance(guest, Guest): # Ensure the provided object is a Guest
             self._guest = guest
+            self._guest_id = guest.get_guest_id()
         else:
             raise ValueError("Invalid Guest object provided.")
 
+    def get_admin(self):
+        if self._admin is None and self._admin_id is not None and self._resolver:
+            self._admin = self._resolver.get_admin(self._admin_id)
+        return self._admin
+
     # Create a Guest object as part of the Reservation (Composition)
     def create_guest(self, name, email, phone_number):
         return Guest(self._reservation_id, name, email, phone_number)  # Guest ID same as Reservation ID
 
-    # Calculate the total amount by summing the prices of all tickets
+    # Sum the prices of the given tickets
+    @staticmethod
+    def sum_ticket_prices(tickets):
+        return sum(ticket.get_price() for ticket in tickets)
+
+    # Return the stored total amount (kept up to date when tickets are added or replaced)
     def calculate_total_amount(self):
-        return sum(ticket.get_price() for ticket in self._tickets)
+        return self._total_amount
 
 # Add a single ticket to the reservation - add a new ticket to the reservation
     def add_ticket(self, ticket):
-        self._tickets.append(ticket)
-        self._total_amount = self.calculate_total_amount()  # Update total amount
+        self.get_tickets().append(ticket)
+        self._ticket_ids.append(ticket.get_ticket_id())
+        self._total_amount += ticket.get_price()  # Update total amount
+
+    def get_payment_id(self):
+        return self._payment_id
+
+    def get_payment(self):
+        if self._payment is None and self._payment_id is not None and self._resolver:
+            self._payment = self._resolver.get_payment(self._payment_id)
+        return self._payment
 
 #Sets a payment for the reservation (Aggregation).
     def set_payment(self, payment):
         if isinstance(payment, Payment): # Ensure the provided object is a Payment
             self._payment = payment
+            self._payment_id = payment.get_payment_id()
         else:
             raise ValueError("Invalid payment object provided.")
 
@@ -288,29 +389,34 @@ class Reservation:
 # Generate a summary invoice for the reservation
     def generate_invoice(self):
         ticket_summary = "\n".join(
-            [f"Ticket ID: {ticket.get_ticket_id()}, Price: {ticket.get_price()}" for ticket in self._tickets])
-        payment_status = f"Payment Amount: {self._payment.get_amount_paid()}" if self._payment else "Payment: Not made yet"
+            [f"Ticket ID: {ticket.get_ticket_id()}, Price: {ticket.get_price()}" for ticket in self.get_tickets()])
+        payment = self.get_payment()
+        payment_status = f"Payment Amount: {payment.get_amount_paid()}" if payment else "Payment: Not made yet"
+        admin = self.get_admin()
+        admin_summary = f"{admin.get_name()} ({admin.get_email()})" if admin else "None"
         return (
             f"--- Invoice ---\n"
             f"Reservation ID: {self._reservation_id}\n"
             f"Reservation Date: {self._reservation_date}\n"
-            f"Guest: {self._guest}\n"
+            f"Guest: {self.get_guest()}\n"
             f"Tickets:\n{ticket_summary}\n"
             f"Total Amount: {self._total_amount}\n"
             f"{payment_status}\n"
-            f"Admin in Charge: {self._admin.get_name()} ({self._admin.get_email()})"
+            f"Admin in Charge: {admin_summary}"
         )
 
 #Returns a string representation of the Reservation, showing all details easy to read.
     def __str__(self):
-        ticket_details = ", ".join([str(ticket) for ticket in self._tickets])
+        ticket_details = ", ".join([str(ticket) for ticket in self.get_tickets()])
         return (
             f"Reservation(ID: {self._reservation_id}, Date: {self._reservation_date}, "
-            f"Guest: {self._guest}, Tickets: [{ticket_details}], Total: {self._total_amount})"
+            f"Guest: {self.get_guest()}, Tickets: [{ticket_details}], Total: {self._total_amount})"
         )
 
 # Represents an admin managing the theme park system
 class Admin:
+    SCHEMA_VERSION = 1  # Version of the stored attributes, upgraded by migrations.py
+
     def __init__(self, admin_id, name, email): # Initialize admin attributes
         self._admin_id = admin_id #protected admin id
         self._name = name #protected admin name
@@ -351,9 +457,10 @@ class Admin:
         print(f"Discount of {discount_percentage}% applied to {ticket_type.value} tickets.")
 
     # Update the capacity of a specific attraction
-    def update_capacity(self, attraction_id, new_capacity):
-        # Simulate updating capacity
-        print(f"Attraction ID {attraction_id} capacity updated to {new_capacity}.")
+    def update_capacity(self, attraction, new_capacity):
+        # Set the places per time slot (store the attraction through BusinessLogic.update_attraction_capacity)
+        attraction.set_capacity(new_capacity)
+        print(f"Attraction ID {attraction.get_attraction_id()} capacity updated to {new_capacity}.")
 
     # String representation of Admin easy to read
     def __str__(self):
@@ -389,11 +496,19 @@ class Services:
 
 #Represents an attraction in the theme park.
 class Attraction(Services):
-    def __init__(self, attraction_id , attraction_name, service_id, service_name, location, service_description):
+    SCHEMA_VERSION = 2  # Version of the stored attributes, upgraded by migrations.py
+
+    def __init__(self, attraction_id , attraction_name, service_id, service_name, location, service_description,
+                 capacity=None):
         super().__init__(service_id, service_name, service_description) # shows that it inherits from the service class
         self._attraction_id = attraction_id #protected Unique ID for the attraction
         self._attraction_name = attraction_name #protected Name of the attraction
         self._location = location  #protected Specific location of the attraction
+        self._capacity = None  #protected Places per time slot (None means not limited)
+        self._slot_capacities = {}  #protected Places of the time slots that differ from _capacity, by slot start
+        self._time_slots = []  #protected (start, end) datetimes of the attraction's time slots, by start
+        if capacity is not None:
+            self.set_capacity(capacity)
 
     # Getter and Setter for attraction-specific attributes
     def get_attraction_id(self):
@@ -411,18 +526,62 @@ class Attraction(Services):
     def set_location(self, location):
         self._location = location
 
+    @staticmethod
+    def check_capacity(capacity):
+        # Raise ValueError unless capacity is a whole number of places
+        if isinstance(capacity, bool) or not isinstance(capacity, int) or capacity < 0:
+            raise ValueError("Capacity must be a non-negative whole number.")
+
+    def get_capacity(self):
+        return self._capacity
+    def set_capacity(self, capacity):
+        self.check_capacity(capacity)
+        self._capacity = capacity
+
+    # Capacity of one time slot (a datetime giving the slot start)
+    def get_slot_capacity(self, slot):
+        return self._slot_capacities.get(slot, self._capacity)
+    def set_slot_capacity(self, slot, capacity):
+        if capacity is None:
+            self._slot_capacities.pop(slot, None)  # Back to the attraction's capacity
+            return
+        self.check_capacity(capacity)
+        self._slot_capacities[slot] = capacity
+
+    def get_time_slots(self):
+        return list(self._time_slots)
+    def set_time_slots(self, time_slots):
+        self._time_slots = sorted(time_slots)
+
     # String representation of Attraction easy to read
     def __str__(self):
         return f"Attraction(ID: {self._attraction_id}, Name: {self._attraction_name}, Location: {self._location})"
 
 #Represents an event in the theme park.
 class Event(Services):
-    def __init__(self, service_id, service_name, service_description, event_id, event_name, event_date):
+    SCHEMA_VERSION = 1  # Version of the stored attributes, upgraded by migrations.py
+
+    def __init__(self, service_id, service_name, service_description, event_id, event_name, event_date,
+                 duration_minutes=60):
         # Initialize attributes from the Service class
         super().__init__(service_id, service_name, service_description) #Shows that it inherits from the service class
         self._event_id = event_id  #protected Unique ID for the event
         self._event_name = event_name  #protected Name of the event
-        self._event_date = event_date  #protected Date of the event
+        self._event_date = self.parse_datetime(event_date)  #protected Start date and time of the event
+        self._duration_minutes = None  #protected Length of the event in minutes
+        self.set_duration_minutes(duration_minutes)
+
+    @staticmethod
+    def parse_datetime(value):
+        # datetime from a datetime, a date (midnight) or an ISO string ("2024-12-25" or "2024-12-25 19:30")
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime.combine(value, datetime.min.time())
+        try:
+            return datetime.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"Invalid event date: {value!r}")
 
     # Getters and setters for event attributes
     def get_event_id(self):
@@ -438,14 +597,27 @@ class Event(Services):
     def get_event_date(self):
         return self._event_date
     def set_event_date(self, event_date):
-        self._event_date = event_date
+        self._event_date = self.parse_datetime(event_date)
+
+    def get_duration_minutes(self):
+        return self._duration_minutes
+    def set_duration_minutes(self, duration_minutes):
+        if isinstance(duration_minutes, bool) or not isinstance(duration_minutes, int) or duration_minutes <= 0:
+            raise ValueError("Duration must be a whole number of minutes greater than zero.")
+        self._duration_minutes = duration_minutes
+
+    # End date and time of the event
+    def get_end_time(self):
+        return self._event_date + timedelta(minutes=self._duration_minutes)
 
     # String representation of Event easy to read
     def __str__(self):
         return f"Event(ID: {self._event_id}, Name: {self._event_name}, Date: {self._event_date})"
 
 # Represents a payment made for reservations or tickets
-class Payment:
+class Payment(SlottedModel):
+    __slots__ = ("_payment_id", "_amount_paid", "_payment_date", "_payment_method")
+
     def __init__(self, payment_id, amount_paid, payment_method: PaymentMethod):
         self._payment_id = payment_id  #protected Unique ID for the payment
         self._amount_paid = amount_paid  #protected Total amount paid
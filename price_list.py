@@ -0,0 +1,112 @@
+import copy  # For deriving a new version from an existing one
+import os  # For file operations
+import pickle  # For reading the stored price list
+from bisect import bisect_right  # For finding the version in effect on a date
+from models import *  # Import all models
+
+
+class PriceList:
+    # Versioned ticket prices, stored in data/price_list.pkl. Each version holds the price, validity
+    # period and discount of every TicketType and takes effect on its effective date. A change adds a
+    # version (one small write) instead of touching sold tickets: tickets record the version they were
+    # sold under and keep their own price and discount, so historical revenue doesn't change.
+    # Version 1 is Ticket.TICKET_DETAILS as it was when the price list was first created.
+
+    def __init__(self, data_layer):
+        self.data_layer = data_layer  # DataLayer whose data directory and locks are used
+        self.file_path = os.path.join(data_layer.data_dir, "price_list.pkl")  # Stored versions
+        self.stamp = None  # Stamp of the stored file the versions were read from or written to
+        self.versions = []  # Versions in creation order: {"version", "effective_date", "details"}
+        self.schedule = []  # Sorted (effective date, version number) pairs
+
+    @staticmethod
+    def parse_date(value):
+        # date from a date, a datetime (its day) or an ISO string ("2024-12-25"); None stays None
+        if value is None or type(value) is date:
+            return value
+        if isinstance(value, datetime):
+            return value.date()
+        try:
+            return date.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"Invalid effective date: {value!r}")
+
+    def read(self):
+        # Pick up the versions stored by this or another process, creating version 1 on first use
+        with self.data_layer.collection_lock("price_list"):
+            stamp = self.data_layer.file_stamp(self.file_path)
+            if stamp is not None and stamp == self.stamp:
+                return
+            if stamp is None:
+                self.versions = [{"version": 1, "effective_date": date.min,
+                                  "details": copy.deepcopy(Ticket.TICKET_DETAILS)}]
+                self.save()
+            else:
+                with open(self.file_path, "rb") as file:
+                    self.versions = pickle.load(file)
+                self.stamp = stamp
+            self.schedule = sorted((v["effective_date"], v["version"]) for v in self.versions)
+
+    def save(self):
+        # Store the versions (call with the price list lock held)
+        self.data_layer.atomic_write(self.file_path, self.versions)
+        self.stamp = self.data_layer.file_stamp(self.file_path)
+
+    def version(self, number):
+        # A version by number (KeyError if it doesn't exist)
+        self.read()
+        if not 1 <= number <= len(self.versions):
+            raise KeyError(number)
+        return self.versions[number - 1]
+
+    def current(self, on=None):
+        # The version in effect on a date (default today): the latest one effective by then
+        self.read()
+        position = bisect_right(self.schedule, (self.parse_date(on) or date.today(), len(self.versions))) - 1
+        return self.versions[self.schedule[position][1] - 1]
+
+    def details(self, ticket_type, on=None):
+        # (version number, {"price", "validity_period", "discount"}) of a ticket type on a date
+        version = self.current(on)
+        return version["version"], dict(version["details"][ticket_type])
+
+    def change(self, ticket_type, effective_date=None, **fields):
+        # Add a version, effective from effective_date (default today), that changes some fields of
+        # one ticket type in the version otherwise in effect then; returns the new version number.
+        # Versions already scheduled for later dates were derived before this change, so each later
+        # date gets a version carrying the changed fields too, up to the date a version of its own
+        # sets the field again (that later change wins from then on).
+        if not isinstance(ticket_type, TicketType):
+            raise ValueError("Invalid ticket type.")
+        effective_date = self.parse_date(effective_date) or date.today()
+        with self.data_layer.collection_lock("price_list"):
+            self.read()
+            later_dates = sorted({v["effective_date"] for v in self.versions if v["effective_date"] > effective_date})
+            number = self.add_version(ticket_type, effective_date, fields)
+            carried = dict(fields)
+            for later_date in later_dates:
+                for version in self.versions:
+                    # Fields set again by a change of their own at that date stop being carried
+                    if version["effective_date"] == later_date and not version.get("carried"):
+                        for field in version.get("changes", {}).get(ticket_type, {}):
+                            carried.pop(field, None)
+                if not carried:
+                    break
+                self.add_version(ticket_type, later_date, carried, carried=True)
+            self.save()
+        return number
+
+    def add_version(self, ticket_type, effective_date, fields, carried=False):
+        # Append a version changing fields of a ticket type in the version in effect on effective_date
+        # (call with the price list lock held, then save()); returns its number
+        details = copy.deepcopy(self.current(effective_date)["details"])
+        details.setdefault(ticket_type, {}).update(fields)
+        number = len(self.versions) + 1
+        self.versions.append({"version": number, "effective_date": effective_date, "details": details,
+                              "changes": {ticket_type: dict(fields)}, "carried": carried})
+        self.schedule = sorted((v["effective_date"], v["version"]) for v in self.versions)
+        return number
+
+    def set_discount(self, ticket_type, discount, effective_date=None):
+        # Add a version with a new discount for one ticket type; returns its number
+        return self.change(ticket_type, effective_date, discount=discount)
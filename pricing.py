@@ -0,0 +1,87 @@
+from models import *  # Import all models
+
+
+class PricingEngine:
+    # The one place the ticket discount rules live (the purchase screen, Ticket.apply_discount and
+    # Guest.book_ticket all use it). The rules of a price list version are compiled once into a table of
+    # unit prices per (ticket type, large group or not); quoting a basket is then one table lookup per
+    # item. A new price list version gets a new table, so a changed discount is picked up at once.
+    MINIMUM_DISCOUNTS = {
+        TicketType.TWO_DAY: 10,  # Online purchase
+        TicketType.ANNUAL: 15,  # Renewal
+    }
+    DISCOUNT_RULES = {  # Named discount -> ticket type it applies to (see Ticket.apply_discount)
+        "Online Purchase": TicketType.TWO_DAY,
+        "Renewal": TicketType.ANNUAL,
+        "Group Discount": TicketType.GROUP,
+    }
+    GROUP_SIZE = 20  # Smallest group getting the group discount
+    GROUP_DISCOUNT = 20  # Minimum discount for groups of GROUP_SIZE or more (smaller groups get none)
+    CHILD_AGES = (3, 12)  # Ages allowed to buy a child ticket
+
+    def __init__(self, price_list):
+        self.price_list = price_list  # PriceList giving the prices and discounts in effect
+        self.tables = {}  # price list version -> {(TicketType, large group): unit quote}
+        self.compilations = 0  # Number of tables compiled (each version is compiled once)
+
+    @classmethod
+    def discount_for(cls, ticket_type, base_discount=0, group_size=0):
+        # Discount % the rules give a ticket type, starting from the price list discount
+        if ticket_type == TicketType.GROUP:
+            return max(base_discount, cls.GROUP_DISCOUNT) if group_size >= cls.GROUP_SIZE else 0
+        return max(base_discount, cls.MINIMUM_DISCOUNTS.get(ticket_type, 0))
+
+    @classmethod
+    def check_age(cls, ticket_type, age):
+        # Raise ValueError if a guest of this age can't buy the ticket type
+        youngest, oldest = cls.CHILD_AGES
+        if ticket_type == TicketType.CHILD and (age is None or not youngest <= age <= oldest):
+            raise ValueError(f"Child tickets can only be purchased for guests aged {youngest} to {oldest}.")
+
+    def compile(self, version):
+        # Unit quotes of every ticket type under one price list version
+        table = {}
+        for ticket_type, details in version["details"].items():
+            for large_group in (False, True):
+                discount = self.discount_for(ticket_type, details["discount"], self.GROUP_SIZE if large_group else 0)
+                table[ticket_type, large_group] = {
+                    "price": details["price"],
+                    "discount": discount,
+                    "unit_price": details["price"] * (1 - discount / 100),
+                    "validity_period": details["validity_period"],
+                }
+        self.compilations += 1
+        return table
+
+    def table(self, on=None):
+        # (version number, compiled table) of the price list in effect on a date, compiled on first use
+        version = self.price_list.current(on)
+        number = version["version"]
+        table = self.tables.get(number)
+        if table is None:
+            table = self.tables[number] = self.compile(version)
+        return number, table
+
+    def quote(self, items, on=None):
+        # Quote a basket in one call. Each item is a dict with "ticket_type" and optionally "quantity"
+        # (default 1), "group_size", "age" and "visit_date" (a date or YYYY-MM-DD). Prices come from the
+        # price list in effect on `on` (default today). Raises ValueError for an invalid item.
+        number, table = self.table(on)
+        lines = []
+        for item in items:
+            ticket_type = item.get("ticket_type")
+            if not isinstance(ticket_type, TicketType):
+                raise ValueError("Invalid ticket type.")
+            quantity = item.get("quantity", 1)
+            if not isinstance(quantity, int) or quantity <= 0:
+                raise ValueError("The number of tickets must be greater than zero.")
+            self.check_age(ticket_type, item.get("age"))
+            visit_date = item.get("visit_date")
+            if isinstance(visit_date, str):
+                visit_date = date.fromisoformat(visit_date)  # Raises ValueError for a malformed date
+            unit = table.get((ticket_type, item.get("group_size", 0) >= self.GROUP_SIZE))
+            if unit is None:
+                raise ValueError(f"No price for ticket type: {ticket_type.value}")
+            lines.append({**unit, "ticket_type": ticket_type, "quantity": quantity, "visit_date": visit_date,
+                          "total": unit["unit_price"] * quantity})
+        return {"lines": lines, "total": sum(line["total"] for line in lines), "price_list_version": number}
@@ -0,0 +1,228 @@
+import argparse  # For the rebuild command line
+import os  # For file operations
+import pickle  # For reading the stored totals
+from contextlib import contextmanager  # For the recording block
+from models import *  # Import all models
+from data_layer import DataLayer  # Import the DataLayer for data management
+from expiry_index import ExpiryIndex  # Active tickets ordered by expiry date
+
+
+class SalesAggregates:
+    # Running totals of the tickets sold (count and revenue) per purchase date, ticket type,
+    # discount and visit date, kept in data/sales_aggregates.pkl so the admin dashboard doesn't read every ticket.
+    # BusinessLogic updates them in the same collection lock as each ticket insert, cancel and delete.
+    # The file records the tickets' change sequence number it reflects; if the tickets were written
+    # without updating the totals (a crash in between, a tool writing tickets directly) the numbers
+    # differ and the totals are rebuilt from the tickets on the next read.
+    # The file also keeps an ExpiryIndex of the active tickets, so the expiry sweep pops the expired
+    # ones from its heap and reads and updates only those tickets (see sweep_expired).
+    # When the DataLayer buffers the ticket writes (group commit, deferred writes) the changes are
+    # kept in memory too, and stored by the flush that writes those tickets, under the same lock.
+
+    # Getter of the ticket value each table is grouped by
+    DIMENSIONS = {
+        "date": "get_purchase_date",
+        "type": "get_ticket_type",
+        "discount": "get_discount",
+        "visit": "get_visit_date",  # Tickets without a visit date are left out of this table
+    }
+
+    def __init__(self, data_layer):
+        self.data_layer = data_layer  # DataLayer holding the tickets
+        self.file_path = os.path.join(data_layer.data_dir, "sales_aggregates.pkl")  # Stored totals
+        self.stamp = None  # Stamp of the stored file the totals were read from or written to
+        self.sequence = None  # Tickets change sequence number the totals reflect
+        self.totals = self.empty()  # dimension -> {key: (tickets sold, revenue)}
+        self.expiries = ExpiryIndex()  # Active tickets by expiry date (cancelled and deleted ones are discarded)
+        self.pending = []  # Changes to store with the buffered ticket writes: (operation, arguments...)
+        self.hooked = False  # True while waiting for the DataLayer to flush the buffered ticket writes
+
+    def empty(self):
+        # Totals with no tickets
+        return {dimension: {} for dimension in self.DIMENSIONS}
+
+    def counted(self, tickets):
+        # Cancelled tickets are not sales
+        return [ticket for ticket in tickets if ticket.get_status() != TicketStatus.CANCELLED]
+
+    def apply(self, totals, tickets, sign):
+        # Add (sign=1) or subtract (sign=-1) the sales of tickets to the totals
+        for ticket in self.counted(tickets):
+            revenue = ticket.calculate_final_price()
+            for dimension, getter in self.DIMENSIONS.items():
+                table = totals[dimension]
+                key = getattr(ticket, getter)()
+                if key is None:
+                    continue
+                count, total = table.get(key, (0, 0.0))
+                count += sign
+                if count:
+                    table[key] = (count, total + sign * revenue)
+                else:
+                    table.pop(key, None)  # Nothing sold for this key any more
+
+    def track(self, tickets):
+        # Index the expiry of active tickets
+        for ticket in tickets:
+            self.expiries.add(ticket)
+
+    def untrack(self, ticket_ids):
+        # Stop tracking the expiry of tickets
+        for ticket_id in ticket_ids:
+            self.expiries.discard(ticket_id)
+
+    def compute(self):
+        # Totals and expiry index recomputed from every stored ticket (not the unflushed ones)
+        tickets = self.data_layer.read_data("tickets")
+        totals = self.empty()
+        self.apply(totals, tickets, 1)
+        return totals, ExpiryIndex(tickets)
+
+    def read(self):
+        # Pick up the totals stored by this or another process (call with the tickets lock held)
+        stamp = self.data_layer.file_stamp(self.file_path)
+        if stamp != self.stamp:
+            if stamp is None:
+                self.sequence, self.totals, self.expiries = None, self.empty(), ExpiryIndex()  # Never built
+            else:
+                with open(self.file_path, "rb") as file:
+                    stored = pickle.load(file)
+                self.sequence, self.totals = stored["sequence"], stored["totals"]
+                self.expiries = stored.get("expiries")
+                if self.totals.keys() != self.DIMENSIONS.keys() or not isinstance(self.expiries, ExpiryIndex):
+                    self.sequence = None  # Stored before a dimension or the expiry index were added, rebuild
+                    self.expiries = ExpiryIndex()
+            self.stamp = stamp
+            self.replay()
+
+    def load(self):
+        # Bring the totals up to date, rebuilding them if they are stale (call with the tickets lock held)
+        self.read()
+        if self.sequence != self.data_layer.sequence("tickets"):
+            self.totals, self.expiries = self.compute()
+            self.save()
+            self.replay()
+
+    def replay(self):
+        # Apply the changes waiting for the buffered ticket writes to the stored totals just read
+        for operation, *arguments in self.pending:
+            if operation == "add":
+                self.apply(self.totals, arguments[0], 1)
+                self.track(arguments[0])
+            elif operation == "remove":
+                self.apply(self.totals, arguments[0], -1)
+                self.untrack(ticket.get_ticket_id() for ticket in arguments[0])
+            else:
+                self.untrack(arguments[0])  # Expired
+
+    def save(self):
+        # Store the totals as reflecting the current tickets (call with the tickets lock held)
+        self.sequence = self.data_layer.sequence("tickets")
+        self.data_layer.atomic_write(self.file_path, {"sequence": self.sequence, "totals": self.totals,
+                                                      "expiries": self.expiries})
+        self.stamp = self.data_layer.file_stamp(self.file_path)
+
+    @contextmanager
+    def recording(self):
+        # Hold the tickets lock around a ticket write and the matching add()/remove() calls,
+        # then store the totals as reflecting that write. A write the DataLayer only buffered is
+        # stored by the flush that writes it (see flushed), so the totals never count unstored tickets.
+        with self.data_layer.collection_lock("tickets"):
+            self.load()
+            pending = len(self.pending)
+            try:
+                yield self
+            except BaseException:
+                del self.pending[pending:]
+                self.stamp = None  # Discard changes made in memory, re-read the stored totals next time
+                raise
+            if self.data_layer.is_dirty("tickets"):
+                if not self.hooked:
+                    self.data_layer.on_flush("tickets", self.flushed)
+                    self.hooked = True
+            else:
+                self.save()
+                self.pending = []  # Stored with the totals
+
+    def flushed(self, before, after):
+        # Store the totals with the buffered ticket changes the DataLayer has just written
+        # (called by flush() with the tickets lock held and the sequence numbers around its writes)
+        self.hooked = False
+        self.stamp = None
+        self.read()  # The stored totals with our changes applied
+        if self.sequence == before:
+            self.pending = []
+            self.save()  # As reflecting the flushed tickets
+        else:
+            self.pending = []
+            self.load()  # Stale anyway, rebuilt from the tickets (ours are stored now)
+
+    def record(self, operation, *arguments):
+        # Keep a change to store with the buffered ticket writes (inside recording())
+        if self.data_layer.buffering():
+            self.pending.append((operation, *arguments))
+
+    def add(self, tickets):
+        # Count newly sold tickets (inside recording())
+        self.apply(self.totals, tickets, 1)
+        self.track(tickets)
+        self.record("add", self.data_layer.detach(tickets))  # As they are now
+
+    def remove(self, tickets):
+        # Stop counting cancelled or deleted tickets (inside recording())
+        self.apply(self.totals, tickets, -1)
+        self.untrack(ticket.get_ticket_id() for ticket in tickets)
+        self.record("remove", self.data_layer.detach(tickets))
+
+    def pop_expired(self, today):
+        # Remove the tickets no longer valid on `today` from the expiry index and return their IDs,
+        # earliest expiry first (inside recording(), which stores the index without them)
+        expired = self.expiries.pop_expired(today)
+        self.record("expire", expired)
+        return expired
+
+    def next_expiry(self):
+        # Earliest expiry date of the active tickets, or None
+        with self.data_layer.collection_lock("tickets"):
+            self.load()
+            return self.expiries.next_expiry()
+
+    def table(self, dimension):
+        # Rows of (key, tickets sold, revenue) for one dimension, sorted by key
+        with self.data_layer.collection_lock("tickets"):
+            self.load()
+            rows = [(key, count, revenue) for key, (count, revenue) in self.totals[dimension].items()]
+        return sorted(rows, key=lambda row: row[0].value if isinstance(row[0], TicketType) else row[0])
+
+    def rebuild(self):
+        # Recompute the totals from every ticket; returns whether the stored totals were correct
+        with self.data_layer.collection_lock("tickets"):
+            self.read()
+            totals, self.expiries = self.compute()
+            matched = (self.sequence == self.data_layer.sequence("tickets")
+                       and self.rounded(totals) == self.rounded(self.totals))
+            self.totals = totals
+            self.save()
+        return matched
+
+    def rounded(self, totals):
+        # Totals with revenue rounded to cents, for comparing sums made in a different order
+        return {dimension: {key: (count, round(revenue, 2)) for key, (count, revenue) in table.items()}
+                for dimension, table in totals.items()}
+
+
+def main(data_dir, storage_mode):
+    # Rebuild the stored totals and report whether they had been correct
+    data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+    matched = SalesAggregates(data_layer).rebuild()
+    print("Sales aggregates were correct." if matched else "Sales aggregates were out of date and have been rebuilt.")
+    return 0 if matched else 1
+
+
+# Entry point of the rebuild command
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the stored sales aggregates from the tickets.")
+    parser.add_argument("--data-dir", default="data", help="Directory holding the data files")
+    parser.add_argument("--storage-mode", default="pickle", choices=DataLayer.STORAGE_MODES)
+    args = parser.parse_args()
+    raise SystemExit(main(args.data_dir, args.storage_mode))
@@ -0,0 +1,106 @@
+from bisect import bisect_left, bisect_right  # For searching the sorted start times
+from heapq import merge  # For merging the buckets' results by start time
+from models import *  # Import all models
+
+
+class SortedIntervals:
+    # Intervals [start, end) with an item each, kept in parallel arrays sorted by start. The
+    # intervals starting in a range are one slice found by two bisections. An interval overlapping
+    # [start, end) starts before `end` and, being at most max_duration long, after
+    # start - max_duration, so overlaps are found by filtering that slice only.
+    # Inserting shifts the arrays (a memory move, fast for tens of thousands of intervals).
+
+    def __init__(self):
+        self.starts = []  # Sorted start times
+        self.ends = []  # End time of each interval
+        self.entries = []  # (start, insertion number, item) of each interval, for merging by start
+        self.max_duration = timedelta(0)
+
+    def add(self, start, end, entry):
+        # Index an interval (after the ones starting at the same time)
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.entries.insert(position, entry)
+        self.max_duration = max(self.max_duration, end - start)
+
+    def overlapping(self, start, end):
+        # Entries of the intervals overlapping [start, end), by start time
+        first = bisect_right(self.starts, start - self.max_duration)
+        last = bisect_left(self.starts, end)
+        return [self.entries[i] for i in range(first, last) if self.ends[i] > start]
+
+    def next(self, after, count):
+        # Entries of the first `count` intervals starting at or after `after`
+        first = bisect_left(self.starts, after)
+        return self.entries[first:first + count]
+
+
+class IntervalIndex:
+    # Intervals [start, end) with an item each, in buckets of similar duration (powers of two of
+    # seconds) so one long interval doesn't widen the search of the short ones. In the bucket of
+    # durations [d, 2d) a query for [start, end) scans the intervals starting between start - 2d and
+    # end: those overlapping it, plus some that ended before `start`, which all were running at
+    # start - d. A query costs two bisections per bucket plus the intervals found plus those running
+    # at one earlier time, however long ago the longest interval began.
+
+    def __init__(self, intervals=()):
+        self.buckets = {}  # Duration bucket -> SortedIntervals
+        self.count = 0  # Intervals added, numbers them so equal starts keep their insertion order
+        for start, end, item in sorted(intervals, key=lambda entry: entry[0]):
+            self.add(start, end, item)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, start, end, item):
+        # Index an interval (after the ones starting at the same time)
+        if end <= start:
+            raise ValueError("An interval must end after it starts.")
+        bucket = int((end - start).total_seconds()).bit_length()
+        if bucket not in self.buckets:
+            self.buckets[bucket] = SortedIntervals()
+        self.buckets[bucket].add(start, end, (start, self.count, item))
+        self.count += 1
+
+    def overlapping(self, start, end):
+        # Items of the intervals overlapping [start, end), by start time
+        found = [bucket.overlapping(start, end) for bucket in self.buckets.values()]
+        return [entry[2] for entry in merge(*found)]
+
+    def next(self, after, count):
+        # Items of the first `count` intervals starting at or after `after`
+        found = [bucket.next(after, count) for bucket in self.buckets.values()]
+        return [entry[2] for entry, _ in zip(merge(*found), range(count))]
+
+
+class Schedule:
+    # Events and attraction time slots indexed by time. Events are in one index; each attraction's
+    # time slots are in their own, so a new slot is checked against that attraction's slots only.
+
+    def __init__(self, events=(), attractions=()):
+        # Events without a date (old ones whose text couldn't be read as one) are left out
+        self.events = IntervalIndex((event.get_event_date(), event.get_end_time(), event)
+                                    for event in events if event.get_event_date() is not None)
+        self.slots = {}  # attraction_id -> IntervalIndex of (attraction_id, start, end)
+        for attraction in attractions:
+            self.set_slots(attraction)
+
+    def set_slots(self, attraction):
+        # Index (again) the time slots of an attraction
+        attraction_id = attraction.get_attraction_id()
+        self.slots[attraction_id] = IntervalIndex((start, end, (attraction_id, start, end))
+                                                  for start, end in attraction.get_time_slots())
+
+    def add_event(self, event):
+        # Index a new event
+        if event.get_event_date() is not None:
+            self.events.add(event.get_event_date(), event.get_end_time(), event)
+
+    def slots_overlapping(self, start, end, attraction_id=None):
+        # (attraction_id, start, end) of the time slots overlapping [start, end), by start time
+        if attraction_id is not None:
+            index = self.slots.get(attraction_id)
+            return index.overlapping(start, end) if index is not None else []
+        slots = [slot for index in self.slots.values() for slot in index.overlapping(start, end)]
+        return sorted(slots, key=lambda slot: (slot[1], slot[0]))
@@ -0,0 +1,182 @@
+import pickle  # For serializing model objects into table rows
+import sqlite3  # For the SQLite database
+import threading  # For sharing one connection between threads
+from contextlib import contextmanager  # For the deferred_indexes block
+
+
+class SQLiteBackend:
+    # Table layout for every collection: the primary key column and its getter, plus the
+    # secondary columns (with their getters) that are indexed for lookups.
+    # The full model object is kept as a pickled blob in the "data" column.
+    COLLECTIONS = {
+        "guests": {"key": ("guest_id", "get_guest_id"), "columns": {"email": "get_email"}},
+        "tickets": {
+            "key": ("ticket_id", "get_ticket_id"),
+            "columns": {"guest_id": "get_guest_id", "purchase_date": "get_purchase_date"},
+        },
+        "reservations": {"key": ("reservation_id", "get_reservation_id"), "columns": {}},
+        "admins": {"key": ("admin_id", "get_admin_id"), "columns": {"email": "get_email"}},
+        "payments": {"key": ("payment_id", "get_payment_id"), "columns": {}},
+        "attractions": {"key": ("attraction_id", "get_attraction_id"), "columns": {}},
+        "events": {"key": ("event_id", "get_event_id"), "columns": {}},
+        "services": {"key": ("service_id", "get_service_id"), "columns": {}},
+    }
+
+    def __init__(self, db_path):
+        self.db_path = db_path  # Path of the SQLite database file
+        self.lock = threading.RLock()  # Serializes access to the shared connection
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")  # Readers do not block the writer
+        self.create_tables()
+
+    def create_tables(self):
+        # Create every collection table and its secondary indexes if they don't exist
+        with self.lock, self.connection:
+            for file_key, schema in self.COLLECTIONS.items():
+                key_column = schema["key"][0]
+                columns = "".join(f", {column}" for column in schema["columns"])
+                self.connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {file_key} "
+                    f"({key_column} INTEGER PRIMARY KEY{columns}, data BLOB NOT NULL)"
+                )
+                for column in schema["columns"]:
+                    self.connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{file_key}_{column} ON {file_key} ({column})"
+                    )
+
+    @contextmanager
+    def deferred_indexes(self, file_key):
+        # Drop the secondary indexes of a collection for a bulk load and build them once at the end,
+        # instead of updating them for every inserted row
+        with self.lock, self.connection:
+            for column in self.COLLECTIONS[file_key]["columns"]:
+                self.connection.execute(f"DROP INDEX IF EXISTS idx_{file_key}_{column}")
+        try:
+            yield
+        finally:
+            self.create_tables()  # Recreates the dropped indexes
+
+    def data_version(self):
+        # Counter that changes whenever another connection commits to the database
+        with self.lock:
+            return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        # Close the database connection
+        with self.lock:
+            self.connection.close()
+
+    def to_row(self, file_key, obj):
+        # Build the table row (key, indexed columns..., pickled object) for an object
+        schema = self.COLLECTIONS[file_key]
+        row = [getattr(obj, schema["key"][1])()]
+        for getter in schema["columns"].values():
+            value = getattr(obj, getter)()
+            row.append(value.isoformat() if hasattr(value, "isoformat") else value)  # Dates stored as ISO text
+        row.append(pickle.dumps(obj))
+        return row
+
+    def insert_sql(self, file_key):
+        # INSERT OR REPLACE statement for a collection (a record with the same key is replaced)
+        schema = self.COLLECTIONS[file_key]
+        columns = [schema["key"][0], *schema["columns"], "data"]
+        placeholders = ", ".join("?" for _ in columns)
+        return f"INSERT OR REPLACE INTO {file_key} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def load(self, file_key):
+        # Load every object of a collection in key order
+        key_column = self.COLLECTIONS[file_key]["key"][0]
+        with self.lock:
+            rows = self.connection.execute(f"SELECT data FROM {file_key} ORDER BY {key_column}").fetchall()
+        return [pickle.loads(row[0]) for row in rows]
+
+    def iter_chunks(self, file_key, chunk_size, column=None, start=None, end=None):
+        # Yield the objects of a collection in key order, chunk_size at a time, optionally only those
+        # whose indexed column lies between start and end. Each chunk is one query continuing after the
+        # last key, so the lock isn't held between chunks and memory holds only one chunk.
+        key_column = self.COLLECTIONS[file_key]["key"][0]
+        condition, parameters = "", []
+        if column is not None:
+            if column not in self.COLLECTIONS[file_key]["columns"]:
+                raise ValueError(f"Column {column} is not indexed for {file_key}.")
+            condition = f" AND {column} BETWEEN ? AND ?"
+            parameters = [value.isoformat() if hasattr(value, "isoformat") else value for value in (start, end)]
+        last_key = None
+        while True:
+            after = "" if last_key is None else f"{key_column} > ?"
+            query = (f"SELECT {key_column}, data FROM {file_key} WHERE {after or '1'}{condition} "
+                     f"ORDER BY {key_column} LIMIT ?")
+            with self.lock:
+                rows = self.connection.execute(
+                    query, ([] if last_key is None else [last_key]) + parameters + [chunk_size]
+                ).fetchall()
+            if not rows:
+                return
+            last_key = rows[-1][0]
+            yield [pickle.loads(row[1]) for row in rows]
+
+    def save(self, file_key, data):
+        # Replace the whole collection in one transaction
+        rows = [self.to_row(file_key, obj) for obj in data]
+        with self.lock, self.connection:
+            self.connection.execute(f"DELETE FROM {file_key}")
+            self.connection.executemany(self.insert_sql(file_key), rows)
+
+    def add(self, file_key, obj):
+        # Insert (or replace by primary key) a single object
+        row = self.to_row(file_key, obj)
+        with self.lock, self.connection:
+            self.connection.execute(self.insert_sql(file_key), row)
+
+    def add_many(self, file_key, objs):
+        # Insert (or replace by primary key) several objects in one transaction
+        rows = [self.to_row(file_key, obj) for obj in objs]
+        with self.lock, self.connection:
+            self.connection.executemany(self.insert_sql(file_key), rows)
+
+    def get(self, file_key, key):
+        # Fetch one object by primary key, or None if it doesn't exist
+        key_column = self.COLLECTIONS[file_key]["key"][0]
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT data FROM {file_key} WHERE {key_column} = ?", (key,)
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def delete(self, file_key, key):
+        # Delete one object by primary key; returns True if a row was removed
+        key_column = self.COLLECTIONS[file_key]["key"][0]
+        with self.lock, self.connection:
+            cursor = self.connection.execute(f"DELETE FROM {file_key} WHERE {key_column} = ?", (key,))
+        return cursor.rowcount > 0
+
+    def delete_many(self, file_key, keys):
+        # Delete several objects by primary key in one transaction; returns the number of rows removed
+        key_column = self.COLLECTIONS[file_key]["key"][0]
+        with self.lock, self.connection:
+            cursor = self.connection.executemany(
+                f"DELETE FROM {file_key} WHERE {key_column} = ?", [(key,) for key in keys]
+            )
+        return cursor.rowcount
+
+    def find(self, file_key, column, value):
+        # Fetch the objects whose indexed column equals the given value
+        if column not in self.COLLECTIONS[file_key]["columns"]:
+            raise ValueError(f"Column {column} is not indexed for {file_key}.")
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT data FROM {file_key} WHERE {column} = ?", (value,)
+            ).fetchall()
+        return [pickle.loads(row[0]) for row in rows]
+
+    def find_range(self, file_key, column, start, end):
+        # Fetch the objects whose indexed column lies between start and end (inclusive)
+        if column not in self.COLLECTIONS[file_key]["columns"]:
+            raise ValueError(f"Column {column} is not indexed for {file_key}.")
+        start = start.isoformat() if hasattr(start, "isoformat") else start
+        end = end.isoformat() if hasattr(end, "isoformat") else end
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT data FROM {file_key} WHERE {column} BETWEEN ? AND ? ORDER BY {column}", (start, end)
+            ).fetchall()
+        return [pickle.loads(row[0]) for row in rows]
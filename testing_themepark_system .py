@@ -1,8 +1,33 @@
 import unittest
 import os
+import tempfile
 from models import *
 from data_layer import DataLayer
 from business_logic import BusinessLogic
+from migrate_to_sqlite import migrate
+import migrations
+import pickle
+import subprocess
+import sys
+import time
+from ticket_store import TicketStore
+from background_worker import BackgroundWorker
+from async_business_logic import AsyncBusinessLogic
+from sales_aggregates import SalesAggregates
+from expiry_index import sweep_expired
+from analytics import SalesAnalytics
+import analytics
+import exporter
+from importer import BulkImporter
+from pricing import PricingEngine
+from datetime import datetime
+from schedule import IntervalIndex
+import csv
+import io
+import json
+import asyncio
+import threading
+from unittest import mock
 
 
 class TestThemeParkSystem(unittest.TestCase):
@@ -115,7 +140,7 @@ class TestThemeParkSystem(unittest.TestCase):
         )
         events = self.business_logic.get_all_events()
         matching_event = next(
-            (e for e in events if e.get_event_name() == "Fireworks Show" and e.get_event_date() == "2024-12-25"),
+            (e for e in events if e.get_event_name() == "Fireworks Show" and e.get_event_date() == datetime(2024, 12, 25)),
             None
         )
         self.assertIsNotNone(matching_event, "The event was not found in the retrieved list.")
@@ -136,6 +161,1431 @@ class TestThemeParkSystem(unittest.TestCase):
         )
         self.assertEqual(updated_payment.get_payment_method(), PaymentMethod.DIGITAL_WALLET)
 
+    def test_bulk_ticket_issuance(self):
+        guest = self.business_logic.add_guest("Fatima", "fatima@example.com", "111-222-3333")
+        writes = []
+        original_save = self.business_logic.data_layer.save_data
+        self.business_logic.data_layer.save_data = lambda *args, **kwargs: (writes.append(args[0]),
+                                                                             original_save(*args, **kwargs))
+        tickets = self.business_logic.add_tickets_bulk(
+            guest.get_guest_id(), TicketType.GROUP, 176, 40, "2026-12-24"
+        )
+        self.assertEqual(writes, [f"tickets/{date.today():%Y-%m}"])  # One write for the whole order
+        self.assertEqual(len({t.get_ticket_id() for t in tickets}), 40)
+        self.assertEqual(tickets[0].get_visit_date(), date(2026, 12, 24))
+        self.assertEqual(len(self.business_logic.get_tickets_by_guest(guest.get_guest_id())), 40)
+        self.assertEqual(len(self.business_logic.data_layer.get_all_tickets()), 40)
+        with self.assertRaises(ValueError):
+            self.business_logic.add_tickets_bulk(guest.get_guest_id(), TicketType.GROUP, 176, 0)
+
+    def test_guest_indexes_follow_updates(self):
+        guest = self.business_logic.add_guest("Hamda", "hamda@example.com", "123-456-7890")
+        self.assertIs(self.business_logic.find_guest_by_email("hamda@example.com"), guest)
+        guest.set_email("hamda@newmail.com")
+        self.business_logic.update_guest(guest)
+        self.assertIsNone(self.business_logic.find_guest_by_email("hamda@example.com"))
+        self.assertIs(self.business_logic.find_guest_by_email("hamda@newmail.com"), guest)
+        self.assertIs(self.business_logic.get_guest(guest.get_guest_id()), guest)
+
+    def test_delete_guest_cascades_to_ticket_index(self):
+        guest = self.business_logic.add_guest("Ali", "ali@example.com", "999-888-7777")
+        other = self.business_logic.add_guest("Mariam", "mariam@example.com", "987-654-3210")
+        self.business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.VIP, 550, 1)
+        kept = self.business_logic.add_ticket_to_guest(other.get_guest_id(), TicketType.CHILD, 185, 1)
+        self.business_logic.delete_guest(guest.get_guest_id())
+        self.assertEqual(self.business_logic.get_tickets_by_guest(guest.get_guest_id()), [])
+        self.assertIsNone(self.business_logic.find_guest_by_email("ali@example.com"))
+        self.assertEqual([t.get_ticket_id() for t in self.business_logic.get_tickets_by_guest(other.get_guest_id())],
+                         [kept.get_ticket_id()])
+        with self.assertRaises(ValueError):
+            self.business_logic.make_reservation(guest.get_guest_id(), [])
+
+        reloaded = BusinessLogic()
+        self.assertIsNone(reloaded.get_guest(guest.get_guest_id()))
+        self.assertEqual(len(reloaded.get_tickets_by_guest(other.get_guest_id())), 1)
+
+
+class TestLogStorageMode(unittest.TestCase):
+    """Tests for the append-only log storage mode of the DataLayer"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory in log mode for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.data_layer = DataLayer(data_dir=self.temp_dir.name, storage_mode="log")
+        self.business_logic = BusinessLogic(self.data_layer)
+
+    def test_add_appends_to_log_and_reloads(self):
+        guest = self.business_logic.add_guest("Hamda", "hamda@example.com", "123-456-7890")
+        self.business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.SINGLE_DAY, 275, 1)
+        self.assertFalse(os.path.exists(self.data_layer.files["guests"]))  # Nothing rewritten
+        self.assertTrue(os.path.exists(self.data_layer.log_files["guests"]))
+
+        reloaded = DataLayer(data_dir=self.temp_dir.name, storage_mode="log")
+        self.assertEqual([g.get_email() for g in reloaded.get_all_guests()], ["hamda@example.com"])
+        self.assertEqual(len(reloaded.get_all_tickets()), 1)
+
+    def test_compact_folds_log_into_snapshot(self):
+        self.business_logic.add_guest("Ali", "ali@example.com", "999-888-7777")
+        self.business_logic.add_guest("Mariam", "mariam@example.com", "987-654-3210")
+        self.data_layer.compact("guests")
+        self.assertFalse(os.path.exists(self.data_layer.log_files["guests"]))
+        self.business_logic.add_guest("Fatima", "fatima@example.com", "111-222-3333")
+        names = [g.get_name() for g in self.data_layer.get_all_guests()]
+        self.assertEqual(names, ["Ali", "Mariam", "Fatima"])
+
+    def test_crash_before_log_removal_replays_no_duplicates(self):
+        for payment_id in (1, 2, 3):
+            self.data_layer.save_payment(Payment(payment_id, 10, PaymentMethod.CREDIT_CARD))
+        with mock.patch("os.remove", side_effect=OSError("crashed")):  # Snapshot written, log left behind
+            with self.assertRaises(OSError):
+                self.data_layer.compact("payments")
+        reloaded = DataLayer(data_dir=self.temp_dir.name, storage_mode="log")
+        self.assertEqual([p.get_payment_id() for p in reloaded.get_all_payments()], [1, 2, 3])
+
+    def test_torn_tail_record_is_ignored(self):
+        self.business_logic.add_guest("Ali", "ali@example.com", "999-888-7777")
+        with open(self.data_layer.log_files["guests"], "ab") as file:
+            file.write(b"\x80\x04\x95")  # Simulate a crash in the middle of an append
+        self.assertEqual(len(self.data_layer.get_all_guests()), 1)
+
+
+class TestIdAllocator(unittest.TestCase):
+    """Tests for the block-reserving ID allocator"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_one_durable_write_per_block(self):
+        data_layer = DataLayer(data_dir=self.temp_dir.name, id_block_size=10)
+        writes = []
+        original_save = data_layer.id_allocator.save
+        data_layer.id_allocator.save = lambda: (writes.append(1), original_save())
+        ids = [data_layer.get_next_id("ticket_id") for _ in range(25)]
+        self.assertEqual(ids, list(range(1, 26)))
+        self.assertEqual(len(writes), 3)
+
+    def test_unseen_id_types_get_counters(self):
+        business_logic = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        service = business_logic.add_service("Locker", "Day locker rental")
+        self.assertEqual(service.get_service_id(), 1)
+        self.assertEqual(business_logic.data_layer.get_next_id("parking_id"), 1)
+        with self.assertRaises(ValueError):
+            business_logic.data_layer.get_next_id("parking")
+
+    def test_ids_stay_unique_across_instances(self):
+        first = DataLayer(data_dir=self.temp_dir.name, id_block_size=5)
+        second = DataLayer(data_dir=self.temp_dir.name, id_block_size=5)
+        ids = [layer.get_next_id("guest_id") for _ in range(7) for layer in (first, second)]
+        ids += list(DataLayer(data_dir=self.temp_dir.name).reserve_ids("guest_id", 3))
+        self.assertEqual(len(ids), len(set(ids)))
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    """Tests for the SQLite storage backend"""
+
+    def setUp(self):
+        """Use a fresh temporary SQLite database for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.data_layer = DataLayer(data_dir=self.temp_dir.name, storage_mode="sqlite")
+        self.addCleanup(self.data_layer.sqlite.close)
+        self.business_logic = BusinessLogic(self.data_layer)
+
+    def test_indexed_lookups(self):
+        guest = self.business_logic.add_guest("Hamda", "hamda@example.com", "123-456-7890")
+        self.business_logic.add_guest("Ali", "ali@example.com", "999-888-7777")
+        ticket = self.business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.VIP, 550, 1)
+        self.assertEqual(self.data_layer.get_guest_by_email("ali@example.com").get_name(), "Ali")
+        tickets = self.data_layer.get_tickets_for_guest(guest.get_guest_id())
+        self.assertEqual([t.get_ticket_id() for t in tickets], [ticket.get_ticket_id()])
+        today = ticket.get_purchase_date()
+        self.assertEqual(len(self.data_layer.get_tickets_purchased_between(today, today)), 1)
+
+    def test_payment_update_and_delete(self):
+        guest = self.business_logic.add_guest("Hamda", "hamda@example.com", "123-456-7890")
+        ticket = self.business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.SINGLE_DAY, 275, 1)
+        reservation = self.business_logic.make_reservation(guest.get_guest_id(), [ticket])
+        payment = self.business_logic.process_payment(
+            reservation.get_reservation_id(), 275, PaymentMethod.CREDIT_CARD
+        )
+        self.business_logic.update_payment_method(payment.get_payment_id(), PaymentMethod.DEBIT_CARD)
+        stored = self.data_layer.get_all_payments()
+        self.assertEqual(stored[0].get_payment_method(), PaymentMethod.DEBIT_CARD)
+        self.data_layer.delete_payment(payment.get_payment_id())
+        self.assertEqual(self.data_layer.get_all_payments(), [])
+        with self.assertRaises(ValueError):
+            self.data_layer.delete_payment(payment.get_payment_id())
+
+    def test_migration_imports_pickle_files(self):
+        with tempfile.TemporaryDirectory() as source_dir:
+            legacy = BusinessLogic(DataLayer(data_dir=source_dir))
+            guest = legacy.add_guest("Fatima", "fatima@example.com", "111-222-3333")
+            legacy.add_ticket_to_guest(guest.get_guest_id(), TicketType.CHILD, 185, 1)
+            legacy.add_admin("Mariam", "mariam@example.com")
+            counts = migrate(source_dir, self.temp_dir.name)
+        self.assertEqual(counts["guests"], 1)
+        self.assertEqual(counts["tickets"], 1)
+        self.assertEqual(self.data_layer.get_guest_by_email("fatima@example.com").get_name(), "Fatima")
+        self.assertEqual(self.data_layer.get_all_admins()[0].get_name(), "Mariam")
+        self.assertGreater(self.data_layer.get_next_id("guest_id"), guest.get_guest_id())
+
+
+class TestObjectCache(unittest.TestCase):
+    """Tests for the DataLayer object cache"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def check_cache(self, storage_mode):
+        data_dir = os.path.join(self.temp_dir.name, storage_mode)
+        data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+        data_layer.get_all_payments()
+        data_layer.save_payment(Payment(1, 100, PaymentMethod.CREDIT_CARD))
+        data_layer.get_all_payments()
+        data_layer.get_all_payments()
+        self.assertEqual(data_layer.get_cache_stats()["misses"], 1)
+        self.assertGreaterEqual(data_layer.get_cache_stats()["hits"], 2)
+
+        # A write from another DataLayer on the same directory must be picked up
+        other = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+        other.save_payment(Payment(2, 50, PaymentMethod.DEBIT_CARD))
+        misses = data_layer.get_cache_stats()["misses"]
+        self.assertEqual(len(data_layer.get_all_payments()), 2)
+        if storage_mode == "log":
+            self.assertEqual(data_layer.get_cache_stats()["tail_reads"], 1)  # Only the appended record was read
+        else:
+            self.assertEqual(data_layer.get_cache_stats()["misses"], misses + 1)
+        if data_layer.sqlite:
+            data_layer.sqlite.close()
+            other.sqlite.close()
+
+    def test_cache_hits_and_external_changes(self):
+        for storage_mode in DataLayer.STORAGE_MODES:
+            with self.subTest(storage_mode=storage_mode):
+                self.check_cache(storage_mode)
+
+    def test_deferred_writes_flush_once(self):
+        data_layer = DataLayer(data_dir=self.temp_dir.name)
+        writes = []
+        original_write = data_layer.write_data
+        data_layer.write_data = lambda *args: (writes.append(args[0]), original_write(*args))
+        with data_layer.deferred_writes():
+            for payment_id in range(1, 6):
+                data_layer.save_payment(Payment(payment_id, 10, PaymentMethod.CREDIT_CARD))
+            data_layer.save_admin(Admin(1, "Mariam", "mariam@example.com"))
+            self.assertEqual(data_layer.get_cache_stats()["dirty"], ["admins", "payments"])
+            self.assertEqual(len(data_layer.get_all_payments()), 5)
+            self.assertEqual(writes, [])
+        self.assertEqual(writes, ["admins", "payments"])
+        self.assertEqual(len(DataLayer(data_dir=self.temp_dir.name).get_all_payments()), 5)
+
+    def test_unsaved_changes_to_objects_are_not_written(self):
+        """Objects given to or got from the DataLayer don't share state with its cache."""
+        for storage_mode in DataLayer.STORAGE_MODES:
+            data_dir = os.path.join(self.temp_dir.name, storage_mode)
+            data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+            self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+            data_layer.get_all_tickets()  # Cached from here on
+            given = Ticket(TicketType.VIP, 550, 1, guest_id=1, ticket_id=1)
+            data_layer.save_ticket(given)
+            given.cancel_ticket()
+            data_layer.get_all_tickets()[0].set_discount(50)
+            data_layer.get_object("tickets", 1).set_status(TicketStatus.USED)
+            data_layer.save_ticket(Ticket(TicketType.VIP, 550, 1, guest_id=1, ticket_id=2))  # Rewrites the month
+            for reader in (data_layer, DataLayer(data_dir=data_dir, storage_mode=storage_mode)):
+                ticket = reader.get_object("tickets", 1)
+                self.assertEqual((ticket.get_status(), ticket.get_discount()), (TicketStatus.ACTIVE, 0))
+
+
+class TestKeyedUpdates(unittest.TestCase):
+    """Tests for upsert, update_fields and delete_object in every storage mode"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def open_data_layer(self, storage_mode):
+        data_layer = DataLayer(data_dir=os.path.join(self.temp_dir.name, storage_mode), storage_mode=storage_mode)
+        if data_layer.sqlite:
+            self.addCleanup(data_layer.sqlite.close)
+        return data_layer
+
+    def test_updates_replace_records_by_key(self):
+        for storage_mode in DataLayer.STORAGE_MODES:
+            with self.subTest(storage_mode=storage_mode):
+                business_logic = BusinessLogic(self.open_data_layer(storage_mode))
+                guest = business_logic.add_guest("Hamda", "hamda@example.com", "123-456-7890")
+                ticket = business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.VIP, 550, 1)
+                reservation = business_logic.make_reservation(guest.get_guest_id(), [ticket])
+                guest.set_name("Hamda A.")
+                business_logic.update_guest(guest)
+                payment = business_logic.process_payment(
+                    reservation.get_reservation_id(), 550, PaymentMethod.CREDIT_CARD
+                )
+                business_logic.update_payment_method(payment.get_payment_id(), PaymentMethod.DEBIT_CARD)
+
+                reloaded = self.open_data_layer(storage_mode)
+                self.assertEqual([g.get_name() for g in reloaded.get_all_guests()], ["Hamda A."])
+                self.assertEqual(len(reloaded.get_all_reservations()), 1)
+                self.assertEqual(
+                    reloaded.get_object("payments", payment.get_payment_id()).get_payment_method(),
+                    PaymentMethod.DEBIT_CARD,
+                )
+                reloaded.delete_payment(payment.get_payment_id())
+                self.assertEqual(self.open_data_layer(storage_mode).get_all_payments(), [])
+
+    def test_update_fields_uses_setters(self):
+        data_layer = self.open_data_layer("log")
+        data_layer.save_payment(Payment(7, 20, PaymentMethod.CREDIT_CARD))
+        with self.assertRaises(ValueError):
+            data_layer.update_fields("payments", 7, payment_method="Cash")
+        with self.assertRaises(AttributeError):
+            data_layer.update_fields("payments", 7, amount_paid=0)
+        with self.assertRaises(KeyError):
+            data_layer.update_fields("payments", 8, payment_method=PaymentMethod.DEBIT_CARD)
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    """Tests for the one-time schema migrations"""
+
+    def setUp(self):
+        """Write old-format data files into a temporary data directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        old_guest = Guest(5, "Ali", "ali@example.com", "999-888-7777")
+        del old_guest._age, old_guest._purchase_history  # Saved before these attributes existed
+        updated_copy = Guest(5, "Ali B.", "ali@example.com", "999-888-7777")  # Appended by an old update
+        old_admin = Admin(3, "Mariam", "mariam@example.com")
+        del old_admin._email
+        for name, data in (("guests", [old_guest, updated_copy]), ("admins", old_admin)):
+            with open(os.path.join(self.temp_dir.name, f"{name}.pkl"), "wb") as file:
+                pickle.dump(data, file)
+
+    def test_upgrade_runs_once_and_records_versions(self):
+        data_layer = DataLayer(data_dir=self.temp_dir.name)
+        guests = data_layer.get_all_guests()
+        self.assertEqual([(g.get_name(), g.get_age(), g.get_purchase_history()) for g in guests],
+                         [("Ali B.", None, [])])
+        self.assertEqual(data_layer.get_all_admins()[0].get_email(), "unknown@example.com")
+        self.assertFalse(migrations.needs_upgrade(data_layer))
+        self.assertEqual(migrations.upgrade(data_layer), {})
+
+    def test_command_can_run_before_first_load(self):
+        data_layer = DataLayer(data_dir=self.temp_dir.name, auto_migrate=False)
+        self.assertTrue(migrations.needs_upgrade(data_layer))
+        self.assertEqual(migrations.upgrade(data_layer)["guests"], (0, Guest.SCHEMA_VERSION))
+        self.assertEqual(len(data_layer.get_all_guests()), 1)
+
+    def test_repeated_legacy_ticket_ids_are_reassigned(self):
+        for storage_mode in ("pickle", "log"):
+            data_dir = os.path.join(self.temp_dir.name, storage_mode)
+            os.makedirs(data_dir)
+            legacy = [Ticket(TicketType.SINGLE_DAY, 275, 1, ticket_id=7), Ticket(TicketType.VIP, 550, 1, ticket_id=7),
+                      Ticket(TicketType.CHILD, 185, 1, ticket_id=8)]
+            with open(os.path.join(data_dir, "tickets.pkl"), "wb") as file:
+                pickle.dump(legacy, file)
+            with open(os.path.join(data_dir, "schema_version.pkl"), "wb") as file:
+                pickle.dump({"tickets": 2}, file)  # Migrated before the duplicate IDs were handled
+
+            data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+            tickets = data_layer.get_all_tickets()
+            self.assertEqual(sorted(t.get_ticket_type().value for t in tickets),
+                             sorted(t.get_ticket_type().value for t in legacy))  # None was lost
+            self.assertEqual(len({t.get_ticket_id() for t in tickets}), 3)
+            self.assertEqual(data_layer.get_object("tickets", 7).get_ticket_type(), TicketType.SINGLE_DAY)
+            self.assertEqual(migrations.load_versions(data_layer)["tickets"], Ticket.SCHEMA_VERSION)
+
+            # Keyed changes now touch one ticket each, also after a reload
+            vip = next(t for t in tickets if t.get_ticket_type() == TicketType.VIP)
+            self.assertTrue(data_layer.delete_object("tickets", 7))
+            data_layer.update_fields("tickets", vip.get_ticket_id(), status=TicketStatus.USED)
+            reloaded = DataLayer(data_dir=data_dir, storage_mode=storage_mode).get_all_tickets()
+            self.assertEqual(sorted((t.get_ticket_type().value, t.get_status().value) for t in reloaded),
+                             [(TicketType.CHILD.value, TicketStatus.ACTIVE.value),
+                              (TicketType.VIP.value, TicketStatus.USED.value)])
+
+
+class TestCompactTickets(unittest.TestCase):
+    """Tests for the __slots__ models and the columnar ticket store"""
+
+    def test_slotted_models_pickle_and_load_old_state(self):
+        ticket = Ticket(TicketType.VIP, 550, 1, guest_id=4, ticket_id=9)
+        self.assertFalse(hasattr(ticket, "__dict__"))
+        self.assertEqual(pickle.loads(pickle.dumps(ticket)).get_ticket_id(), 9)
+
+        # Objects pickled before __slots__ carry a plain attribute dict
+        old_payment = Payment.__new__(Payment)
+        old_payment.__setstate__({"_payment_id": 2, "_amount_paid": 40, "_payment_date": date.today(),
+                                  "_payment_method": PaymentMethod.CREDIT_CARD, "_removed": True})
+        self.assertEqual(old_payment.get_amount_paid(), 40)
+
+    def test_store_views_match_tickets(self):
+        tickets = [
+            Ticket(TicketType.CHILD, 185, 1, discount=10, guest_id=1, ticket_id=1, visit_date=date(2026, 5, 1)),
+            Ticket(TicketType.ANNUAL, 1840, 365, ticket_id=2),
+        ]
+        store = TicketStore(tickets)
+        for ticket, view in zip(tickets, store):
+            for getter in ("get_ticket_id", "get_ticket_type", "get_price", "get_validity_period",
+                           "get_purchase_date", "get_status", "get_discount", "get_guest_id", "get_visit_date",
+                           "calculate_final_price", "__str__"):
+                self.assertEqual(getattr(view, getter)(), getattr(ticket, getter)())
+        store.get(2).set_status(TicketStatus.USED)
+        self.assertEqual(store.to_ticket(1).get_status(), TicketStatus.USED)
+        self.assertLess(store.memory_bytes(), 60 * len(store))
+
+
+class TestNormalizedReservations(unittest.TestCase):
+    """Tests for reservations stored as ID references"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.business_logic = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+
+    def test_reservation_is_stored_as_ids_and_resolved_lazily(self):
+        guest = self.business_logic.add_guest("Hamda", "hamda@example.com", "123-456-7890")
+        tickets = self.business_logic.add_tickets_bulk(guest.get_guest_id(), TicketType.TWO_DAY, 432, 2)
+        reservation = self.business_logic.make_reservation(guest.get_guest_id(), tickets)
+        payment = self.business_logic.process_payment(reservation.get_reservation_id(), 864, PaymentMethod.CREDIT_CARD)
+
+        state = pickle.loads(pickle.dumps(reservation)).__dict__
+        self.assertIsNone(state["_tickets"])
+        self.assertEqual(state["_ticket_ids"], [t.get_ticket_id() for t in tickets])
+
+        reloaded = BusinessLogic(DataLayer(data_dir=self.temp_dir.name)).get_all_reservations()[0]
+        self.assertEqual(reloaded.calculate_total_amount(), 864)
+        self.assertEqual(reloaded.get_guest().get_email(), "hamda@example.com")
+        self.assertEqual([t.get_ticket_id() for t in reloaded.get_tickets()], reservation.get_ticket_ids())
+        self.assertEqual(reloaded.get_payment().get_payment_id(), payment.get_payment_id())
+
+    def test_migration_converts_embedded_reservations(self):
+        guest = self.business_logic.add_guest("Ali", "ali@example.com", "999-888-7777")
+        ticket = self.business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.VIP, 550, 1)
+        old_reservation = Reservation.__new__(Reservation)
+        old_reservation.__dict__.update({
+            "_reservation_id": 1, "_reservation_date": date.today(), "_guest": None, "_tickets": [ticket],
+            "_total_amount": 550, "_payment": None, "_admin": guest,  # Old make_reservation stored the guest here
+        })
+        reservations = migrations.upgrade_reservations_v2(self.business_logic.data_layer, [old_reservation])
+        self.assertEqual(reservations[0].get_guest_id(), guest.get_guest_id())
+        self.assertEqual(reservations[0].get_ticket_ids(), [ticket.get_ticket_id()])
+        self.assertIsNone(reservations[0].get_admin())
+
+
+class TestPartitionedTickets(unittest.TestCase):
+    """Tests for tickets stored in monthly segments"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def make_tickets(self):
+        """Build one ticket purchased in each of January, February and March 2026."""
+        tickets = []
+        for month in (1, 2, 3):
+            ticket = Ticket(TicketType.SINGLE_DAY, 275, 1, guest_id=1, ticket_id=month)
+            ticket.set_purchase_date(date(2026, month, 15))
+            tickets.append(ticket)
+        return tickets
+
+    def test_date_range_reads_only_matching_segments(self):
+        for storage_mode in ("pickle", "log"):
+            data_dir = os.path.join(self.temp_dir.name, storage_mode)
+            DataLayer(data_dir=data_dir, storage_mode=storage_mode).save_tickets(self.make_tickets())
+            self.assertEqual(sorted(os.listdir(os.path.join(data_dir, "tickets")))[0][:7], "2026-01")
+
+            data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+            march = data_layer.get_all_tickets(date(2026, 3, 1), date(2026, 3, 31))
+            self.assertEqual([t.get_ticket_id() for t in march], [3])
+            self.assertEqual(data_layer.get_cache_stats()["misses"], 1)  # Only the March segment was read
+            self.assertEqual(len(data_layer.get_tickets_purchased_between(date(2026, 2, 1), date(2026, 12, 31))), 2)
+
+            ticket = data_layer.get_object("tickets", 2)
+            ticket.set_status(TicketStatus.USED)
+            data_layer.upsert("tickets", 2, ticket)
+            self.assertTrue(data_layer.delete_object("tickets", 1))
+            reloaded = DataLayer(data_dir=data_dir, storage_mode=storage_mode).get_all_tickets()
+            self.assertEqual([(t.get_ticket_id(), t.get_status()) for t in reloaded],
+                             [(2, TicketStatus.USED), (3, TicketStatus.ACTIVE)])
+
+    def test_lookup_by_id_reads_one_segment(self):
+        for storage_mode in ("pickle", "log"):
+            data_dir = os.path.join(self.temp_dir.name, storage_mode)
+            writer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+            writer.save_tickets(self.make_tickets())  # Also stores the keys of each segment
+
+            data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+            with mock.patch.object(data_layer, "read_data", wraps=data_layer.read_data) as read_data:
+                self.assertEqual(data_layer.get_object("tickets", 1).get_ticket_id(), 1)
+                self.assertIsNone(data_layer.get_object("tickets", 99))
+                self.assertEqual([call.args[0] for call in read_data.call_args_list], ["tickets/2026-01"])
+
+                # A ticket another process adds is found in its segment, which is read once
+                ticket = Ticket(TicketType.VIP, 550, 1, guest_id=1, ticket_id=4)
+                ticket.set_purchase_date(date(2026, 2, 20))
+                writer.save_ticket(ticket)
+                self.assertEqual(data_layer.get_object("tickets", 4).get_ticket_type(), TicketType.VIP)
+                self.assertEqual(data_layer.get_object("tickets", 2).get_ticket_id(), 2)
+                self.assertEqual([call.args[0] for call in read_data.call_args_list],
+                                 ["tickets/2026-01", "tickets/2026-02"])
+
+    def test_single_ticket_file_is_split_once(self):
+        with open(os.path.join(self.temp_dir.name, "tickets.pkl"), "wb") as file:
+            pickle.dump(self.make_tickets(), file)
+        data_layer = DataLayer(data_dir=self.temp_dir.name)
+        self.assertFalse(os.path.exists(data_layer.files["tickets"]))
+        self.assertEqual([t.get_ticket_id() for t in data_layer.get_all_tickets(date(2026, 2, 1))], [2, 3])
+
+    def test_business_logic_loads_tickets_on_first_use(self):
+        data_layer = DataLayer(data_dir=self.temp_dir.name)
+        data_layer.save_tickets(self.make_tickets())
+        business_logic = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        self.assertEqual(business_logic.data_layer.get_cache_stats()["misses"], 2)  # Guests and reservations
+        self.assertEqual(len(business_logic.get_tickets_by_guest(1)), 3)
+
+
+class TestCrashSafeWrites(unittest.TestCase):
+    """Tests for atomic saves and group commit"""
+
+    # Child process that dies halfway through pickling the new payments list
+    CRASHING_SAVE = """
+import os, pickle, sys
+from data_layer import DataLayer
+from models import *
+
+def dump_and_crash(data, file):
+    file.write(pickle.dumps(data)[:25])  # Part of the new contents reaches the file
+    file.flush()
+    os._exit(3)
+
+data_layer = DataLayer(data_dir=sys.argv[1])
+pickle.dump = dump_and_crash
+data_layer.save_data("payments", data_layer.get_all_payments() + [Payment(2, 80, PaymentMethod.DIGITAL_WALLET)])
+"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_crash_mid_save_keeps_previous_data(self):
+        DataLayer(data_dir=self.temp_dir.name).save_payment(Payment(1, 40, PaymentMethod.CREDIT_CARD))
+        result = subprocess.run([sys.executable, "-c", self.CRASHING_SAVE, self.temp_dir.name],
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.returncode, 3)  # Died inside the save
+        payments = DataLayer(data_dir=self.temp_dir.name).get_all_payments()
+        self.assertEqual([p.get_payment_id() for p in payments], [1])
+
+    def test_group_commit_merges_writes_in_window(self):
+        data_layer = DataLayer(data_dir=self.temp_dir.name, group_commit_window=0.05)
+        writes = []
+        original_write = data_layer.write_data
+        data_layer.write_data = lambda file_key, data: (writes.append(file_key), original_write(file_key, data))
+        for payment_id in range(1, 21):
+            data_layer.save_payment(Payment(payment_id, 10, PaymentMethod.DIGITAL_WALLET))
+        self.assertEqual(len(data_layer.get_all_payments()), 20)  # Visible before the flush
+        deadline = time.monotonic() + 5
+        while data_layer.dirty and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(writes, ["payments"])  # One durable write for the whole window
+        self.assertEqual(len(DataLayer(data_dir=self.temp_dir.name).get_all_payments()), 20)
+
+
+class TestSharedDataDirectory(unittest.TestCase):
+    """Tests for several processes (kiosks) sharing one data directory"""
+
+    # Kiosk process selling tickets to its own guest
+    KIOSK = """
+import sys
+from business_logic import BusinessLogic
+from data_layer import DataLayer
+from models import *
+
+data_dir, storage_mode, kiosk, window = sys.argv[1], sys.argv[2], sys.argv[3], float(sys.argv[4])
+business_logic = BusinessLogic(DataLayer(data_dir=data_dir, storage_mode=storage_mode, id_block_size=3,
+                                         group_commit_window=window))
+guest = business_logic.add_guest(f"Kiosk {kiosk}", f"kiosk{kiosk}@example.com", "000-000-0000")
+for _ in range(10):
+    business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.SINGLE_DAY, 275, 1)
+business_logic.add_tickets_bulk(guest.get_guest_id(), TicketType.GROUP, 176, 5)
+if storage_mode == "sqlite":
+    business_logic.data_layer.sqlite.close()
+"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_concurrent_kiosks_lose_no_tickets_or_ids(self):
+        kiosks = 4
+        # Group commit is off, then on (not available in "sqlite" mode): buffered changes must be
+        # merged with the other kiosks' writes at flush, not written over them
+        runs = [(mode, 0.0) for mode in DataLayer.STORAGE_MODES] + [("pickle", 0.02), ("log", 0.02)]
+        for storage_mode, window in runs:
+            with self.subTest(storage_mode=storage_mode, group_commit_window=window):
+                data_dir = os.path.join(self.temp_dir.name, f"{storage_mode}-{window}")
+                os.makedirs(data_dir)
+                processes = [
+                    subprocess.Popen([sys.executable, "-c", self.KIOSK, data_dir, storage_mode, str(kiosk),
+                                      str(window)], cwd=os.path.dirname(os.path.abspath(__file__)))
+                    for kiosk in range(kiosks)
+                ]
+                self.assertEqual([process.wait() for process in processes], [0] * kiosks)
+
+                data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+                guests = data_layer.get_all_guests()
+                tickets = data_layer.get_all_tickets()
+                self.assertEqual(len({g.get_guest_id() for g in guests}), kiosks)
+                self.assertEqual(len(tickets), kiosks * 15)
+                self.assertEqual(len({t.get_ticket_id() for t in tickets}), kiosks * 15)
+                if data_layer.sqlite:
+                    data_layer.sqlite.close()
+
+    def test_group_commit_flush_keeps_other_kiosks_writes(self):
+        kiosk_a = DataLayer(data_dir=self.temp_dir.name, group_commit_window=5)
+        kiosk_b = DataLayer(data_dir=self.temp_dir.name)
+        kiosk_a.save_payment(Payment(1, 10, PaymentMethod.CREDIT_CARD))
+        kiosk_b.save_payment(Payment(2, 20, PaymentMethod.DEBIT_CARD))
+        kiosk_a.upsert("payments", 1, Payment(1, 15, PaymentMethod.CREDIT_CARD))
+        kiosk_a.flush()
+        payments = DataLayer(data_dir=self.temp_dir.name).get_all_payments()
+        self.assertEqual(sorted((p.get_payment_id(), p.get_amount_paid()) for p in payments), [(1, 15), (2, 20)])
+
+    def test_business_logic_sees_other_kiosks_changes(self):
+        kiosk_a = BusinessLogic(DataLayer(data_dir=self.temp_dir.name, storage_mode="log"))
+        kiosk_b = BusinessLogic(DataLayer(data_dir=self.temp_dir.name, storage_mode="log"))
+        guest = kiosk_a.add_guest("Hamda", "hamda@example.com", "123-456-7890")
+        self.assertEqual(kiosk_b.find_guest_by_email("hamda@example.com").get_guest_id(), guest.get_guest_id())
+        kiosk_b.add_ticket_to_guest(guest.get_guest_id(), TicketType.VIP, 550, 1)
+        self.assertEqual(len(kiosk_a.get_tickets_by_guest(guest.get_guest_id())), 1)
+        self.assertEqual(kiosk_b.refresh(), [])  # Its own writes don't force a reload
+
+
+class TestBackgroundWorker(unittest.TestCase):
+    """Tests for the worker that keeps business operations off the UI thread"""
+
+    def setUp(self):
+        """Start a worker for each test."""
+        self.worker = BackgroundWorker()
+        self.addCleanup(self.worker.stop)
+
+    def wait_for_results(self, count):
+        """Poll like the UI does until `count` results were delivered."""
+        delivered, deadline = 0, time.monotonic() + 5
+        while delivered < count and time.monotonic() < deadline:
+            delivered += self.worker.poll()
+            time.sleep(0.005)
+        return delivered
+
+    def test_jobs_run_in_order_and_results_arrive_on_polling_thread(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            business_logic = BusinessLogic(DataLayer(data_dir=data_dir))
+            guest = business_logic.add_guest("Hamda", "hamda@example.com", "123-456-7890")
+            purchases, threads = [], []
+            for quantity in range(1, 6):
+                self.worker.submit(
+                    lambda quantity=quantity: business_logic.add_tickets_bulk(
+                        guest.get_guest_id(), TicketType.CHILD, 185, quantity),
+                    lambda tickets: (purchases.append(len(tickets)), threads.append(threading.current_thread())),
+                    description="Saving purchase",
+                )
+            self.assertTrue(self.worker.is_busy())
+            self.assertIn("4 more queued", self.worker.status())
+            self.assertEqual(self.wait_for_results(5), 5)
+        self.assertEqual(purchases, [1, 2, 3, 4, 5])  # Stored and delivered in purchase order
+        self.assertEqual(set(threads), {threading.current_thread()})
+        self.assertFalse(self.worker.is_busy())
+
+    def test_errors_go_to_error_callback(self):
+        errors = []
+        self.worker.submit(lambda: int("x"), on_error=errors.append)
+        self.assertEqual(self.wait_for_results(1), 1)
+        self.assertIsInstance(errors[0], ValueError)
+
+
+class TestSalesAggregates(unittest.TestCase):
+    """Tests for the stored ticket sales totals"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_totals_follow_inserts_cancels_and_deletes(self):
+        self.addCleanup(Ticket.TICKET_DETAILS[TicketType.CHILD].__setitem__, "discount", 0)
+        for storage_mode in DataLayer.STORAGE_MODES:
+            data_dir = os.path.join(self.temp_dir.name, storage_mode)
+            data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+            self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+            business_logic = BusinessLogic(data_layer)
+            alice = business_logic.add_guest("Alice", "alice@example.com", "111")
+            bob = business_logic.add_guest("Bob", "bob@example.com", "222")
+            single = business_logic.add_ticket_to_guest(alice.get_guest_id(), TicketType.SINGLE_DAY, 275)
+            business_logic.add_tickets_bulk(bob.get_guest_id(), TicketType.CHILD, 185, 3)
+            business_logic.cancel_ticket(single.get_ticket_id())
+            with self.assertRaises(ValueError):
+                business_logic.cancel_ticket(single.get_ticket_id())
+
+            self.assertEqual(business_logic.get_sales_by_date(), [(date.today(), 3, 555)])
+            self.assertEqual(business_logic.get_sales_by_type(), [(TicketType.CHILD, 3, 555)])
+            business_logic.modify_ticket_discount(TicketType.CHILD, 10)  # Sold tickets keep their price
+            self.assertEqual(business_logic.get_sales_by_discount(), [(0, 3, 555)])
+            business_logic.delete_guest(bob.get_guest_id())
+            self.assertEqual(business_logic.get_sales_by_date(), [])
+
+            # Another instance reads the stored totals without reading the tickets
+            reopened = BusinessLogic(DataLayer(data_dir=data_dir, storage_mode=storage_mode))
+            reopened.add_ticket_to_guest(alice.get_guest_id(), TicketType.SINGLE_DAY, 275)
+            self.assertEqual(business_logic.get_sales_by_type(), [(TicketType.SINGLE_DAY, 1, 275)])
+            self.assertTrue(business_logic.rebuild_sales_aggregates())
+
+    def test_tickets_written_directly_trigger_a_rebuild(self):
+        data_layer = DataLayer(data_dir=self.temp_dir.name)
+        business_logic = BusinessLogic(data_layer)
+        guest = business_logic.add_guest("Alice", "alice@example.com", "111")
+        business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.SINGLE_DAY, 275)
+        data_layer.save_ticket(Ticket(TicketType.TWO_DAY, 480, 2, guest_id=guest.get_guest_id(), ticket_id=99))
+
+        self.assertFalse(SalesAggregates(DataLayer(data_dir=self.temp_dir.name)).rebuild())
+        self.assertEqual(business_logic.get_sales_by_date(), [(date.today(), 2, 755)])
+        result = subprocess.run([sys.executable, "sales_aggregates.py", "--data-dir", self.temp_dir.name],
+                                cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_buffered_ticket_writes_keep_the_totals_current(self):
+        """With group commit the totals are stored by the flush, so no read rebuilds them."""
+        for storage_mode in ("pickle", "log"):
+            data_dir = os.path.join(self.temp_dir.name, storage_mode)
+            data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode, group_commit_window=60)
+            self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+            business_logic = BusinessLogic(data_layer)
+            self.addCleanup(business_logic.capacity.flush)
+            guest = business_logic.add_guest("Alice", "alice@example.com", "111")
+            business_logic.get_sales_by_date()  # Built once
+            with mock.patch.object(SalesAggregates, "compute", side_effect=AssertionError("rebuilt")):
+                for sale in range(5):
+                    ticket = business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.SINGLE_DAY, 275)
+                    self.assertEqual(business_logic.get_sales_by_date(), [(date.today(), sale + 1, 275 * (sale + 1))])
+                    data_layer.flush()
+                business_logic.cancel_ticket(ticket.get_ticket_id())
+                # Not flushed yet: another process sees neither the cancel nor its effect on the totals
+                other = SalesAggregates(DataLayer(data_dir=data_dir, storage_mode=storage_mode))
+                self.addCleanup(lambda d=other.data_layer: d.sqlite and d.sqlite.close())
+                self.assertEqual(other.table("date"), [(date.today(), 5, 1375)])
+                self.assertEqual(business_logic.get_sales_by_date(), [(date.today(), 4, 1100)])
+                data_layer.flush()
+                self.assertEqual(other.table("date"), [(date.today(), 4, 1100)])
+            self.assertTrue(business_logic.rebuild_sales_aggregates())
+
+
+class TestSalesAnalytics(unittest.TestCase):
+    """Tests for the vectorized revenue reports"""
+
+    def make_analytics(self):
+        """Build reports over four tickets on two days of one week and two payments."""
+        tickets = []
+        for ticket_id, (ticket_type, discount, day) in enumerate(
+                [(TicketType.SINGLE_DAY, 0, 5), (TicketType.SINGLE_DAY, 10, 5),
+                 (TicketType.CHILD, 0, 7), (TicketType.CHILD, 0, 7)], start=1):
+            ticket = Ticket(ticket_type, 100, 1, discount=discount, guest_id=1, ticket_id=ticket_id)
+            ticket.set_purchase_date(date(2026, 10, day))
+            tickets.append(ticket)
+        tickets[3].cancel_ticket()
+        payments = [Payment(1, 190, PaymentMethod.CREDIT_CARD), Payment(2, 100, PaymentMethod.DIGITAL_WALLET)]
+        return SalesAnalytics(tickets, payments)
+
+    @unittest.skipUnless(analytics.np, "NumPy is not installed")
+    def test_grouped_reports(self):
+        reports = self.make_analytics()
+        self.assertEqual(reports.revenue_by_type(), [(TicketType.SINGLE_DAY, 2, 190.0), (TicketType.CHILD, 1, 100.0)])
+        self.assertEqual(reports.revenue_by_day(), [(date(2026, 10, 5), 2, 190.0), (date(2026, 10, 7), 1, 100.0)])
+        self.assertEqual(reports.revenue_by_week(), [(date(2026, 10, 5), 3, 290.0)])  # 5 October 2026 is a Monday
+        self.assertEqual(reports.revenue_by_payment_method(),
+                         [(PaymentMethod.CREDIT_CARD, 1, 190.0), (PaymentMethod.DIGITAL_WALLET, 1, 100.0)])
+        self.assertEqual(reports.discount_effect(), [(0.0, 2, 200.0, 200.0, 0.0), (10.0, 1, 100.0, 90.0, 10.0)])
+        self.assertEqual(reports.discount_histogram()[:2], [("0-10%", 2, 200.0), ("10-20%", 1, 90.0)])
+        self.assertEqual([row[2] for row in reports.rolling_revenue(window=2)], [190.0, 190.0, 100.0])
+        headings, rows = reports.report("revenue_by_type")
+        self.assertEqual(len(headings), len(rows[0]))
+
+    @unittest.skipUnless(analytics.np, "NumPy is not installed")
+    def test_load_reads_stored_columns_until_the_data_changes(self):
+        """The dashboard reads column files and rebuilds only the changed ones."""
+        expected = self.make_analytics()
+        tickets = []
+        for ticket_id, day in enumerate([5, 5, 7], start=1):
+            ticket = Ticket(TicketType.SINGLE_DAY, 100, 1, guest_id=1, ticket_id=ticket_id)
+            ticket.set_purchase_date(date(2026, 10, day))
+            tickets.append(ticket)
+        for mode in DataLayer.STORAGE_MODES:
+            with self.subTest(mode=mode), tempfile.TemporaryDirectory() as temp_dir:
+                data_layer = DataLayer(data_dir=temp_dir, storage_mode=mode)
+                self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+                data_layer.save_tickets(tickets[:2])
+                data_layer.add_objects("payments", [Payment(1, 190, PaymentMethod.CREDIT_CARD)], Payment)
+                first = SalesAnalytics.load(data_layer)
+                self.assertEqual(first.revenue_by_day(), [(date(2026, 10, 5), 2, 200.0)])
+                with mock.patch.object(TicketStore, "columns_of", side_effect=AssertionError("rebuilt")):
+                    again = SalesAnalytics.load(data_layer)  # Nothing changed: no ticket object is read
+                self.assertEqual(again.revenue_by_day(), first.revenue_by_day())
+                data_layer.save_ticket(tickets[2])
+                changed = SalesAnalytics.load(data_layer, end_date=date(2026, 10, 6))
+                self.assertEqual(changed.revenue_by_day(), [(date(2026, 10, 5), 2, 200.0)])
+                changed = SalesAnalytics.load(data_layer)
+                self.assertEqual(changed.revenue_by_day()[-1], (date(2026, 10, 7), 1, 100.0))
+                self.assertEqual(changed.revenue_by_payment_method(), expected.revenue_by_payment_method()[:1])
+
+    @unittest.skipIf(analytics.np, "NumPy is installed")
+    def test_numpy_is_required(self):
+        with self.assertRaises(ImportError):
+            self.make_analytics()
+
+
+class TestStreamingExport(unittest.TestCase):
+    """Tests for the chunked CSV/JSONL exporter"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def make_data_layer(self, storage_mode):
+        """Store 25 tickets purchased in January and February 2026 and two payments."""
+        data_layer = DataLayer(data_dir=os.path.join(self.temp_dir.name, storage_mode), storage_mode=storage_mode)
+        self.addCleanup(lambda: data_layer.sqlite and data_layer.sqlite.close())
+        tickets = []
+        for ticket_id in range(1, 26):
+            ticket = Ticket(TicketType.SINGLE_DAY, 275, 1, discount=10, guest_id=1, ticket_id=ticket_id)
+            ticket.set_purchase_date(date(2026, 1 if ticket_id <= 10 else 2, 1 + ticket_id % 28))
+            tickets.append(ticket)
+        data_layer.save_tickets(tickets)
+        data_layer.save_payment(Payment(1, 550, PaymentMethod.CREDIT_CARD))
+        data_layer.save_payment(Payment(2, 185, PaymentMethod.DIGITAL_WALLET))
+        return data_layer
+
+    def test_chunks_date_filter_and_resume(self):
+        for storage_mode in DataLayer.STORAGE_MODES:
+            data_layer = self.make_data_layer(storage_mode)
+            chunks = list(data_layer.iter_chunks("tickets", 4))
+            self.assertTrue(all(len(chunk) <= 4 for chunk in chunks))
+            self.assertEqual(sorted(t.get_ticket_id() for chunk in chunks for t in chunk), list(range(1, 26)))
+
+            # February only, interrupted after 6 rows and resumed by appending from offset 6
+            output = io.StringIO()
+            first = exporter.export(data_layer, "tickets", output, "csv", date(2026, 2, 1), date(2026, 2, 28),
+                                    chunk_size=4)
+            full = list(csv.DictReader(io.StringIO(output.getvalue())))
+            self.assertEqual(first, 15)
+            self.assertEqual({row["purchase_date"][:7] for row in full}, {"2026-02"})
+            self.assertEqual(full[0]["final_price"], "247.5")
+
+            resumed = io.StringIO()
+            resumed.write("\r\n".join(output.getvalue().split("\r\n")[:7]) + "\r\n")  # Header + 6 rows
+            exporter.export(data_layer, "tickets", resumed, "csv", date(2026, 2, 1), date(2026, 2, 28), offset=6,
+                            chunk_size=4)
+            self.assertEqual(resumed.getvalue(), output.getvalue())
+
+    def test_chunks_stream_the_files_with_log_changes_applied(self):
+        """Chunks are read from the chunked files and log, never from a whole loaded collection."""
+        for storage_mode in ("pickle", "log"):
+            with mock.patch.object(DataLayer, "SNAPSHOT_CHUNK", 3):
+                data_layer = self.make_data_layer(storage_mode)
+                ticket = data_layer.get_object("tickets", 3)
+                ticket.cancel_ticket()
+                data_layer.upsert("tickets", 3, ticket)
+                data_layer.delete_object("tickets", 12)
+                data_layer.delete_object("tickets", 14)
+                readded = Ticket(TicketType.CHILD, 100, 1, guest_id=1, ticket_id=14)  # Deleted and added again
+                readded.set_purchase_date(date(2026, 2, 15))
+                data_layer.save_ticket(readded)
+                expected = [(t.get_ticket_id(), t.get_status()) for t in data_layer.read_data("tickets")]
+                with mock.patch.object(DataLayer, "load_snapshot", side_effect=AssertionError("loaded")), \
+                        mock.patch.object(DataLayer, "read_data", side_effect=AssertionError("loaded")):
+                    chunks = list(data_layer.iter_chunks("tickets", 4))
+            self.assertEqual([(t.get_ticket_id(), t.get_status()) for chunk in chunks for t in chunk], expected)
+            self.assertIn((3, TicketStatus.CANCELLED), expected)
+            self.assertNotIn(12, [ticket_id for ticket_id, _ in expected])
+
+    def test_interrupted_chunk_is_cut_from_the_file(self):
+        """Rows of a chunk interrupted while being written are not left behind the reported offset."""
+        data_layer = self.make_data_layer("pickle")
+        full = io.StringIO()
+        exporter.export(data_layer, "tickets", full, "csv", chunk_size=4)
+
+        class InterruptedOutput(io.StringIO):
+            def write(self, text):
+                if self.getvalue().count("\n") == 7:  # Header, one chunk and two rows of the next
+                    raise KeyboardInterrupt
+                return super().write(text)
+
+        output, progress = InterruptedOutput(), []
+        with self.assertRaises(KeyboardInterrupt):
+            exporter.export(data_layer, "tickets", output, "csv", chunk_size=4, on_chunk=progress.append)
+        self.assertEqual(progress, [4])
+        self.assertEqual(output.getvalue().count("\n"), 5)  # Header and the complete chunk
+        resumed = io.StringIO(output.getvalue())
+        resumed.seek(0, io.SEEK_END)
+        exporter.export(data_layer, "tickets", resumed, "csv", offset=4, chunk_size=4)
+        self.assertEqual(resumed.getvalue(), full.getvalue())
+
+    def test_jsonl_command_line(self):
+        self.make_data_layer("pickle")
+        output_path = os.path.join(self.temp_dir.name, "payments.jsonl")
+        result = subprocess.run(
+            [sys.executable, "exporter.py", "payments", output_path, "--data-dir",
+             os.path.join(self.temp_dir.name, "pickle"), "--chunk-size", "1"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        with open(output_path, encoding="utf-8") as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual([(r["payment_id"], r["payment_method"]) for r in rows],
+                         [(1, "Credit Card"), (2, "Digital Wallet")])
+
+
+class TestBulkImport(unittest.TestCase):
+    """Tests for the bulk importer of historical guests and tickets"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_batches_are_validated_and_written_once(self):
+        for storage_mode in DataLayer.STORAGE_MODES:
+            data_layer = DataLayer(data_dir=os.path.join(self.temp_dir.name, storage_mode), storage_mode=storage_mode)
+            self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+            writes = []
+            original_write = data_layer.write_data
+            data_layer.write_data = lambda file_key, data: (writes.append(file_key), original_write(file_key, data))
+            importer = BulkImporter(data_layer, batch_size=3)
+            guests = [{"guest_id": f"G{n}", "name": f"Guest {n}", "email": f"g{n}@example.com", "phone": "1"}
+                      for n in range(5)] + [{"guest_id": "G9", "name": "", "email": "nobody"}]
+            tickets = [{"guest_id": f"G{n % 5}", "ticket_type": "Child" if n % 2 else "SINGLE_DAY", "price": "185",
+                        "purchase_date": f"2025-0{1 + n % 2}-15"} for n in range(8)]
+            tickets.append({"guest_id": "G9", "ticket_type": "Child", "price": "185"})
+            tickets.append({"guest_id": "G1", "ticket_type": "Season", "price": "185"})
+
+            self.assertEqual(importer.import_guests(guests), 5)
+            self.assertEqual(importer.import_tickets(tickets), 8)
+            report = importer.commit()
+            self.assertEqual((report["guests"], report["tickets"], report["rejected"]), (5, 8, 3))
+            self.assertEqual([(source, number) for source, number, _ in importer.errors],
+                             [("guests", 6), ("tickets", 9), ("tickets", 10)])
+            if storage_mode == "pickle":
+                self.assertEqual(writes, ["guests", "tickets/2025-01", "tickets/2025-02"])
+
+            business_logic = BusinessLogic(DataLayer(data_dir=data_layer.data_dir, storage_mode=storage_mode))
+            guest = business_logic.find_guest_by_email("g1@example.com")
+            self.assertEqual(len(business_logic.get_tickets_by_guest(guest.get_guest_id())), 2)
+            self.assertEqual(sum(count for _, count, _ in business_logic.get_sales_by_type()), 8)
+            self.assertTrue(business_logic.rebuild_sales_aggregates())
+
+
+class TestPriceList(unittest.TestCase):
+    """Tests for the versioned price list"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.addCleanup(Ticket.TICKET_DETAILS[TicketType.VIP].__setitem__, "discount",
+                        Ticket.TICKET_DETAILS[TicketType.VIP]["discount"])
+
+    def test_discount_change_adds_a_version(self):
+        data_layer = DataLayer(data_dir=self.temp_dir.name)
+        business_logic = BusinessLogic(data_layer)
+        guest = business_logic.add_guest("Alice", "alice@example.com", "111")
+        before = business_logic.add_tickets_bulk(guest.get_guest_id(), TicketType.VIP, 550, 2)
+        writes = []
+        original_write = data_layer.write_data
+        data_layer.write_data = lambda file_key, data: (writes.append(file_key), original_write(file_key, data))
+
+        version = business_logic.modify_ticket_discount(TicketType.VIP, 25)
+        self.assertEqual(writes, [])  # No ticket was rewritten
+        self.assertEqual(Ticket.TICKET_DETAILS[TicketType.VIP]["discount"], 25)
+        after = business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.VIP, 412.5)
+        self.assertEqual([t.get_price_list_version() for t in before + [after]], [version - 1, version - 1, version])
+        self.assertEqual([t.get_discount() for t in business_logic.get_tickets_by_guest(guest.get_guest_id())],
+                         [0, 0, 0])
+
+        # Another process sees the change; a future change doesn't apply yet
+        price_list = BusinessLogic(DataLayer(data_dir=self.temp_dir.name)).price_list
+        self.assertEqual(price_list.details(TicketType.VIP)[1]["discount"], 25)
+        future = price_list.set_discount(TicketType.VIP, 50, date.today() + timedelta(days=7))
+        self.assertEqual(business_logic.get_ticket_details(TicketType.VIP)["discount"], 25)
+        self.assertEqual(business_logic.price_list.current(date.today() + timedelta(days=7))["version"], future)
+        self.assertEqual(business_logic.price_list.version(1)["details"][TicketType.VIP]["price"], 550)
+
+    def test_change_reaches_versions_scheduled_later(self):
+        price_list = BusinessLogic(DataLayer(data_dir=self.temp_dir.name)).price_list
+        today, later = date.today(), date.today() + timedelta(days=30)
+        price_list.set_discount(TicketType.TWO_DAY, 25, later)
+        price_list.set_discount(TicketType.ANNUAL, 40)
+        self.assertEqual(price_list.details(TicketType.ANNUAL, later)[1]["discount"], 40)
+        self.assertEqual(price_list.details(TicketType.TWO_DAY, later)[1]["discount"], 25)
+        # A field the later version sets itself keeps the later value from its date on
+        price_list.set_discount(TicketType.TWO_DAY, 5)
+        self.assertEqual([price_list.details(TicketType.TWO_DAY, day)[1]["discount"] for day in (today, later)],
+                         [5, 25])
+
+    def test_effective_date_can_be_a_string(self):
+        business_logic = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        later = date.today() + timedelta(days=7)
+        version = business_logic.modify_ticket_discount(TicketType.VIP, 30, later.isoformat())
+        self.assertEqual(business_logic.price_list.version(version)["effective_date"], later)
+        self.assertEqual(business_logic.get_ticket_details(TicketType.VIP, later.isoformat())["discount"], 30)
+        self.assertEqual(business_logic.get_ticket_details(TicketType.VIP)["discount"], 0)
+        self.assertEqual(Ticket.TICKET_DETAILS[TicketType.VIP]["discount"], 0)  # Not in effect yet
+        with self.assertRaises(ValueError):
+            business_logic.modify_ticket_discount(TicketType.VIP, 30, "next week")
+
+
+class TestPricingEngine(unittest.TestCase):
+    """Tests for the basket pricing engine"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.addCleanup(Ticket.TICKET_DETAILS[TicketType.TWO_DAY].__setitem__, "discount",
+                        Ticket.TICKET_DETAILS[TicketType.TWO_DAY]["discount"])
+
+    def test_basket_quote_applies_the_rules(self):
+        business_logic = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        price_list = business_logic.price_list
+        two_day = price_list.details(TicketType.TWO_DAY)[1]
+        group = price_list.details(TicketType.GROUP)[1]
+        quote = business_logic.quote_basket([
+            {"ticket_type": TicketType.TWO_DAY, "quantity": 2, "visit_date": "2026-12-01"},
+            {"ticket_type": TicketType.GROUP, "quantity": 20, "group_size": 20},
+            {"ticket_type": TicketType.GROUP, "quantity": 5, "group_size": 5},
+            {"ticket_type": TicketType.CHILD, "age": 7},
+        ])
+        self.assertEqual([line["discount"] for line in quote["lines"]],
+                         [max(two_day["discount"], 10), max(group["discount"], 20), 0, 0])
+        self.assertEqual(quote["lines"][0]["visit_date"], date(2026, 12, 1))
+        self.assertAlmostEqual(quote["total"], sum(line["unit_price"] * line["quantity"] for line in quote["lines"]))
+        with self.assertRaises(ValueError):
+            business_logic.quote_basket([{"ticket_type": TicketType.CHILD, "age": 14}])
+
+        # The rules are compiled once per price list version
+        business_logic.quote_basket([{"ticket_type": TicketType.VIP}])
+        self.assertEqual(business_logic.pricing.compilations, 1)
+        business_logic.modify_ticket_discount(TicketType.TWO_DAY, 40)
+        quote = business_logic.quote_basket([{"ticket_type": TicketType.TWO_DAY}])
+        self.assertEqual((quote["lines"][0]["discount"], business_logic.pricing.compilations), (40, 2))
+
+    def test_models_use_the_same_rules(self):
+        ticket = Ticket(TicketType.TWO_DAY, 480, 2)
+        ticket.apply_discount("Online Purchase")
+        self.assertEqual(ticket.get_discount(), PricingEngine.discount_for(TicketType.TWO_DAY))
+        guest = Guest(1, "Sara", "sara@example.com", "111", age=15)
+        self.assertEqual(guest.book_ticket(TicketType.GROUP, 220, 1, group_size=25).get_discount(), 20)
+        with self.assertRaises(ValueError):
+            guest.book_ticket(TicketType.CHILD, 185, 1)
+        ticket.apply_discount("Renewal")  # Not the rule of a two-day ticket
+        self.assertEqual(ticket.get_discount(), 0)
+
+    def test_ticket_discount_follows_a_changed_price_list(self):
+        business_logic = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        business_logic.modify_ticket_discount(TicketType.TWO_DAY, 25)
+        quoted = business_logic.quote_basket([{"ticket_type": TicketType.TWO_DAY}])["lines"][0]["discount"]
+        ticket = Ticket(TicketType.TWO_DAY, 480, 2)
+        ticket.apply_discount("Online Purchase", pricing=business_logic.pricing)
+        self.assertEqual((ticket.get_discount(), quoted), (25, 25))
+        ticket.apply_discount("Online Purchase")  # Without an engine, from this process's current defaults
+        self.assertEqual(ticket.get_discount(), 25)
+
+        # A discount scheduled for later is quoted on that date only
+        later = date.today() + timedelta(days=30)
+        business_logic.modify_ticket_discount(TicketType.TWO_DAY, 35, later)
+        ticket.apply_discount("Online Purchase", pricing=business_logic.pricing, on=later)
+        self.assertEqual(ticket.get_discount(),
+                         business_logic.quote_basket([{"ticket_type": TicketType.TWO_DAY}], later)["lines"][0]["discount"])
+        self.assertEqual(ticket.get_discount(), 35)
+
+
+class TestExpirySweep(unittest.TestCase):
+    """Tests for the expiry index and the bulk expiry sweep"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_is_valid_compares_dates(self):
+        ticket = Ticket(TicketType.TWO_DAY, 480, 2, visit_date=date(2026, 5, 1))
+        self.assertEqual(ticket.get_expiry_date(), date(2026, 5, 3))
+        self.assertTrue(ticket.is_valid(date(2026, 5, 2)))
+        self.assertFalse(ticket.is_valid(date(2026, 5, 3)))
+        self.assertTrue(Ticket(TicketType.SINGLE_DAY, 275, 1).validate_ticket().startswith("Valid"))
+
+    def test_sweep_expires_only_due_tickets_by_key(self):
+        for storage_mode in DataLayer.STORAGE_MODES:
+            data_layer = DataLayer(data_dir=os.path.join(self.temp_dir.name, storage_mode), storage_mode=storage_mode)
+            self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+            business_logic = BusinessLogic(data_layer)
+            guest = business_logic.add_guest("Alice", "alice@example.com", "111")
+            early = business_logic.add_tickets_bulk(guest.get_guest_id(), TicketType.SINGLE_DAY, 275, 3, "2026-11-01")
+            late = business_logic.add_tickets_bulk(guest.get_guest_id(), TicketType.SINGLE_DAY, 275, 2, "2026-12-01")
+            business_logic.cancel_ticket(early[0].get_ticket_id())
+            business_logic.load_tickets()  # Loaded copies are expired along with the stored tickets
+            self.assertEqual(business_logic.sales.next_expiry(), date(2026, 11, 2))
+
+            with mock.patch.object(data_layer, "update_fields", wraps=data_layer.update_fields) as update_fields:
+                expired = business_logic.sweep_expired_tickets(date(2026, 11, 15))
+            self.assertEqual(sorted(t.get_ticket_id() for t in expired), sorted(t.get_ticket_id() for t in early[1:]))
+            self.assertEqual(sorted(call.args[1] for call in update_fields.call_args_list),
+                             sorted(t.get_ticket_id() for t in early[1:]))  # Only the expired tickets, by key
+            self.assertEqual(business_logic.sweep_expired_tickets(date(2026, 11, 15)), [])
+            self.assertEqual(business_logic.tickets_by_id[early[1].get_ticket_id()].get_status(), TicketStatus.EXPIRED)
+            self.assertEqual(business_logic.sales.next_expiry(), date(2026, 12, 2))
+
+            statuses = {t.get_ticket_id(): t.get_status()
+                        for t in DataLayer(data_dir=data_layer.data_dir, storage_mode=storage_mode).get_all_tickets()}
+            self.assertEqual([statuses[t.get_ticket_id()] for t in early + late],
+                             [TicketStatus.CANCELLED, TicketStatus.EXPIRED, TicketStatus.EXPIRED,
+                              TicketStatus.ACTIVE, TicketStatus.ACTIVE])
+
+    def test_nightly_sweep_reads_only_segments_with_expired_tickets(self):
+        """A new process sweeps from the stored expiry index, reading only the segments of expired tickets."""
+        for storage_mode in DataLayer.STORAGE_MODES:
+            data_dir = os.path.join(self.temp_dir.name, storage_mode)
+            data_layer = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+            self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+            tickets = []
+            for ticket_id, (purchased, validity) in enumerate(
+                    [(date(2026, 1, 5), 1), (date(2026, 1, 20), 400), (date(2026, 2, 3), 1), (date(2026, 3, 9), 1)],
+                    start=1):
+                ticket = Ticket(TicketType.SINGLE_DAY, 275, validity, guest_id=1, ticket_id=ticket_id)
+                ticket.set_purchase_date(purchased)
+                tickets.append(ticket)
+            with SalesAggregates(data_layer).recording() as sales:
+                data_layer.save_tickets(tickets)
+                sales.add(tickets)
+
+            nightly = DataLayer(data_dir=data_dir, storage_mode=storage_mode)
+            self.addCleanup(lambda d=nightly: d.sqlite and d.sqlite.close())
+            sales = SalesAggregates(nightly)
+            with mock.patch.object(SalesAggregates, "compute", side_effect=AssertionError("read every ticket")), \
+                    mock.patch.object(nightly, "read_data", wraps=nightly.read_data) as read_data, \
+                    mock.patch.object(nightly, "write_data", wraps=nightly.write_data) as write_data:
+                expired = sweep_expired(nightly, sales, date(2026, 2, 10))
+                self.assertEqual([t.get_ticket_id() for t in expired], [1, 3])
+                # Segments are only rewritten in "pickle" mode, once each; the others append or update rows
+                self.assertEqual(write_data.call_count, 2 if storage_mode == "pickle" else 0)
+                self.assertEqual(sorted({call.args[0] for call in read_data.call_args_list}),
+                                 [] if storage_mode == "sqlite" else ["tickets/2026-01", "tickets/2026-02"])
+                self.assertEqual(sales.next_expiry(), date(2026, 3, 10))  # The March ticket
+                read_data.reset_mock()
+                self.assertEqual(sweep_expired(nightly, sales, date(2026, 2, 10)), [])
+                self.assertEqual(read_data.call_count, 0)
+            statuses = [t.get_status() for t in DataLayer(data_dir=data_dir, storage_mode=storage_mode).get_all_tickets()]
+            self.assertEqual(statuses, [TicketStatus.EXPIRED, TicketStatus.ACTIVE, TicketStatus.EXPIRED,
+                                        TicketStatus.ACTIVE])
+
+
+class TestAttractionCapacity(unittest.TestCase):
+    """Tests for attraction capacities and the per-slot reservation counters"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.slot = datetime(2026, 11, 1, 14, 0)
+
+    def test_update_capacity_is_stored(self):
+        for storage_mode in DataLayer.STORAGE_MODES:
+            data_layer = DataLayer(data_dir=os.path.join(self.temp_dir.name, storage_mode), storage_mode=storage_mode)
+            self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+            business_logic = BusinessLogic(data_layer)
+            self.addCleanup(business_logic.capacity.flush)
+            attraction = business_logic.add_attraction("Loop", "North", "Coaster")
+            attraction_id = attraction.get_attraction_id()
+            self.assertIsNone(business_logic.get_remaining_capacity(attraction_id, self.slot))
+            business_logic.update_attraction_capacity(attraction_id, 30)
+            business_logic.update_attraction_capacity(attraction_id, 10, slot=self.slot)
+            with self.assertRaises(ValueError):
+                business_logic.update_attraction_capacity(attraction_id, -1)
+            with self.assertRaises(ValueError):
+                business_logic.update_attraction_capacity(attraction_id + 100, 5)
+
+            stored = DataLayer(data_dir=data_layer.data_dir, storage_mode=storage_mode).get_all_attractions()[0]
+            self.assertEqual((stored.get_capacity(), stored.get_slot_capacity(self.slot)), (30, 10))
+            self.assertEqual(business_logic.reserve_attraction_slot(attraction_id, self.slot, 4), 6)
+            self.assertEqual(business_logic.get_remaining_capacity(attraction_id, datetime(2026, 11, 1, 15, 0)), 30)
+
+    def test_concurrent_reservations_never_oversell(self):
+        business_logic = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        self.addCleanup(business_logic.capacity.flush)
+        attraction_id = business_logic.add_attraction("Drop Tower", "East", "Ride", capacity=20).get_attraction_id()
+        barrier = threading.Barrier(50)
+        results = []
+
+        def reserve():
+            barrier.wait()  # Start all reservations at once
+            try:
+                business_logic.reserve_attraction_slot(attraction_id, self.slot)
+                results.append(True)
+            except ValueError:
+                results.append(False)
+
+        threads = [threading.Thread(target=reserve) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((results.count(True), results.count(False)), (20, 30))
+        self.assertEqual(business_logic.get_remaining_capacity(attraction_id, self.slot), 0)
+
+        # The counters are persisted in one batch and read back by a new process
+        self.assertEqual(business_logic.capacity.flush(), 1)
+        self.assertEqual(business_logic.release_attraction_slot(attraction_id, self.slot, 5), 5)
+        business_logic.capacity.flush()
+        reloaded = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        self.addCleanup(reloaded.capacity.flush)
+        self.assertEqual(reloaded.capacity.reserved_places(attraction_id, self.slot), 15)
+        with self.assertRaises(ValueError):
+            reloaded.release_attraction_slot(attraction_id, self.slot, 16)
+
+    def test_kiosks_sharing_a_slot_never_oversell(self):
+        kiosk_a = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        kiosk_b = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        for kiosk in (kiosk_a, kiosk_b):
+            self.addCleanup(kiosk.capacity.flush)
+        attraction_id = kiosk_a.add_attraction("Log Flume", "West", "Water ride", capacity=2).get_attraction_id()
+        self.assertEqual(kiosk_a.reserve_attraction_slot(attraction_id, self.slot, 2), 0)
+        with self.assertRaises(ValueError):
+            kiosk_b.reserve_attraction_slot(attraction_id, "2026-11-01T14:00")  # The same slot as a string
+        # A place given back is only available to the other kiosk once the lease is returned at flush
+        kiosk_a.release_attraction_slot(attraction_id, self.slot)
+        kiosk_a.capacity.flush()
+        self.assertEqual(kiosk_b.reserve_attraction_slot(attraction_id, "2026-11-01 14:00"), 0)
+        kiosk_b.capacity.flush()
+        self.assertEqual(kiosk_a.capacity.reserved_places(attraction_id, self.slot), 2)
+
+    def test_lowered_capacity_limits_leased_places(self):
+        """Places leased before a capacity was lowered are not sold beyond the new capacity."""
+        kiosk_a = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        kiosk_b = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        for kiosk in (kiosk_a, kiosk_b):
+            self.addCleanup(kiosk.capacity.flush)
+        attraction_id = kiosk_a.add_attraction("Log Flume", "West", "Water ride", capacity=20).get_attraction_id()
+        for kiosk in (kiosk_a, kiosk_b):
+            kiosk.reserve_attraction_slot(attraction_id, self.slot)  # Each leases 10 places
+        kiosk_a.update_attraction_capacity(attraction_id, 3)
+        self.assertEqual(kiosk_a.get_remaining_capacity(attraction_id, self.slot), 0)  # Its lease was given back
+        self.assertEqual(kiosk_b.get_remaining_capacity(attraction_id, self.slot), 1)  # Sees the change
+        sold = 0
+        for kiosk in (kiosk_b, kiosk_a, kiosk_b):
+            try:
+                kiosk.reserve_attraction_slot(attraction_id, self.slot)
+                sold += 1
+            except ValueError:
+                pass
+        self.assertEqual(sold, 1)
+        for kiosk in (kiosk_a, kiosk_b):
+            kiosk.capacity.flush()
+        self.assertEqual(kiosk_a.capacity.reserved_places(attraction_id, self.slot), 3)
+
+    def test_trackers_are_not_kept_alive_for_the_exit_flush(self):
+        import gc
+        import weakref
+        tracker = weakref.ref(BusinessLogic(DataLayer(data_dir=self.temp_dir.name)).capacity)
+        gc.collect()
+        self.assertIsNone(tracker())
+
+    def test_only_defined_time_slots_can_be_reserved(self):
+        business_logic = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        self.addCleanup(business_logic.capacity.flush)
+        attraction_id = business_logic.add_attraction("Carousel", "South", "Ride", capacity=5).get_attraction_id()
+        with self.assertRaises(ValueError):
+            business_logic.reserve_attraction_slot(attraction_id, "garbage")
+        business_logic.add_attraction_time_slots(attraction_id, self.slot, 2, 30)
+        with self.assertRaises(ValueError):
+            business_logic.reserve_attraction_slot(attraction_id, datetime(2026, 11, 1, 14, 10))
+        self.assertEqual(business_logic.reserve_attraction_slot(attraction_id, "2026-11-01 14:30"), 4)
+
+
+class TestDailyInventory(unittest.TestCase):
+    """Tests for visit dates on tickets and the per-date attendance cap"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_daily_cap_is_enforced(self):
+        day, holiday = date(2026, 12, 1), date(2026, 12, 2)
+        for storage_mode in DataLayer.STORAGE_MODES:
+            data_layer = DataLayer(data_dir=os.path.join(self.temp_dir.name, storage_mode), storage_mode=storage_mode)
+            self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+            business_logic = BusinessLogic(data_layer)
+            guest = business_logic.add_guest("Alice", "alice@example.com", "111")
+            business_logic.set_daily_capacity(5)
+            business_logic.set_daily_capacity(8, "2026-12-02")
+
+            ticket = business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.SINGLE_DAY, 275,
+                                                        visit_date="2026-12-01")
+            business_logic.add_tickets_bulk(guest.get_guest_id(), TicketType.SINGLE_DAY, 275, 4, day)
+            with self.assertRaises(ValueError):
+                business_logic.add_tickets_bulk(guest.get_guest_id(), TicketType.SINGLE_DAY, 275, 1, day)
+            with self.assertRaises(ValueError):
+                business_logic.quote_basket([{"ticket_type": TicketType.SINGLE_DAY, "visit_date": day}])
+            business_logic.add_tickets_bulk(guest.get_guest_id(), TicketType.SINGLE_DAY, 275, 3, holiday)
+
+            # The cap and the calendar come from the stored totals, not the tickets
+            data_layer.get_all_tickets = None
+            self.assertEqual(business_logic.get_remaining_tickets(day), 0)
+            business_logic.cancel_ticket(ticket.get_ticket_id())
+            self.assertEqual(business_logic.get_remaining_tickets("2026-12-01"), 1)
+            self.assertEqual(business_logic.get_visit_calendar(day, date(2026, 12, 3)),
+                             [(day, 4, 5, 1), (holiday, 3, 8, 5), (date(2026, 12, 3), 0, 5, 5)])
+
+            stored = DataLayer(data_dir=data_layer.data_dir, storage_mode=storage_mode).get_all_tickets()
+            self.assertEqual(sorted(t.get_visit_date() for t in stored), [day] * 5 + [holiday] * 3)
+
+
+class TestSchedule(unittest.TestCase):
+    """Tests for the interval index of events and attraction time slots"""
+
+    def setUp(self):
+        """Use a fresh temporary data directory for each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_interval_queries_match_a_scan(self):
+        import random
+        rng = random.Random(7)
+        base = datetime(2026, 6, 1)
+        intervals = []
+        for number in range(20000):
+            start = base + timedelta(minutes=rng.randrange(60 * 24 * 60))
+            intervals.append((start, start + timedelta(minutes=rng.choice((15, 30, 90, 240))), number))
+        index = IntervalIndex(intervals[:10000])
+        for interval in intervals[10000:]:
+            index.add(*interval)
+        for _ in range(50):
+            start = base + timedelta(minutes=rng.randrange(60 * 24 * 60))
+            end = start + timedelta(minutes=rng.randrange(1, 600))
+            expected = sorted((s, n) for s, e, n in intervals if s < end and e > start)
+            self.assertEqual(sorted((intervals[n][0], n) for n in index.overlapping(start, end)), expected)
+            after = sorted((s, n) for s, e, n in intervals if s >= start)[:5]
+            self.assertEqual([intervals[n][0] for n in index.next(start, 5)], [s for s, n in after])
+        with self.assertRaises(ValueError):
+            index.add(base, base, "empty")
+
+    def test_long_interval_does_not_widen_short_queries(self):
+        """A 30-day season is found without scanning the month of shows that started before."""
+        base = datetime(2026, 6, 1)
+        shows = [(base + timedelta(minutes=15 * n), base + timedelta(minutes=15 * n + 90), n) for n in range(2880)]
+        index = IntervalIndex(shows + [(base, base + timedelta(days=30), "season")])
+
+        class CountingList(list):
+            reads = 0
+
+            def __getitem__(self, position):
+                CountingList.reads += 1
+                return list.__getitem__(self, position)
+
+        for bucket in index.buckets.values():
+            bucket.ends = CountingList(bucket.ends)
+        start = base + timedelta(days=29)
+        found = index.overlapping(start, start + timedelta(hours=1))
+        self.assertEqual(found, ["season"] + list(range(2779, 2788)))
+        self.assertLess(CountingList.reads, 30)  # Not the ~2800 shows since the season began
+
+    def test_events_and_slots(self):
+        for storage_mode in DataLayer.STORAGE_MODES:
+            data_layer = DataLayer(data_dir=os.path.join(self.temp_dir.name, storage_mode), storage_mode=storage_mode)
+            self.addCleanup(lambda d=data_layer: d.sqlite and d.sqlite.close())
+            business_logic = BusinessLogic(data_layer)
+            self.addCleanup(business_logic.capacity.flush)
+            parade = business_logic.add_event("Parade", "2026-07-04 18:00", "Main street", duration_minutes=90)
+            fireworks = business_logic.add_event("Fireworks", datetime(2026, 7, 4, 21, 0), "Lake")
+            with self.assertRaises(ValueError):
+                business_logic.add_event("Show", "next Friday", "Stage")
+            ids = lambda events: [event.get_event_id() for event in events]
+            self.assertEqual(ids(business_logic.get_events_on("2026-07-04")), ids([parade, fireworks]))
+            self.assertEqual(ids(business_logic.find_event_conflicts("2026-07-04 19:00")), ids([parade]))
+            self.assertEqual(business_logic.find_event_conflicts("2026-07-04 19:30"), [])
+            late = business_logic.add_event("Late Show", "2026-07-04 19:45", "Stage")  # Indexed as it is added
+            self.assertEqual(ids(business_logic.get_next_events(2, after="2026-07-04 18:30")), ids([late, fireworks]))
+
+            ride = business_logic.add_attraction("Loop", "North", "Coaster", capacity=24)
+            ride_id = ride.get_attraction_id()
+            slots = business_logic.add_attraction_time_slots(ride_id, "2026-07-04 10:00", 16, 20, gap_minutes=10)
+            self.assertEqual(slots[1], (datetime(2026, 7, 4, 10, 30), datetime(2026, 7, 4, 10, 50)))
+            with self.assertRaises(ValueError):
+                business_logic.add_attraction_time_slots(ride_id, "2026-07-04 10:40", 1, 20)
+            business_logic.add_attraction_time_slots(ride_id, "2026-07-04 10:20", 1, 10)  # Fits a gap
+            self.assertEqual([start.strftime("%H:%M") for _, start, _ in
+                              business_logic.get_attraction_slots("2026-07-04 10:15", "2026-07-04 11:00")],
+                             ["10:00", "10:20", "10:30"])
+            self.assertEqual(business_logic.reserve_attraction_slot(ride_id, slots[0][0], 4), 20)
+
+            # A new process reads the datetimes and slots back
+            reopened = BusinessLogic(DataLayer(data_dir=data_layer.data_dir, storage_mode=storage_mode))
+            self.addCleanup(reopened.capacity.flush)
+            self.addCleanup(lambda r=reopened: r.data_layer.sqlite and r.data_layer.sqlite.close())
+            self.assertEqual([e.get_event_name() for e in reopened.get_events_between("2026-07-04 18:00",
+                                                                                      "2026-07-04 20:00")],
+                             ["Parade", "Late Show"])
+            self.assertEqual(len(reopened.get_attraction_slots("2026-07-04", "2026-07-05", ride_id)), 17)
+
+    def test_old_event_dates_are_migrated(self):
+        data_layer = DataLayer(data_dir=self.temp_dir.name, auto_migrate=False)
+        events = [Event(1, "Gala", "", 1, "Gala", "2025-01-01"), Event(2, "Mystery", "", 2, "Mystery", "2025-01-02")]
+        for event in events:
+            del event._duration_minutes
+        events[0]._event_date, events[1]._event_date = "2025-01-01 20:00", "sometime soon"
+        data_layer.save_data("events", events)
+        migrations.upgrade(data_layer)
+        business_logic = BusinessLogic(DataLayer(data_dir=self.temp_dir.name))
+        self.addCleanup(business_logic.capacity.flush)
+        gala, mystery = business_logic.get_all_events()
+        self.assertEqual((gala.get_event_date(), gala.get_end_time()),
+                         (datetime(2025, 1, 1, 20, 0), datetime(2025, 1, 1, 21, 0)))
+        self.assertIsNone(mystery.get_event_date())
+        next_events = business_logic.get_next_events(5, after="2025-01-01")
+        self.assertEqual([event.get_event_name() for event in next_events], ["Gala"])
+
+
+class TestAsyncBusinessLogic(unittest.TestCase):
+    """Tests for the asyncio facade over BusinessLogic"""
+
+    def test_concurrent_sessions(self):
+        async def session(business_logic, number):
+            guest = await business_logic.add_guest(f"Guest {number}", f"guest{number}@example.com", "000")
+            tickets = await asyncio.gather(*[
+                business_logic.add_ticket_to_guest(guest.get_guest_id(), TicketType.CHILD, 185) for _ in range(3)
+            ])
+            reservation = await business_logic.make_reservation(guest.get_guest_id(), list(tickets))
+            return await business_logic.process_payment(reservation.get_reservation_id(), 555, PaymentMethod.CREDIT_CARD)
+
+        async def main(data_dir):
+            async with AsyncBusinessLogic(BusinessLogic(DataLayer(data_dir=data_dir)), max_workers=4) as business_logic:
+                payments = await asyncio.gather(*[session(business_logic, number) for number in range(10)])
+                return payments, await business_logic.get_all_tickets(), await business_logic.get_all_payments()
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            payments, tickets, stored_payments = asyncio.run(main(data_dir))
+            self.assertEqual(len({p.get_payment_id() for p in payments}), 10)
+            self.assertEqual(len({t.get_ticket_id() for t in tickets}), 30)
+            self.assertEqual(len(stored_payments), 10)
+            reservations = BusinessLogic(DataLayer(data_dir=data_dir)).get_all_reservations()
+            self.assertTrue(all(r.get_payment() is not None for r in reservations))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,12 +1,16 @@
 import tkinter as tk  # Import tkinter for GUI creation
 from tkinter import messagebox # Import messagebox for showing pop-up alerts
+from tkinter import ttk  # Import ttk for the progress bar
 from models import *  # Import all models
 from business_logic import BusinessLogic  # Import business logic class for backend operations
+from background_worker import BackgroundWorker  # Runs business operations off the UI thread
 
 
 
 
 class App:
+   POLL_INTERVAL_MS = 50  # How often finished background operations are picked up
+
    def __init__(self, root):
        # Initialize the main application window
        self.root = root
@@ -17,6 +21,18 @@ class App:
        self.business_logic = BusinessLogic() # Create an instance of BusinessLogic
        self.guest = None # Initialize the current guest as None
        self.admin = None # Initialize the current admin as None
+       self.screen_id = 0 # Incremented by clear_window, so late results don't draw on a newer screen
+
+
+       # All business operations run on this worker thread, one at a time in the order requested
+       self.worker = BackgroundWorker()
+       # Status bar with a progress indicator, kept across screens by clear_window
+       self.status_bar = tk.Frame(self.root)
+       self.status_bar.pack(side="bottom", fill="x")
+       self.status_label = tk.Label(self.status_bar, text="", anchor="w")
+       self.status_label.pack(side="left", padx=10)
+       self.progress_bar = ttk.Progressbar(self.status_bar, mode="indeterminate", length=150)
+       self.poll_worker()  # Start delivering background results
 
 
        # Mapping for user-friendly ticket names to backend ticket types enum
@@ -33,6 +49,39 @@ class App:
        self.role_selection_screen()  # Start with the role selection screen
 
 
+   def run_in_background(self, description, operation, on_success, on_error=None):
+       # Run a business operation on the worker thread; on_success(result) runs back on the UI thread
+       self.worker.submit(operation, on_success, on_error or self.show_background_error, description)
+       self.update_progress()
+
+
+   def show_background_error(self, error):
+       # Default handler for errors raised by background operations
+       messagebox.showerror("Error", f"An error occurred: {str(error)}")
+
+
+   def poll_worker(self):
+       # Deliver finished background operations and update the progress indicator, then poll again
+       try:
+           self.worker.poll()
+       finally:
+           self.update_progress()
+           self.root.after(self.POLL_INTERVAL_MS, self.poll_worker)
+
+
+   def update_progress(self):
+       # Show the progress bar and the queued work while the worker is busy
+       if self.worker.is_busy():
+           self.status_label.config(text=self.worker.status())
+           if not self.progress_bar.winfo_ismapped():
+               self.progress_bar.pack(side="right", padx=10, pady=5)
+               self.progress_bar.start(10)
+       elif self.progress_bar.winfo_ismapped():
+           self.progress_bar.stop()
+           self.progress_bar.pack_forget()
+           self.status_label.config(text="")
+
+
    def role_selection_screen(self):
        # Display the role selection screen
        self.clear_window() # Clear any existing widgets
@@ -136,14 +185,14 @@ class App:
            return
 
 
-       try:
-           # Add the admin to the business logic and show success message
-           self.admin = self.business_logic.add_admin(name, email)  # Create admin account and generate ID
+       def created(admin):
+           # Show the new admin ID and return to the role selection screen
+           self.admin = admin
            messagebox.showinfo("Success", f"Admin account created! Your Admin ID is: {self.admin.get_admin_id()}")
-           self.role_selection_screen() # Return to the role selection screen
-       except Exception as e:
-           # Show an error message if something goes wrong
-           messagebox.showerror("Error", f"An error occurred: {str(e)}")
+           self.role_selection_screen()
+
+       # Add the admin to the business logic (creates the account and generates its ID)
+       self.run_in_background("Creating admin account", lambda: self.business_logic.add_admin(name, email), created)
 
 
    def admin_login_screen(self):
@@ -196,13 +245,13 @@ class App:
 
        try:
            admin_id = int(admin_id)  # Ensure admin_id is an integer.
-           admins = self.business_logic.get_all_admins() # Get all admin accounts
-           # Find matching admin account
-           self.admin = next(
-               (a for a in admins if a.get_email() == email and a.get_admin_id() == admin_id), None
-           )
-
+       except ValueError:
+           # If the admin ID is not numeric, show an error message
+           messagebox.showerror("Login Failed", "Admin ID must be a numeric value.")
+           return
 
+       def logged_in(admin):
+           self.admin = admin
            if self.admin:
                # If admin is found, show success message and navigate to the dashboard
                messagebox.showinfo("Login Successful", f"Welcome back, {self.admin.get_name()}!")
@@ -210,12 +259,13 @@ class App:
            else:
                # If no matching admin is found, show an error message
                messagebox.showerror("Login Failed", "Invalid email or Admin ID.")
-       except ValueError:
-           # If the admin ID is not numeric, show an error message
-           messagebox.showerror("Login Failed", "Admin ID must be a numeric value.")
-       except Exception as e:
-           # Catch any other exceptions and show an error message
-           messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+       def find_admin():
+           # Find the admin account by ID and check that the email matches
+           admin = self.business_logic.get_admin(admin_id)
+           return admin if admin and admin.get_email() == email else None
+
+       self.run_in_background("Signing in", find_admin, logged_in)
 
 
    def create_account(self):
@@ -276,14 +326,14 @@ class App:
            return
 
 
-       try:
-           # Add the guest to the business logic and show a success message
-           self.guest = self.business_logic.add_guest(name, email, phone)
+       def created(guest):
+           # Show a success message and navigate to the main menu
+           self.guest = guest
            messagebox.showinfo("Success", f"Welcome, {self.guest.get_name()}! Your account is created.")
-           self.main_menu()  # Navigate to the main menu
-       except Exception as e:
-           # Show an error message if something goes wrong
-           messagebox.showerror("Error", f"An error occurred: {str(e)}")
+           self.main_menu()
+
+       # Add the guest to the business logic
+       self.run_in_background("Creating account", lambda: self.business_logic.add_guest(name, email, phone), created)
 
 
 
@@ -291,20 +341,20 @@ class App:
    def login(self):
        # Handle the guest login process
        email = self.email_entry.get() # Get the entered email
-       guests = self.business_logic.get_all_guests()# Retrieve all guest accounts
 
 
-       # Find the matching guest account
-       self.guest = next((g for g in guests if g.get_email() == email), None)
-
+       def logged_in(guest):
+           self.guest = guest
+           if self.guest:
+               # If the guest is found, show a success message and navigate to the main menu
+               messagebox.showinfo("Login Successful", f"Welcome back, {self.guest.get_name()}!")
+               self.main_menu()
+           else:
+               # If no matching guest is found, show an error message
+               messagebox.showerror("Login Failed", "Invalid email or user does not exist.")
 
-       if self.guest:
-           # If the guest is found, show a success message and navigate to the main menu
-           messagebox.showinfo("Login Successful", f"Welcome back, {self.guest.get_name()}!")
-           self.main_menu()
-       else:
-           # If no matching guest is found, show an error message
-           messagebox.showerror("Login Failed", "Invalid email or user does not exist.")
+       # Find the matching guest account using the email index
+       self.run_in_background("Signing in", lambda: self.business_logic.find_guest_by_email(email), logged_in)
 
 
    def main_menu(self):
@@ -367,15 +417,17 @@ class App:
 
 
        if confirmation:
-           try:
-               # Delete the guest using business logic and show success message
-               self.business_logic.delete_guest(self.guest.get_guest_id())
+           def deleted(_):
                self.guest = None  # Clear the current guest data
                messagebox.showinfo("Account Deleted", "Your account has been deleted successfully.")
                self.login_screen()  # Redirect to the login screen
-           except Exception as e:
-               # Show an error message if something goes wrong
-               messagebox.showerror("Error", f"An error occurred while deleting the account: {str(e)}")
+
+           # Delete the guest using business logic
+           guest_id = self.guest.get_guest_id()
+           self.run_in_background(
+               "Deleting account", lambda: self.business_logic.delete_guest(guest_id), deleted,
+               lambda e: messagebox.showerror("Error", f"An error occurred while deleting the account: {str(e)}"),
+           )
 
 
    def modify_account_screen(self):
@@ -440,16 +492,22 @@ class App:
 
 
        try:
-           # Update the guest's details and save the changes
+           # Update the guest's details (the setters validate them)
            self.guest.set_name(new_name)
            self.guest.set_email(new_email)
            self.guest.set_phone_number(new_phone)
-           self.business_logic.update_guest(self.guest)
-           messagebox.showinfo("Success", "Account details updated successfully!")
-           self.manage_account_screen() # Return to the account management screen
        except Exception as e:
            # Show an error message if something goes wrong
            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+           return
+
+       def updated(_):
+           messagebox.showinfo("Success", "Account details updated successfully!")
+           self.manage_account_screen() # Return to the account management screen
+
+       # Save the changes
+       guest = self.guest
+       self.run_in_background("Saving account", lambda: self.business_logic.update_guest(guest), updated)
 
    def view_purchase_orders(self):
        # Display the screen to view the guest's purchase orders
@@ -459,10 +517,20 @@ class App:
        orders_label = tk.Label(self.root, text="Your Purchase Orders", font=("Arial", 14))
        orders_label.pack(pady=20)
 
-       # Get the guest's purchase orders based on their ID
+       # Add a back button to return to the account management screen
+       back_button = tk.Button(self.root, text="Back", command=self.manage_account_screen)
+       back_button.pack(side="bottom", pady=20)
+
+       # Get the guest's purchase orders based on their ID (queued after any purchase still being saved)
        guest_id = self.guest.get_guest_id()
-       orders = self.business_logic.get_tickets_by_guest(guest_id)
+       screen_id = self.screen_id
+       self.run_in_background(
+           "Loading purchase orders", lambda: self.business_logic.get_tickets_by_guest(guest_id),
+           lambda orders: self.show_purchase_orders(orders) if screen_id == self.screen_id else None,
+       )
 
+   def show_purchase_orders(self, orders):
+       # Fill the purchase orders screen once the orders are loaded
        if not orders:
            # Display a message if no tickets have been purchased yet
            no_orders_label = tk.Label(self.root, text="No tickets purchased yet.", font=("Arial", 12))
@@ -489,10 +557,6 @@ class App:
 
            text_widget.config(state="disabled")  # Make the text widget read-only
 
-       # Add a back button to return to the account management screen
-       back_button = tk.Button(self.root, text="Back", command=self.manage_account_screen)
-       back_button.pack(pady=20)
-
    def admin_dashboard(self):
        # Display the admin dashboard
        self.clear_window()
@@ -508,6 +572,10 @@ class App:
        ticket_sales_button.pack(pady=10)
 
 
+       revenue_reports_button = tk.Button(self.root, text="View Revenue Reports", command=self.view_revenue_reports)
+       revenue_reports_button.pack(pady=10)
+
+
        modify_discounts_button = tk.Button(self.root, text="Modify Discount Availability",command=self.modify_discounts)
        modify_discounts_button.pack(pady=10)
 
@@ -564,17 +632,18 @@ class App:
            # Get the input values for attraction ID and new capacity
            attraction_id = int(self.attraction_id_entry.get())
            new_capacity = int(self.new_capacity_entry.get())
-
-
-           # Update the attraction capacity using business logic
-           self.business_logic.update_attraction_capacity(attraction_id, new_capacity)
-           messagebox.showinfo("Success", "Attraction capacity updated successfully!")
        except ValueError:
            # Handle invalid input errors
            messagebox.showerror("Error", "Please enter valid numeric values for Attraction ID and Capacity.")
-       except Exception as e:
-           # Handle other errors
-           messagebox.showerror("Error", f"An error occurred: {str(e)}")
+           return
+
+
+       # Update the attraction capacity using business logic
+       self.run_in_background(
+           "Updating capacity",
+           lambda: self.business_logic.update_attraction_capacity(attraction_id, new_capacity),
+           lambda _: messagebox.showinfo("Success", "Attraction capacity updated successfully!"),
+       )
 
 
    def view_ticket_sales(self):
@@ -587,33 +656,72 @@ class App:
        sales_label.pack(pady=20)
 
 
-       try:
-           # Retrieve all tickets and aggregate sales data by date
-           tickets = self.business_logic.get_all_tickets()
-           sales_data = {}
+       # Add a back button to return to the admin dashboard
+       back_button = tk.Button(self.root, text="Back", command=self.admin_dashboard)
+       back_button.pack(side="bottom", pady=10)
 
 
-           # Collect sales data
-           for ticket in tickets:
-               # Get the purchase date of the ticket
-               ticket_date = ticket.get_purchase_date()  # Access will work as all tickets are now properly initialized
-               sales_data[ticket_date] = sales_data.get(ticket_date, 0) + 1  # Increment the count for that date
+       def show_sales(sales):
+           # Display the sales per date from the stored totals, unless the admin has left this screen
+           if screen_id != self.screen_id:
+               return
+           for date, count, revenue in sales:
+               ticket_label = tk.Label(self.root, text=f"Date: {date}, Tickets Sold: {count}, Revenue: {revenue:.2f} DHS")
+               ticket_label.pack(pady=5)
 
 
-           # Display the sales data sorted by date
-           for date, count in sorted(sales_data.items()):
-               ticket_label = tk.Label(self.root, text=f"Date: {date}, Tickets Sold: {count}")
-               ticket_label.pack(pady=5)
+       screen_id = self.screen_id
+       self.run_in_background("Loading ticket sales", self.business_logic.get_sales_by_date, show_sales)
 
 
-       except Exception as e:
-           # Handle any errors that occur during retrieval or display
-           messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+
+   def view_revenue_reports(self):
+       # Display the revenue and discount reports computed by the analytics module
+       self.clear_window()
+
+
+       # Add a label for the reports
+       reports_label = tk.Label(self.root, text="Revenue Reports", font=("Arial", 14))
+       reports_label.pack(pady=20)
 
 
        # Add a back button to return to the admin dashboard
        back_button = tk.Button(self.root, text="Back", command=self.admin_dashboard)
-       back_button.pack(pady=10)
+       back_button.pack(side="bottom", pady=10)
+
+
+       def build_reports():
+           # Load the ticket and payment columns once and compute every report (runs on the worker thread)
+           analytics = self.business_logic.get_sales_analytics()
+           return [analytics.report(name) for name in analytics.REPORTS]
+
+
+       def format_value(value):
+           # Display form of one table cell
+           if isinstance(value, float):
+               return f"{value:.2f}"
+           if isinstance(value, Enum):
+               return value.value
+           return str(value)
+
+
+       def show_reports(reports):
+           # Display each report as a table of rows, unless the admin has left this screen
+           if screen_id != self.screen_id:
+               return
+           text_widget = tk.Text(self.root, height=50, width=90, wrap="none", bg="black", fg="white")
+           text_widget.pack(pady=10)
+           for headings, rows in reports:
+               text_widget.insert("end", " | ".join(headings) + "\n")
+               for row in rows:
+                   text_widget.insert("end", " | ".join(format_value(value) for value in row) + "\n")
+               text_widget.insert("end", "\n")
+           text_widget.config(state="disabled")  # Make the text widget read-only
+
+
+       screen_id = self.screen_id
+       self.run_in_background("Computing revenue reports", build_reports, show_reports)
 
 
 
@@ -677,18 +785,29 @@ class App:
 
            # Convert to TicketType enum and apply the discount using business logic
            ticket_type_enum = TicketType[backend_ticket_type]
-           self.business_logic.modify_ticket_discount(ticket_type_enum, discount)
-
+       except ValueError as ve:
+           # Show an error message for invalid inputs
+           messagebox.showerror("Error", str(ve))
+           return
 
+       def applied(_):
            # Show success message and return to the admin dashboard
            messagebox.showinfo("Success", f"Discount of {discount}% applied to {ticket_type}.")
            self.admin_dashboard()
-       except ValueError as ve:
+
+       self.run_in_background(
+           "Applying discount", lambda: self.business_logic.modify_ticket_discount(ticket_type_enum, discount),
+           applied, self.show_discount_error,
+       )
+
+   def show_discount_error(self, error):
+       # Show the error raised while applying a discount
+       if isinstance(error, ValueError):
            # Show an error message for invalid inputs
-           messagebox.showerror("Error", str(ve))
-       except Exception as e:
+           messagebox.showerror("Error", str(error))
+       else:
            # Show an error message for any other exceptions
-           messagebox.showerror("Error", f"An error occurred: {str(e)}")
+           messagebox.showerror("Error", f"An error occurred: {str(error)}")
 
 
    def ticket_purchasing_screen(self):
@@ -776,48 +895,38 @@ class App:
            ticket_type_enum = TicketType[backend_ticket_type]
 
 
-           # Fetch ticket details like price and discount
-           ticket_details = Ticket.TICKET_DETAILS.get(ticket_type_enum)
-           if not ticket_details:  # Validate ticket details existence
-               raise ValueError(f"No details found for ticket type: {ticket_type}")
-
-
-           price = ticket_details["price"]  # Base price of the ticket
-           discount = ticket_details["discount"]  # Default or admin-modified discount
+           # Describe the basket item; the pricing engine applies the discount rules and the age check
+           item = {"ticket_type": ticket_type_enum, "quantity": quantity, "visit_date": selected_date}
+           if ticket_type == "Group Ticket":
+               item["group_size"] = int(self.group_size_entry.get())
+           elif ticket_type == "Child Ticket":
+               item["age"] = int(self.child_age_entry.get())
 
 
-           # Apply predefined discount rules for specific tickets
-           if ticket_type == "Two-Day Pass":
-               discount = max(discount, 10)  # Ensure at least a 10% discount for Two-Day Pass
-           elif ticket_type == "Annual Membership":
-               discount = max(discount, 15)  # Ensure at least a 15% discount for renewal
-           elif ticket_type == "Group Ticket":
-               group_size = int(self.group_size_entry.get())
-               if group_size >= 20:  # Only apply discount for groups of 20+
-                   discount = max(discount, 20)
-               else:
-                   discount = 0  # No discount for smaller groups
-           elif ticket_type == "Child Ticket":
-               age = int(self.child_age_entry.get())
-               if not (3 <= age <= 12):
-                   messagebox.showerror("Error", "Child ticket is valid for ages 3-12 only.")
-                   return
+       except ValueError as ve:
+           # Show an error message for invalid inputs
+           messagebox.showerror("Error", f"Invalid input: {str(ve)}")
+           return
 
 
-           # Calculate final price after applying discount and multiply by quantity
-           final_price = price * (1 - discount / 100) * quantity
+       def quoted(quote):
+           # Proceed to payment screen with the quoted price and discount
+           line = quote["lines"][0]
+           self.payment_screen(ticket_type, line["price"], line["discount"], quote["total"], selected_date, quantity)
 
 
-           # Proceed to payment screen
-           self.payment_screen(ticket_type, price, discount, final_price, selected_date, quantity)
+       self.run_in_background("Calculating price", lambda: self.business_logic.quote_basket([item]), quoted,
+                              self.show_quote_error)
 
 
-       except ValueError as ve:
+   def show_quote_error(self, error):
+       # Show the error raised while quoting a price
+       if isinstance(error, ValueError):
            # Show an error message for invalid inputs
-           messagebox.showerror("Error", f"Invalid input: {str(ve)}")
-       except Exception as e:
+           messagebox.showerror("Error", f"Invalid input: {str(error)}")
+       else:
            # Show an error message for any unexpected errors
-           messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
+           messagebox.showerror("Error", f"An unexpected error occurred: {str(error)}")
 
 
    def payment_screen(self, ticket_type, price, discount, final_price, selected_date, quantity):
@@ -872,7 +981,7 @@ class App:
 
 
        # Add a button to proceed with the payment
-       pay_button = tk.Button(self.root, text="Pay",command=lambda: self.process_payment(ticket_type, final_price, selected_date, quantity))
+       pay_button = tk.Button(self.root, text="Pay",command=lambda: self.process_payment(ticket_type, final_price, selected_date, quantity, price, discount))
        pay_button.pack(pady=10)
 
 
@@ -881,7 +990,7 @@ class App:
        back_button.pack(pady=10)
 
 
-   def process_payment(self, ticket_type, final_price, selected_date, quantity):
+   def process_payment(self, ticket_type, final_price, selected_date, quantity, price, discount):
        # Add the quantity parameter to the ticket creation logic
        try:
            # Retrieve payment details from user input
@@ -912,16 +1021,12 @@ class App:
            ticket_type_enum = TicketType[backend_ticket_type]
 
 
-           # Create multiple tickets for the specified quantity
-           for _ in range(quantity):
-               self.business_logic.add_ticket_to_guest(
-                   self.guest.get_guest_id(),  # Guest ID of the currently logged-in guest
-                   ticket_type_enum,  # Backend enum for ticket type
-                   final_price / quantity,  # Price per ticket
-                   selected_date  # Selected date for the ticket
-               )
-
+       except ValueError as ve:
+           # Show an error message for invalid inputs
+           messagebox.showerror("Payment Error", f"Error: {str(ve)}")
+           return
 
+       def paid(_):
            # Display a success message for the payment
            messagebox.showinfo(
                "Success",
@@ -930,19 +1035,38 @@ class App:
            # Redirect to the purchase orders screen
            self.view_purchase_orders()
 
+       # Create all tickets for the specified quantity with a single write. Purchases are queued,
+       # so tickets bought while an earlier purchase is still being saved are stored after it.
+       guest_id = self.guest.get_guest_id()  # Guest ID of the currently logged-in guest
+       self.run_in_background(
+           "Saving purchase",
+           lambda: self.business_logic.add_tickets_bulk(
+               guest_id,  # Guest ID of the currently logged-in guest
+               ticket_type_enum,  # Backend enum for ticket type
+               price,  # List price per ticket
+               quantity,  # Number of tickets
+               selected_date,  # Selected visit date for the tickets
+               discount,  # Quoted discount %
+           ),
+           paid, self.show_payment_error,
+       )
 
-       except ValueError as ve:
+   def show_payment_error(self, error):
+       # Show the error raised while saving a purchase
+       if isinstance(error, ValueError):
            # Show an error message for invalid inputs
-           messagebox.showerror("Payment Error", f"Error: {str(ve)}")
-       except Exception as e:
+           messagebox.showerror("Payment Error", f"Error: {str(error)}")
+       else:
            # Show an error message for unexpected errors
-           messagebox.showerror("Payment Error", f"An error occurred: {str(e)}")
+           messagebox.showerror("Payment Error", f"An error occurred: {str(error)}")
 
 
    def clear_window(self):
-       # Clear all widgets from the current window
+       # Clear all widgets from the current window (the status bar stays)
+       self.screen_id += 1
        for widget in self.root.winfo_children():
-           widget.destroy()
+           if widget is not self.status_bar:
+               widget.destroy()
 
 
 # Entry point of the application
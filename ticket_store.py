@@ -0,0 +1,173 @@
+from array import array  # Typed, compact columns
+from datetime import date  # For converting ordinal day numbers back to dates
+from models import *  # Import all models
+
+try:
+    import numpy as np  # Optional: zero-copy column views for vectorized work
+except ImportError:
+    np = None
+
+
+class TicketStore:
+    # Column-oriented ticket storage: one typed array per attribute instead of one object per ticket.
+    # Ticket types and statuses are stored as small integer codes and dates as ordinal day numbers.
+    TICKET_TYPES = list(TicketType)  # Code -> TicketType
+    TYPE_CODES = {ticket_type: code for code, ticket_type in enumerate(TICKET_TYPES)}
+    STATUSES = list(TicketStatus)  # Code -> TicketStatus
+    STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+    NO_GUEST = -1  # Stored guest ID for tickets without a guest
+    NO_DATE = 0  # Stored day number for a missing date
+    NO_VERSION = 0  # Stored price list version of tickets sold before the price list (versions start at 1)
+
+    # Column name -> array typecode
+    COLUMNS = {
+        "ticket_ids": "q",
+        "guest_ids": "q",
+        "prices": "d",
+        "discounts": "d",
+        "validity_periods": "H",
+        "purchase_days": "l",
+        "visit_days": "l",
+        "types": "B",
+        "statuses": "B",
+        "price_list_versions": "H",
+    }
+
+    def __init__(self, tickets=()):
+        for name, typecode in self.COLUMNS.items():
+            setattr(self, name, array(typecode))
+        self.positions = None  # ticket_id -> row, built on the first lookup by ID
+        self.extend(tickets)
+
+    def __len__(self):
+        return len(self.ticket_ids)
+
+    def __iter__(self):
+        # Iterate over lightweight views of every row
+        return (TicketView(self, row) for row in range(len(self)))
+
+    def append(self, ticket):
+        # Add one ticket (any object with the Ticket getters) as a new row
+        self.ticket_ids.append(ticket.get_ticket_id())
+        guest_id = ticket.get_guest_id()
+        self.guest_ids.append(self.NO_GUEST if guest_id is None else guest_id)
+        self.prices.append(ticket.get_price())
+        self.discounts.append(ticket.get_discount())
+        self.validity_periods.append(ticket.get_validity_period())
+        self.purchase_days.append(ticket.get_purchase_date().toordinal())
+        visit_date = ticket.get_visit_date()
+        self.visit_days.append(self.NO_DATE if visit_date is None else visit_date.toordinal())
+        self.types.append(self.TYPE_CODES[ticket.get_ticket_type()])
+        self.statuses.append(self.STATUS_CODES[ticket.get_status()])
+        version = ticket.get_price_list_version()
+        self.price_list_versions.append(self.NO_VERSION if version is None else version)
+        if self.positions is not None:
+            self.positions[ticket.get_ticket_id()] = len(self) - 1
+
+    def extend(self, tickets):
+        # Add several tickets
+        for ticket in tickets:
+            self.append(ticket)
+
+    def columns(self):
+        # The column arrays by name
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    @classmethod
+    def columns_of(cls, tickets):
+        # Column arrays of some tickets (the builder ColumnCache stores for a ticket segment)
+        return cls(tickets).columns()
+
+    def extend_columns(self, columns):
+        # Add the rows of column arrays (e.g. another store's or stored ones) with one copy per column
+        for name in self.COLUMNS:
+            getattr(self, name).extend(columns[name])
+        self.positions = None  # Rebuilt on the next lookup by ID
+
+    def view(self, row):
+        # Return a view of one row
+        if not 0 <= row < len(self):
+            raise IndexError("Ticket row out of range.")
+        return TicketView(self, row)
+
+    def get(self, ticket_id):
+        # Return a view of the ticket with the given ID, or None
+        if self.positions is None:
+            self.positions = {ticket_id: row for row, ticket_id in enumerate(self.ticket_ids)}
+        row = self.positions.get(ticket_id)
+        return None if row is None else TicketView(self, row)
+
+    def to_ticket(self, row):
+        # Rebuild a full Ticket object from one row
+        view = self.view(row)
+        ticket = Ticket(view.get_ticket_type(), view.get_price(), view.get_validity_period(),
+                        discount=view.get_discount(), guest_id=view.get_guest_id(),
+                        ticket_id=view.get_ticket_id(), visit_date=view.get_visit_date(),
+                        price_list_version=view.get_price_list_version())
+        ticket.set_purchase_date(view.get_purchase_date())
+        ticket.set_status(view.get_status())
+        return ticket
+
+    def memory_bytes(self):
+        # Bytes used by the column data
+        return sum(len(column) * column.itemsize for column in (getattr(self, name) for name in self.COLUMNS))
+
+    def to_numpy(self):
+        # Zero-copy NumPy views of every column (requires NumPy)
+        if np is None:
+            raise ImportError("NumPy is required for TicketStore.to_numpy().")
+        return {name: np.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode)
+                for name in self.COLUMNS}
+
+
+class TicketView:
+    # Read/write view of one TicketStore row with the same getters as Ticket
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        self._store = store  # Store holding the columns
+        self._row = row  # Row of this ticket
+
+    def get_ticket_id(self):
+        return self._store.ticket_ids[self._row]
+
+    def get_ticket_type(self):
+        return TicketStore.TICKET_TYPES[self._store.types[self._row]]
+
+    def get_price(self):
+        return self._store.prices[self._row]
+
+    def get_validity_period(self):
+        return self._store.validity_periods[self._row]
+
+    def get_purchase_date(self):
+        return date.fromordinal(self._store.purchase_days[self._row])
+
+    def get_status(self):
+        return TicketStore.STATUSES[self._store.statuses[self._row]]
+    def set_status(self, status):
+        self._store.statuses[self._row] = TicketStore.STATUS_CODES[status]
+
+    def get_discount(self):
+        return self._store.discounts[self._row]
+
+    def get_guest_id(self):
+        guest_id = self._store.guest_ids[self._row]
+        return None if guest_id == TicketStore.NO_GUEST else guest_id
+
+    def get_visit_date(self):
+        visit_day = self._store.visit_days[self._row]
+        return None if visit_day == TicketStore.NO_DATE else date.fromordinal(visit_day)
+
+    def get_price_list_version(self):
+        version = self._store.price_list_versions[self._row]
+        return None if version == TicketStore.NO_VERSION else version
+
+    # Calculate the final price of the ticket after applying the discount.
+    def calculate_final_price(self):
+        return self.get_price() * (1 - self.get_discount() / 100)
+
+    # String representation matching Ticket
+    def __str__(self):
+        return (f"Ticket(ID: {self.get_ticket_id()}, Type: {self.get_ticket_type().value}, "
+                f"Price: {self.get_price():.2f}, Status: {self.get_status().value})")